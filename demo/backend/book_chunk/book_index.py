@@ -0,0 +1,80 @@
+"""
+도서 임베딩 인덱스 버전 관리.
+
+    book_chunk/
+      books_chunk_*.pkl                 # 최초 수집본 (legacy 인덱스)
+      index/<version>/books_chunk_*.pkl # 재임베딩으로 만든 인덱스 버전
+      index/<version>/manifest.json
+      current_index.json                # 추천에 사용할 버전 포인터
+
+포인터 파일은 임시 파일에 쓴 뒤 os.replace로 교체하므로, 추천 쪽은 항상
+완성된 인덱스 버전만 보게 됩니다. 이전 버전 디렉토리는 그대로 남겨둡니다.
+"""
+
+import json
+import os
+import pickle
+from datetime import datetime
+
+CATALOG_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(CATALOG_DIR, "index")
+CURRENT_INDEX_FILE = os.path.join(CATALOG_DIR, "current_index.json")
+
+LEGACY_INDEX = {
+    "version": None,
+    "path": CATALOG_DIR,
+    "passage_model": "embedding-passage",
+    "query_model": "embedding-query",
+}
+
+
+def get_current_index():
+    """현재 사용 중인 인덱스 정보를 반환 (포인터가 없으면 legacy 인덱스)"""
+    try:
+        with open(CURRENT_INDEX_FILE, "r", encoding="utf-8") as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return dict(LEGACY_INDEX)
+
+    index_path = os.path.join(INDEX_DIR, pointer["version"])
+    if not os.path.isdir(index_path):
+        print(f"경고: 인덱스 버전 '{pointer['version']}'을 찾을 수 없어 legacy 사용")
+        return dict(LEGACY_INDEX)
+    return {**LEGACY_INDEX, **pointer, "path": index_path}
+
+
+def list_chunk_files(index_path):
+    with os.scandir(index_path) as it:
+        return sorted(
+            entry.name
+            for entry in it
+            if entry.is_file()
+            and entry.name.startswith("books_chunk_")
+            and entry.name.endswith(".pkl")
+        )
+
+
+def iter_index_chunks(index=None):
+    """인덱스의 청크 파일을 하나씩 읽어 (파일명, 청크 데이터)로 반환"""
+    index = index or get_current_index()
+    for chunk_file in list_chunk_files(index["path"]):
+        try:
+            with open(os.path.join(index["path"], chunk_file), "rb") as f:
+                yield chunk_file, pickle.load(f)
+        except Exception as e:
+            print(f"경고: 청크 파일 '{chunk_file}' 로드 중 오류 발생: {str(e)}")
+
+
+def switch_current_index(version, passage_model, query_model):
+    """current_index.json을 원자적으로 교체하여 새 인덱스 버전을 활성화"""
+    pointer = {
+        "version": version,
+        "passage_model": passage_model,
+        "query_model": query_model,
+        "switched_at": datetime.now().isoformat(),
+    }
+    tmp_path = f"{CURRENT_INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, CURRENT_INDEX_FILE)
+    return pointer
@@ -0,0 +1,162 @@
+"""
+도서 수집/임베딩 실행 단위 지표 수집.
+
+단계별 처리량(권/초), 임베딩 지연 백분위수, 재시도 횟수, 캐시 적중률, 추정 토큰을 모아
+청크 파일 옆에 ingest_metrics_<시각>.json으로 저장하고 요약 표를 출력합니다.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+
+class IngestMetrics:
+    def __init__(self, run_name="ingest"):
+        self.run_name = run_name
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            # 단계별 처리 건수와 첫 시작~마지막 종료 구간 (병렬 단계도 벽시계 기준)
+            self.stages = {}
+            self.embedding_latencies = []
+            self.counters = Counter()
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """with 블록 동안의 시간을 해당 단계에 기록 (items는 처리한 도서 수)"""
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_stage(name, items, start, time.time())
+
+    def add_stage(self, name, items, start, end):
+        with self.lock:
+            stage = self.stages.setdefault(
+                name, {"items": 0, "busy_seconds": 0.0, "first": start, "last": end}
+            )
+            stage["items"] += items
+            stage["busy_seconds"] += end - start
+            stage["first"] = min(stage["first"], start)
+            stage["last"] = max(stage["last"], end)
+
+    def record_embedding(self, latency, tokens=0, texts=1):
+        with self.lock:
+            self.embedding_latencies.append(latency)
+            self.counters["embedding_requests"] += 1
+            self.counters["embedded_texts"] += texts
+            self.counters["embedding_tokens"] += tokens
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    @staticmethod
+    def _ratio(hits, misses):
+        total = hits + misses
+        return round(hits / total, 4) if total else None
+
+    def summary(self):
+        with self.lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                wall = max(stage["last"] - stage["first"], 1e-9)
+                stages[name] = {
+                    "items": stage["items"],
+                    "wall_seconds": round(wall, 3),
+                    "busy_seconds": round(stage["busy_seconds"], 3),
+                    "items_per_second": round(stage["items"] / wall, 3),
+                }
+
+            latencies = np.array(self.embedding_latencies)
+            if latencies.size:
+                p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+                embedding_latency = {
+                    "count": int(latencies.size),
+                    "mean": round(float(latencies.mean()), 4),
+                    "p50": round(float(p50), 4),
+                    "p90": round(float(p90), 4),
+                    "p95": round(float(p95), 4),
+                    "p99": round(float(p99), 4),
+                    "max": round(float(latencies.max()), 4),
+                }
+            else:
+                embedding_latency = {"count": 0}
+
+            counters = dict(self.counters)
+            return {
+                "run": self.run_name,
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+                "elapsed_seconds": round(time.time() - self.started_at, 3),
+                "stages": stages,
+                "embedding_latency": embedding_latency,
+                "cache_hit_rate": {
+                    "embedding": self._ratio(
+                        counters.get("embedding_cache_hits", 0),
+                        counters.get("embedding_cache_misses", 0),
+                    ),
+                    "kakao": self._ratio(
+                        counters.get("kakao_cache_hits", 0),
+                        counters.get("kakao_requests", 0),
+                    ),
+                },
+                "counters": counters,
+            }
+
+    def save(self, directory, summary=None):
+        """지표를 JSON 파일로 저장하고 경로를 반환"""
+        summary = summary or self.summary()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory, f"ingest_metrics_{datetime.now():%Y%m%d_%H%M%S}.json"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return path
+
+    def print_table(self, summary=None):
+        summary = summary or self.summary()
+        print(f"\n=== 실행 지표 ({summary['run']}, {summary['elapsed_seconds']}초) ===")
+        print(f"{'단계':<12}{'건수':>8}{'벽시계(초)':>12}{'누적(초)':>12}{'권/초':>10}")
+        for name, stage in summary["stages"].items():
+            print(
+                f"{name:<12}{stage['items']:>8}{stage['wall_seconds']:>12.2f}"
+                f"{stage['busy_seconds']:>12.2f}{stage['items_per_second']:>10.2f}"
+            )
+
+        latency = summary["embedding_latency"]
+        if latency["count"]:
+            print(
+                f"\n임베딩 지연(초) - 호출 {latency['count']}회: "
+                f"p50 {latency['p50']:.3f} / p90 {latency['p90']:.3f} / "
+                f"p95 {latency['p95']:.3f} / p99 {latency['p99']:.3f} / "
+                f"max {latency['max']:.3f}"
+            )
+
+        counters = summary["counters"]
+        hit_rate = summary["cache_hit_rate"]
+        print(f"재시도: {counters.get('retries', 0)}회")
+        for name, rate in hit_rate.items():
+            if rate is not None:
+                print(f"{name} 캐시 적중률: {rate * 100:.1f}%")
+        print(
+            f"추정 토큰: 원문 {counters.get('raw_tokens', 0)} / "
+            f"정규화 {counters.get('normalized_tokens', 0)} / "
+            f"임베딩 요청 {counters.get('embedding_tokens', 0)}"
+        )
+
+    def report(self, directory):
+        summary = self.summary()
+        self.print_table(summary)
+        path = self.save(directory, summary)
+        print(f"지표 저장: {path}")
+        return path
@@ -0,0 +1,112 @@
+"""
+임베딩/요약 전에 Kakao 도서 소개(contents)를 정규화하는 모듈.
+
+- HTML 태그 제거, 엔티티(&amp; 등) 디코딩, 공백 정리
+- 머리말/책소개 같은 머리표, ▶ ★ 같은 글머리 기호, 말줄임표 제거
+- 토큰 예산 안에서 문장 단위로 자르기 (원문이 잘렸으면 마지막 문장 조각은 버림)
+
+카탈로그 전체의 토큰 절감량 확인:
+    python passage_normalizer.py
+"""
+
+import html
+import math
+import os
+import re
+
+PASSAGE_TOKEN_BUDGET = int(os.getenv("PASSAGE_TOKEN_BUDGET", 256))
+
+TAG_PATTERN = re.compile(r"<[^<>]{1,200}>")
+SECTION_HEADER_PATTERN = re.compile(
+    r"[\[<【]\s*(머리말|책\s?소개|출판사\s?서평|출판사\s?리뷰|서평|목차|"
+    r"저자\s?소개|추천사|들어가는\s?말|줄거리)\s*[\]>】]"
+)
+LEADING_MARKER_PATTERN = re.compile(r"^[\s▶▷►★☆■□◆◇●○◎※·•\-]+")
+TRAILING_ELLIPSIS_PATTERN = re.compile(r"(\s*(\.{2,}|…+|\(더보기\)))+\s*$")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])[\"'”’」』)]*\s+")
+SENTENCE_TERMINATORS = (".", "!", "?", '"', "'", "”", "’", "」", "』", ")")
+
+
+def estimate_tokens(text):
+    """Solar 토큰 수 근사치 (한글은 글자당 1토큰, 그 외는 4글자당 1토큰)"""
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def clean_passage(text):
+    """HTML/엔티티/머리표/글머리 기호/말줄임표를 정리하고 공백을 하나로 합침"""
+    if not text:
+        return ""
+    text = TAG_PATTERN.sub(" ", text)
+    text = html.unescape(text)
+    text = SECTION_HEADER_PATTERN.sub(" ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = LEADING_MARKER_PATTERN.sub("", text)
+    return TRAILING_ELLIPSIS_PATTERN.sub("", text).strip()
+
+
+def truncate_at_sentence(text, token_budget=PASSAGE_TOKEN_BUDGET, truncated=False):
+    """토큰 예산 안에 들어가는 문장까지만 남김 (truncated: 원문이 말줄임표로 잘렸는지)"""
+    sentences = [s for s in SENTENCE_END_PATTERN.split(text) if s.strip()]
+    # Kakao 소개글은 글자 수 제한으로 문장 중간에서 끊기는 경우가 많으므로,
+    # 실제로 잘린 글(말줄임표로 끝나거나 예산 초과)에서만 마침표 없는 마지막 조각을 버림
+    cut = truncated or estimate_tokens(text) > token_budget
+    if cut and len(sentences) > 1 and not sentences[-1].endswith(SENTENCE_TERMINATORS):
+        sentences = sentences[:-1]
+
+    kept = []
+    used = 0
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        if kept and used + tokens > token_budget:
+            break
+        kept.append(sentence)
+        used += tokens
+
+    result = " ".join(kept)
+    if estimate_tokens(result) > token_budget:
+        # 첫 문장만으로 예산을 넘으면 예산에 맞는 길이까지 글자 단위로 자름
+        low, high = 0, len(result)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(result[:mid]) <= token_budget:
+                low = mid
+            else:
+                high = mid - 1
+        result = result[:low]
+    return result
+
+
+def normalize_passage(text, token_budget=PASSAGE_TOKEN_BUDGET):
+    truncated = bool(text) and bool(
+        TRAILING_ELLIPSIS_PATTERN.search(TAG_PATTERN.sub(" ", text))
+    )
+    return truncate_at_sentence(clean_passage(text), token_budget, truncated)
+
+
+def report_token_savings(token_budget=PASSAGE_TOKEN_BUDGET):
+    """현재 인덱스의 원문 대비 정규화 후 추정 토큰 수를 출력"""
+    from book_index import get_current_index, iter_index_chunks
+
+    index = get_current_index()
+    before = after = books = changed = 0
+    for _, chunk_data in iter_index_chunks(index):
+        for book in chunk_data.values():
+            raw = book.get("raw_contents") or book.get("contents") or ""
+            normalized = normalize_passage(raw, token_budget)
+            before += estimate_tokens(raw)
+            after += estimate_tokens(normalized)
+            books += 1
+            changed += normalized != raw
+
+    saved = before - after
+    print("\n=== 도서 소개 정규화 토큰 절감량 ===")
+    print(f"- 인덱스: {index['version'] or 'legacy'} (예산 {token_budget}토큰)")
+    print(f"- 도서: {books}권 (변경 {changed}권)")
+    print(f"- 추정 토큰: {before} -> {after}")
+    print(f"- 절감: {saved}토큰 ({saved / before * 100 if before else 0:.1f}%)")
+    return {"books": books, "changed": changed, "before": before, "after": after}
+
+
+if __name__ == "__main__":
+    report_token_savings()
@@ -0,0 +1,282 @@
+"""
+저장된 도서 메타데이터로 카탈로그를 재임베딩하는 작업.
+
+Kakao 검색을 다시 하지 않고 현재 인덱스의 청크를 하나씩 읽어 큰 배치로 임베딩한 뒤,
+index/<version>/ 에 새 인덱스를 만들고 current_index.json을 원자적으로 교체합니다.
+임베딩 결과는 (모델, 텍스트 해시) 단위로 embedding_cache.db에 저장되어,
+중단 후 재실행하거나 같은 텍스트가 다시 나오면 API를 호출하지 않습니다.
+
+사용 예:
+    PYTHONPATH=.. python reembed_books.py --passage-model embedding-passage --query-model embedding-query
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from book_index import (CATALOG_DIR, INDEX_DIR, get_current_index,
+                        iter_index_chunks, switch_current_index)
+from dotenv import load_dotenv
+from ingest_metrics import IngestMetrics
+from passage_normalizer import estimate_tokens, normalize_passage
+from tqdm import tqdm
+
+from llm import embed, is_rate_limit_error
+
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+EMBEDDING_CACHE_DB = os.path.join(CATALOG_DIR, "embedding_cache.db")
+
+metrics = IngestMetrics("reembed_books")
+
+
+class EmbeddingCache:
+    """(모델, 텍스트 해시) -> 임베딩 벡터 SQLite 캐시"""
+
+    def __init__(self, db_path=EMBEDDING_CACHE_DB):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model, texts):
+        """캐시에 있는 텍스트의 임베딩을 {텍스트: 벡터}로 반환"""
+        hashes = {self.text_hash(text): text for text in texts}
+        found = {}
+        with self.lock:
+            keys = list(hashes)
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ",".join("?" for _ in batch)
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[hashes[text_hash]] = np.frombuffer(
+                        vector, dtype=np.float32
+                    ).tolist()
+        return found
+
+    def put_many(self, model, embeddings):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) "
+                "VALUES (?, ?, ?)",
+                [
+                    (
+                        model,
+                        self.text_hash(text),
+                        np.asarray(vector, dtype=np.float32).tobytes(),
+                    )
+                    for text, vector in embeddings.items()
+                ],
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def embed_batch(texts, model, max_attempts=5):
+    """텍스트 배치를 한 번의 API 호출로 임베딩 (429 발생 시 지수 백오프)"""
+    wait_time = 1
+    for attempt in range(1, max_attempts + 1):
+        try:
+            request_start = time.time()
+            vectors = embed(texts, model)
+            metrics.record_embedding(
+                time.time() - request_start,
+                tokens=sum(estimate_tokens(text) for text in texts),
+                texts=len(texts),
+            )
+            return vectors
+        except Exception as e:
+            if attempt < max_attempts and is_rate_limit_error(e):
+                metrics.incr("retries")
+                time.sleep(wait_time)
+                wait_time *= 2
+                continue
+            raise
+
+
+def embed_texts(texts, model, cache, executor, batch_size):
+    """캐시에 없는 텍스트만 배치로 임베딩하고 (결과, 캐시 적중 수)를 반환"""
+    unique_texts = list(dict.fromkeys(texts))
+    embeddings = cache.get_many(model, unique_texts)
+    missing = [text for text in unique_texts if text not in embeddings]
+    metrics.incr("embedding_cache_hits", len(unique_texts) - len(missing))
+    metrics.incr("embedding_cache_misses", len(missing))
+
+    batches = [missing[i : i + batch_size] for i in range(0, len(missing), batch_size)]
+    for batch, vectors in zip(
+        batches, executor.map(lambda b: embed_batch(b, model), batches)
+    ):
+        new_embeddings = dict(zip(batch, vectors))
+        cache.put_many(model, new_embeddings)
+        embeddings.update(new_embeddings)
+
+    return embeddings, len(unique_texts) - len(missing)
+
+
+def reembed_catalog(
+    passage_model,
+    query_model,
+    version=None,
+    batch_size=64,
+    max_workers=4,
+    switch=True,
+):
+    """현재 인덱스의 도서 메타데이터로 새 인덱스 버전을 생성"""
+    source = get_current_index()
+    version = version or f"{passage_model}-{datetime.now():%Y%m%d%H%M%S}"
+    target_dir = os.path.join(INDEX_DIR, version)
+    if os.path.exists(target_dir):
+        raise FileExistsError(f"이미 존재하는 인덱스 버전입니다: {version}")
+
+    # 완성되기 전에는 임시 디렉토리에 기록하고, 마지막에 이름을 바꿔 공개
+    tmp_dir = f"{target_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    print("\n=== 재임베딩 시작 ===")
+    print(f"- 원본 인덱스: {source['version'] or 'legacy'} ({source['path']})")
+    print(
+        f"- 새 인덱스 버전: {version} (passage: {passage_model}, query: {query_model})"
+    )
+
+    cache = EmbeddingCache()
+    metrics.reset()
+    stats = {
+        "books": 0,
+        "skipped": 0,
+        "cache_hits": 0,
+        "chunks": 0,
+        "raw_tokens": 0,
+        "tokens": 0,
+    }
+    start_time = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for chunk_file, chunk_data in tqdm(
+                iter_index_chunks(source), desc="청크 재임베딩", unit="청크"
+            ):
+                # 원문 기준으로 다시 정규화하여 정규화 규칙 변경도 반영
+                books = {}
+                with metrics.stage("normalize", len(chunk_data)):
+                    for isbn, book in chunk_data.items():
+                        raw_contents = book.get("raw_contents") or book.get("contents")
+                        contents = normalize_passage(raw_contents or "")
+                        if contents:
+                            books[isbn] = {
+                                **book,
+                                "contents": contents,
+                                "raw_contents": raw_contents,
+                            }
+                            stats["raw_tokens"] += estimate_tokens(raw_contents)
+                            stats["tokens"] += estimate_tokens(contents)
+                stats["skipped"] += len(chunk_data) - len(books)
+                with metrics.stage("embed", len(books)):
+                    embeddings, cache_hits = embed_texts(
+                        [book["contents"] for book in books.values()],
+                        passage_model,
+                        cache,
+                        executor,
+                        batch_size,
+                    )
+                stats["cache_hits"] += cache_hits
+
+                new_chunk = {}
+                for isbn, book in books.items():
+                    new_chunk[isbn] = {
+                        **book,
+                        "embedding": embeddings[book["contents"]],
+                        "embedding_model": passage_model,
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                with metrics.stage("save", len(new_chunk)):
+                    with open(os.path.join(tmp_dir, chunk_file), "wb") as f:
+                        pickle.dump(new_chunk, f)
+                stats["books"] += len(new_chunk)
+                stats["chunks"] += 1
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    finally:
+        cache.close()
+
+    manifest = {
+        "version": version,
+        "passage_model": passage_model,
+        "query_model": query_model,
+        "source_version": source["version"],
+        "created_at": datetime.now().isoformat(),
+        **stats,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.rename(tmp_dir, target_dir)
+
+    if switch:
+        switch_current_index(version, passage_model, query_model)
+
+    print("\n=== 재임베딩 완료 ===")
+    print(f"- 청크: {stats['chunks']}개, 도서: {stats['books']}권")
+    print(f"- 내용 없음으로 제외: {stats['skipped']}권")
+    print(f"- 임베딩 캐시 적중: {stats['cache_hits']}건")
+    print(f"- 추정 토큰 (정규화 전 -> 후): {stats['raw_tokens']} -> {stats['tokens']}")
+    print(f"- 처리 시간: {time.time() - start_time:.1f}초")
+    print(f"- 활성 인덱스: {version if switch else source['version'] or 'legacy'}")
+
+    metrics.incr("raw_tokens", stats["raw_tokens"])
+    metrics.incr("normalized_tokens", stats["tokens"])
+    metrics.report(target_dir)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="도서 카탈로그 재임베딩")
+    parser.add_argument("--passage-model", default="embedding-passage")
+    parser.add_argument("--query-model", default="embedding-query")
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--no-switch",
+        action="store_true",
+        help="새 인덱스만 만들고 current_index.json은 바꾸지 않음",
+    )
+    args = parser.parse_args()
+
+    reembed_catalog(
+        args.passage_model,
+        args.query_model,
+        version=args.version,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        switch=not args.no_switch,
+    )
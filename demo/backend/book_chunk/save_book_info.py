@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 import pickle
 import time
@@ -6,21 +8,33 @@ from datetime import datetime
 import numpy as np
 import requests
 from dotenv import load_dotenv
-from openai import OpenAI
+from ingest_metrics import IngestMetrics
+from passage_normalizer import estimate_tokens, normalize_passage
 from tqdm import tqdm
 
+# backend 루트 기준 import (backend 디렉토리를 PYTHONPATH에 두고 실행)
+from llm import embed
+
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
 
 # API KEY 및 파일 경로 설정
 KAKAO_API_KEY = os.getenv("KAKAO_API_KEY")
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 BOOK_CHUNK_DIR = os.path.join(BASE_DIR, "book_chunk")
 
-# Solar Embeddings 설정
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
+# Kakao 검색 응답 디스크 캐시
+# - use: 유효한(TTL 이내) 캐시가 있으면 사용, 없으면 요청 후 저장
+# - refresh: 항상 새로 요청하고 캐시 갱신
+# - only: 캐시만 사용 (TTL 무시, 네트워크 요청 없음) - 재임베딩 시 사용
+# - off: 캐시 사용 안 함
+KAKAO_CACHE_DIR = os.path.join(BASE_DIR, "kakao_cache")
+KAKAO_CACHE_MODE = os.getenv("KAKAO_CACHE_MODE", "use")
+KAKAO_CACHE_TTL = int(os.getenv("KAKAO_CACHE_TTL", 7 * 24 * 60 * 60))
+
+# 실행 단위 수집 지표 (process_and_save_books_in_chunks 시작 시 초기화)
+metrics = IngestMetrics("save_book_info")
+# create_embedding lru_cache 적중 수 기준점
+_embedding_cache_baseline = None
 
 # 검색할 키워드 리스트 정의
 search_keywords = [
@@ -80,10 +94,43 @@ def cosine_similarity(vec1, vec2):
     return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
 
-def fetch_books_by_keyword(keyword, total_count=300):
-    """키워드로 도서를 검색하는 함수"""
+def _kakao_cache_path(params):
+    """(query, page, size, target) 조합으로 캐시 파일 경로 생성"""
+    key = json.dumps(
+        [params["query"], params["page"], params["size"], params["target"]],
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(KAKAO_CACHE_DIR, f"{digest}.json")
+
+
+def load_cached_kakao_response(params, ttl=KAKAO_CACHE_TTL):
+    """캐시된 Kakao 검색 응답을 반환 (없거나 만료되었으면 None)"""
+    cache_path = _kakao_cache_path(params)
+    try:
+        if ttl is not None and time.time() - os.path.getmtime(cache_path) > ttl:
+            return None
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_kakao_response(params, result):
+    """Kakao 검색 응답을 캐시에 저장 (임시 파일에 쓴 뒤 교체)"""
+    os.makedirs(KAKAO_CACHE_DIR, exist_ok=True)
+    cache_path = _kakao_cache_path(params)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def fetch_books_by_keyword(keyword, total_count=300, cache_mode=None):
+    """키워드로 도서를 검색하는 함수 (페이지 단위 응답 캐시 적용)"""
     url = "https://dapi.kakao.com/v3/search/book"
     headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
+    cache_mode = cache_mode or KAKAO_CACHE_MODE
 
     all_books = []
     page = 1
@@ -96,11 +143,27 @@ def fetch_books_by_keyword(keyword, total_count=300):
             "target": "title",
         }
 
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            break
+        result = None
+        if cache_mode in ("use", "only"):
+            ttl = None if cache_mode == "only" else KAKAO_CACHE_TTL
+            result = load_cached_kakao_response(params, ttl=ttl)
+            if result is not None:
+                metrics.incr("kakao_cache_hits")
+
+        if result is None:
+            if cache_mode == "only":
+                break
+
+            with metrics.stage("kakao_http"):
+                response = requests.get(url, headers=headers, params=params)
+            metrics.incr("kakao_requests")
+            if response.status_code != 200:
+                break
+
+            result = response.json()
+            if cache_mode != "off":
+                save_kakao_response(params, result)
 
-        result = response.json()
         books = result.get("documents", [])
         if not books:
             break
@@ -121,12 +184,13 @@ def create_embedding(text, max_retries=3, base_timeout=10):
         start_time = time.time()
         timeout = base_timeout * (attempt + 1)  # 재시도마다 타임아웃 증가
 
+        if attempt > 0:
+            metrics.incr("retries")
         try:
-            embedding_response = solar_client.embeddings.create(
-                input=text, model="embedding-passage"
-            )
+            embedding = embed(text, model="embedding-passage")[0]
 
             processing_time = time.time() - start_time
+            metrics.record_embedding(processing_time, tokens=estimate_tokens(text))
             if processing_time > timeout:
                 print(
                     f"\n경고: 임베딩 처리 시간 초과 ({processing_time:.2f}초), 재시도 {attempt + 1}/{max_retries}"
@@ -134,7 +198,7 @@ def create_embedding(text, max_retries=3, base_timeout=10):
                 continue
 
             # 캐싱을 위해 tuple로 변환
-            return tuple(embedding_response.data[0].embedding)
+            return tuple(embedding)
 
         except Exception as e:
             print(f"\n임베딩 생성 중 오류 발생 ({attempt + 1}/{max_retries}): {str(e)}")
@@ -191,6 +255,10 @@ def process_and_save_books_in_chunks():
     # 저장 디렉토리 생성
     os.makedirs(BOOK_CHUNK_DIR, exist_ok=True)
 
+    global _embedding_cache_baseline
+    metrics.reset()
+    _embedding_cache_baseline = create_embedding.cache_info()
+
     print("\n=== 도서 정보 수집 시작 ===")
     print(f"청크 크기: {chunk_size}")
 
@@ -226,7 +294,9 @@ def process_and_save_books_in_chunks():
             keyword_stats[keyword] = {"total": 0, "new": 0, "processed": 0}
 
             # 키워드로 도서 검색
+            fetch_start = time.time()
             books = fetch_books_by_keyword(keyword)
+            metrics.add_stage("fetch", len(books), fetch_start, time.time())
             keyword_stats[keyword]["total"] = len(books)
             print(f"- 검색된 도서: {len(books)}개")
 
@@ -295,6 +365,16 @@ def process_and_save_books_in_chunks():
         print(f"- 전체 저장된 도서: {len(processed_isbns)}개")
         print(f"- 생성된 청크 파일 수: {chunk_number}개")
 
+        cache_info = create_embedding.cache_info()
+        metrics.incr(
+            "embedding_cache_hits", cache_info.hits - _embedding_cache_baseline.hits
+        )
+        metrics.incr(
+            "embedding_cache_misses",
+            cache_info.misses - _embedding_cache_baseline.misses,
+        )
+        metrics.report(BOOK_CHUNK_DIR)
+
 
 def find_similar_books(query_text, top_k=5):
     """쿼리와 가장 유사한 도서를 찾는 함수"""
@@ -325,7 +405,12 @@ def process_single_book(book, max_retries=3):
     if not isbn:
         return None, "skip"
 
-    contents = book.get("contents", "")
+    raw_contents = book.get("contents", "")
+    # 엔티티/머리표 정리 및 토큰 예산에 맞춘 문장 단위 자르기
+    with metrics.stage("normalize", items=1):
+        contents = normalize_passage(raw_contents)
+    metrics.incr("raw_tokens", estimate_tokens(raw_contents))
+    metrics.incr("normalized_tokens", estimate_tokens(contents))
     if not contents:
         return None, "skip"
 
@@ -339,6 +424,7 @@ def process_single_book(book, max_retries=3):
                 "authors": book.get("authors"),
                 "publisher": book.get("publisher"),
                 "contents": contents,
+                "raw_contents": raw_contents,
                 "thumbnail": book.get("thumbnail"),
                 "embedding": list(embedding),  # tuple을 list로 변환
                 "timestamp": datetime.now().isoformat(),
@@ -349,6 +435,7 @@ def process_single_book(book, max_retries=3):
         print(
             f"\n임베딩 생성 실패 ({attempt + 1}/{max_retries}){', 재시도 중...' if attempt < max_retries - 1 else ', 최대 시도 횟수 초과'}"
         )
+        # 재시도 횟수는 실제 API를 다시 호출하는 create_embedding()에서만 집계
         if attempt < max_retries - 1:
             time.sleep(1)
 
@@ -367,6 +454,7 @@ def process_chunk(books):
 
     # 시스템 CPU 코어 수에 따라 worker 수 조정
     max_workers = min(os.cpu_count() or 4, 8)  # 최대 8개
+    chunk_start = time.time()
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         # 배치 크기 조정
@@ -398,6 +486,11 @@ def process_chunk(books):
                     print(f"\n도서 처리 중 오류 발생: {str(e)}")
                     timeout_count += 1
 
+    metrics.add_stage("embed", total_books, chunk_start, time.time())
+    metrics.incr("success", success_count)
+    metrics.incr("skip", skip_count)
+    metrics.incr("timeout", timeout_count)
+
     # 처리 결과 출력
     print(f"\n청크 처리 결과:")
     print(f"- 전체 도서: {total_books}권")
@@ -412,8 +505,9 @@ def save_chunk(books_chunk, chunk_number):
     """청크 데이터를 파일로 저장하는 함수"""
     if books_chunk:  # 청크에 데이터가 있는 경우에만 저장
         chunk_filename = os.path.join(BOOK_CHUNK_DIR, f"books_chunk_{chunk_number}.pkl")
-        with open(chunk_filename, "wb") as f:
-            pickle.dump(books_chunk, f)
+        with metrics.stage("save", items=len(books_chunk)):
+            with open(chunk_filename, "wb") as f:
+                pickle.dump(books_chunk, f)
         print(f"청크 {chunk_number} 저장 완료 (도서 {len(books_chunk)}개)")
 
 
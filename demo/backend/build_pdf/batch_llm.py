@@ -0,0 +1,236 @@
+"""
+보고서 생성에 필요한 LLM 호출을 미리 배치로 실행하는 도구.
+
+1. plan: 보고서 생성 코드를 계획 모드로 실행해 캐시에 없는 호출(톤 정규화, 요약, 약점 분석,
+   도서 요약, 이메일 템플릿)을 작업 파일(work.jsonl)에 기록합니다. 작업 id는 LLM 캐시 키라서
+   같은 입력은 항상 같은 id를 갖고, 이미 기록된 작업은 다시 추가하지 않습니다.
+   앞 호출의 결과가 있어야 알 수 있는 호출(번역, 도서 요약 등)은 다음 plan에서 기록됩니다.
+2. run: 작업 파일을 지정한 동시성으로 실행하고 결과를 id 기준 샤드 파일(results/shard-NNN.jsonl)에
+   한 줄씩 추가합니다. 이미 결과가 있는 작업은 건너뛰므로 중단 후 다시 실행하면 이어서 처리하며,
+   --shard-index를 주면 해당 샤드의 작업만 실행합니다 (여러 대/여러 밤에 나눠 실행).
+3. 렌더링: LLM_BATCH_DIR을 지정하고 pdf.py / make_pdf.py를 실행하면 결과를 캐시에 적재한 뒤
+   API 대신 배치 결과를 사용합니다.
+
+사용 예 (backend 디렉토리를 PYTHONPATH에 두고 실행):
+    PYTHONPATH=.. python batch_llm.py all --concurrency 8
+    PYTHONPATH=.. python batch_llm.py plan --stage report
+    PYTHONPATH=.. python batch_llm.py run --shards 4 --shard-index 0
+    LLM_BATCH_DIR=batch PYTHONPATH=.. python make_pdf.py
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from book_recommendation import get_book_recommendation
+from feedback_summary import build_report_content
+from load_book_chunk import load_all_book_chunks
+from mail_service.send_email import generate_email_content
+
+from db.models.pdf import (
+    RESULT_DB_PATH,
+    get_feedback_connection,
+    get_long_answer_question_ids,
+    init_result_db,
+    load_subjective_answers,
+    normalize_user_answers,
+    process_feedback_data,
+)
+from llm import (
+    LLM_MAX_CONCURRENCY,
+    PlannedCall,
+    batch_planner,
+    complete,
+    invoke,
+    ledger_context,
+    ledger_stage,
+    load_batch_results,
+    retry_on_rate_limit,
+)
+from llm.batch import read_jsonl, result_paths
+
+BATCH_DIR = os.getenv(
+    "LLM_BATCH_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch")
+)
+STAGES = ["tone", "report", "email"]
+# 단계별 plan/run 최대 반복 횟수 (번역, map-reduce, 도서 요약처럼 앞 결과에 의존하는 호출)
+MAX_PASSES = 6
+
+
+def work_path(batch_dir):
+    return os.path.join(batch_dir, "work.jsonl")
+
+
+def shard_of(item_id, shards):
+    return int(item_id[:8], 16) % shards
+
+
+def ignore_planned(func, *args):
+    """계획 중에는 캐시에 없는 호출에서 멈추므로 PlannedCall은 무시"""
+    try:
+        return func(*args)
+    except PlannedCall:
+        return None
+
+
+def plan_tone():
+    fb_conn = get_feedback_connection()
+    try:
+        question_ids = get_long_answer_question_ids(fb_conn)
+        answers_by_user = load_subjective_answers(fb_conn, question_ids)
+    finally:
+        fb_conn.close()
+    for answers_by_question in answers_by_user.values():
+        ignore_planned(normalize_user_answers, answers_by_question)
+
+
+def plan_report():
+    # make_pdf는 import 시 폰트를 등록하므로 report 단계에서만 import
+    from make_pdf import fetch_data
+
+    load_all_book_chunks()
+    users_data = fetch_data()
+
+    def plan_user(user_data):
+        ignore_planned(
+            build_report_content, user_data["scores"], user_data["team_opinion"]
+        )
+        if user_data.get("lowest_keyword"):
+            ignore_planned(
+                get_book_recommendation,
+                user_data["username"],
+                user_data["lowest_keyword"],
+            )
+
+    # 도서 검색용 임베딩은 캐시 대상이 아니므로 계획 중에도 실제로 호출됨
+    with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as executor:
+        list(executor.map(plan_user, users_data))
+
+
+def plan_email():
+    ignore_planned(generate_email_content)
+
+
+PLANNERS = {"tone": plan_tone, "report": plan_report, "email": plan_email}
+
+
+def plan(stage, batch_dir=BATCH_DIR):
+    """stage의 캐시 미스를 작업 파일에 추가 (반환: 새로 추가한 작업 수)"""
+    os.makedirs(batch_dir, exist_ok=True)
+    load_batch_results(batch_dir)
+    known = {item["id"] for item in read_jsonl(work_path(batch_dir))}
+
+    with batch_planner.recording() as items, ledger_context(stage=f"plan:{stage}"):
+        PLANNERS[stage]()
+
+    new_items = [item for item_id, item in items.items() if item_id not in known]
+    with open(work_path(batch_dir), "a", encoding="utf-8") as f:
+        for item in new_items:
+            f.write(json.dumps({**item, "stage": stage}, ensure_ascii=False) + "\n")
+    print(f"[plan:{stage}] 캐시 미스 {len(items)}개, 새 작업 {len(new_items)}개")
+    return len(new_items)
+
+
+@ledger_stage("batch")
+def execute(item):
+    call = item["call"]
+    if call["kind"] == "invoke":
+        return retry_on_rate_limit(
+            invoke, item["prompt_id"], call["variables"], cache_mode="off"
+        )
+    return retry_on_rate_limit(
+        complete,
+        call["prompt"],
+        model=item["model"],
+        prompt_id=item["prompt_id"],
+        cache_mode="off",
+        **call["kwargs"],
+    )
+
+
+def run(
+    batch_dir=BATCH_DIR, concurrency=LLM_MAX_CONCURRENCY, shards=1, shard_index=None
+):
+    """결과가 없는 작업을 실행해 샤드 파일에 추가 (반환: (성공 수, 실패 수))"""
+    done = {
+        result["id"] for path in result_paths(batch_dir) for result in read_jsonl(path)
+    }
+    pending = [
+        item
+        for item in read_jsonl(work_path(batch_dir))
+        if item["id"] not in done
+        and (shard_index is None or shard_of(item["id"], shards) == shard_index)
+    ]
+    print(f"[run] 작업 {len(pending)}개 실행 (완료된 작업 {len(done)}개 건너뜀)")
+    if not pending:
+        return 0, 0
+
+    os.makedirs(os.path.join(batch_dir, "results"), exist_ok=True)
+    write_lock = threading.Lock()
+    succeeded, failed = 0, 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(execute, item): item for item in pending}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                response = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[run] {item['prompt_id']} {item['id'][:12]} 실패: {e}")
+                continue
+            result = {
+                key: item[key] for key in ("id", "model", "prompt_id", "prompt_hash")
+            }
+            result.update(params=item["params"], response=response)
+            path = os.path.join(
+                batch_dir, "results", f"shard-{shard_of(item['id'], shards):03d}.jsonl"
+            )
+            # 한 줄씩 바로 기록해 중단되어도 완료된 결과는 남김
+            with write_lock, open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            succeeded += 1
+    print(
+        f"[run] 성공 {succeeded} / 실패 {failed} ({time.perf_counter() - start:.1f}초)"
+    )
+    return succeeded, failed
+
+
+def run_all(batch_dir=BATCH_DIR, concurrency=LLM_MAX_CONCURRENCY, shards=1):
+    """단계마다 새 작업이 없을 때까지 plan -> run 반복"""
+    for stage in STAGES:
+        if stage == "report" and not os.path.exists(RESULT_DB_PATH):
+            # 톤 정규화 결과가 모두 캐시에 있으므로 API 호출 없이 result.db 생성
+            init_result_db()
+            process_feedback_data()
+        for _ in range(MAX_PASSES):
+            if not plan(stage, batch_dir):
+                break
+            _, failed = run(batch_dir, concurrency, shards)
+            if failed:
+                print(f"[{stage}] 실패한 작업이 있어 중단, 다시 실행하면 이어서 처리")
+                return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="보고서 LLM 호출 배치 실행")
+    parser.add_argument("command", choices=["plan", "run", "all"])
+    parser.add_argument("--stage", choices=STAGES, help="plan할 단계")
+    parser.add_argument("--batch-dir", default=BATCH_DIR)
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument("--shards", type=int, default=1, help="결과 샤드 수")
+    parser.add_argument(
+        "--shard-index", type=int, default=None, help="이 샤드의 작업만 실행"
+    )
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        for stage in [args.stage] if args.stage else STAGES:
+            plan(stage, args.batch_dir)
+    elif args.command == "run":
+        run(args.batch_dir, args.concurrency, args.shards, args.shard_index)
+    else:
+        run_all(args.batch_dir, args.concurrency, args.shards)
@@ -1,23 +1,20 @@
 import os
 import pickle
 import sqlite3
-import time
 
 import numpy as np
-from db.models.qa import DB_PATH as FEEDBACK_DB_PATH
 from dotenv import load_dotenv
-from load_book_chunk import BOOK_CHUNK_CACHE
-from openai import OpenAI
+from load_book_chunk import BOOK_CHUNK_CACHE, BOOK_INDEX_INFO
+
+from book_chunk.passage_normalizer import normalize_passage
+from build_pdf.map_reduce_summary import condense_feedback
+from db.models.qa import DB_PATH as FEEDBACK_DB_PATH
+from llm import complete, embed, ledger_context, ledger_stage, retry_on_rate_limit
 
 load_dotenv(
     os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
 )
 
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
-
 BOOK_CHUNK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "book_chunk")
 
 
@@ -25,27 +22,7 @@ def cosine_similarity(vec1, vec2):
     return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
 
-# --- API 호출 재시도 helper 함수 ---
-def retry_api_call(api_func, *args, max_attempts=3, **kwargs):
-    """API 호출 시 RateLimit (429) 에러에 대해 지수 백오프를 적용하여 재시도"""
-    attempt = 0
-    wait_time = 1
-    last_exception = None
-    while attempt < max_attempts:
-        attempt += 1
-        try:
-            return api_func(*args, **kwargs)
-        except Exception as e:
-            last_exception = e
-            # 메시지나 에러 코드에 '429' 또는 'too_many_requests'가 포함되면 재시도
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-            else:
-                raise
-    raise last_exception
-
-
+@ledger_stage("book_query")
 def analyze_feedback_with_solar(feedback_text):
     prompt = f"""
 다음은 한 직원이 가장 낮은 평가를 받은 항목에 대한 동료들의 피드백입니다:
@@ -59,13 +36,7 @@ def analyze_feedback_with_solar(feedback_text):
 - "직장 내에서 시간 관리와 업무 우선순위 설정 능력이 부족한 사람을 위한 책"
 - "직장 내에서 팀원들과 협업하는 능력이 부족한 사람을 위한 책"
 """
-    response = retry_api_call(
-        solar_client.chat.completions.create,
-        model="solar-pro",
-        messages=[{"role": "user", "content": prompt}],
-        stream=False,
-    )
-    return response.choices[0].message.content
+    return retry_on_rate_limit(complete, prompt, prompt_id="book_query", max_attempts=3)
 
 
 def find_lowest_keyword(scores, team_average):
@@ -87,7 +58,10 @@ def find_lowest_keyword(scores, team_average):
     return selected_keyword
 
 
+@ledger_stage("book_summary")
 def summarize_book_content(content):
+    # 이전 버전 인덱스의 원문 contents도 요약 전에 정규화
+    content = normalize_passage(content)
     try:
         prompt = f"""
 아래의 책의 내용을 읽고 핵심 내용을 요약해주세요
@@ -99,14 +73,9 @@ def summarize_book_content(content):
 2. 간결하고 명확하게 작성할 것
 3. 공백 포함 최대 300자 내로 요약할 것
 """
-        response = retry_api_call(
-            solar_client.chat.completions.create,
-            model="solar-pro",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-            timeout=10,
-        )
-        summary = response.choices[0].message.content.strip()
+        summary = retry_on_rate_limit(
+            complete, prompt, prompt_id="book_summary", max_attempts=3, timeout=10
+        ).strip()
         return summary
     except Exception as e:
         print(f"책 내용 요약 중 오류 발생: {str(e)}")
@@ -134,21 +103,28 @@ def get_book_recommendation(username, lowest_keyword):
         if not feedback_results:
             print(f"[{username}] 주관식 피드백이 없습니다.")
             return None
-        all_feedback = f"[{lowest_keyword}]\n"
-        for question, answer in feedback_results:
-            all_feedback += f"질문: {question}\n"
-            all_feedback += f"답변: {answer}\n"
+        entries = [
+            f"질문: {question}\n답변: {answer}\n"
+            for question, answer in feedback_results
+        ]
+        # 평가자가 많아 토큰 예산을 넘으면 나눠서 부분 요약한 뒤 분석
+        condensed = condense_feedback(entries)
+        if condensed is not entries:
+            entries = [f"{summary}\n" for summary in condensed]
+        all_feedback = f"[{lowest_keyword}]\n" + "".join(entries)
         detail_query = analyze_feedback_with_solar(all_feedback)
         print(f"[{username}] AI 분석 결과: {detail_query}")
         print(f"\n[{username}] '{lowest_keyword}' 키워드에 대한 도서 검색 시작...")
         try:
-            query_embedding_response = retry_api_call(
-                solar_client.embeddings.create,
-                input=detail_query,
-                model="embedding-query",
-                timeout=5,
-            )
-            query_embedding = query_embedding_response.data[0].embedding
+            with ledger_context(stage="book_embedding"):
+                query_embedding = retry_on_rate_limit(
+                    embed,
+                    detail_query,
+                    # 인덱스를 만든 passage 모델과 짝이 맞는 query 모델 사용
+                    model=BOOK_INDEX_INFO["query_model"],
+                    max_attempts=3,
+                    timeout=5,
+                )[0]
         except Exception as e:
             print(f"[{username}] 쿼리 임베딩 생성 실패: {str(e)}")
             return None
@@ -158,7 +134,7 @@ def get_book_recommendation(username, lowest_keyword):
 
         print(f"[{username}] 책 청크 캐시에서 검색 중...")
         # BOOK_CHUNK_CACHE (load_book_chunk.py에서 미리 로드됨)을 사용하여 디스크 I/O를 줄임
-        for chunk_file, chunk_data in BOOK_CHUNK_CACHE.items():
+        for chunk_file, chunk_data in list(BOOK_CHUNK_CACHE.items()):
             if not isinstance(chunk_data, dict):
                 continue
             for book_data in chunk_data.values():
@@ -0,0 +1,166 @@
+"""
+한줄 평가 생성 방식(translate / direct) 비교 도구.
+
+result.db의 사용자 점수(또는 무작위 점수)로 두 방식을 모두 실행해 지연 시간과
+간단한 품질 지표(한글 비율, 숫자 포함 여부, 길이, 줄 수)를 비교하고,
+두 방식의 결과 문장을 나란히 JSON으로 저장합니다.
+
+사용 예 (backend 디렉토리를 PYTHONPATH에 두고 실행):
+    PYTHONPATH=.. python compare_assessment_modes.py --sample 10 --no-cache
+    PYTHONPATH=.. python compare_assessment_modes.py --synthetic 20 --seed 0
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+import llm.cache
+import numpy as np
+from feedback_summary import (
+    get_keywords,
+    print_regeneration_stats,
+    summarize_multiple,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_DB_PATH = os.path.join(BASE_DIR, "db/result.db")
+REPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "comparisons")
+MODES = ["translate", "direct"]
+
+
+def load_score_vectors(sample, seed):
+    """result.db multiple 테이블에서 사용자 점수를 make_pdf.py와 같은 형식으로 로드"""
+    conn = sqlite3.connect(RESULT_DB_PATH)
+    try:
+        cur = conn.execute("SELECT * FROM multiple WHERE to_username != 'average'")
+        columns = [d[0] for d in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+    score_columns = [
+        col
+        for col in columns
+        if col not in ("id", "to_username", "총합", "등급", "created_at")
+    ]
+    random.Random(seed).shuffle(rows)
+    return [
+        (row["to_username"], [[col, row[col]] for col in score_columns])
+        for row in rows[:sample]
+    ]
+
+
+def synthetic_score_vectors(count, seed):
+    """키워드별 1~5점 사이 무작위 점수 생성"""
+    rng = random.Random(seed)
+    return [
+        (
+            f"synthetic{i + 1}",
+            [[k, round(rng.uniform(1, 5), 2)] for k in get_keywords()],
+        )
+        for i in range(count)
+    ]
+
+
+def text_metrics(text):
+    letters = [ch for ch in text if not ch.isspace()]
+    hangul = sum(1 for ch in letters if "가" <= ch <= "힣")
+    return {
+        "chars": len(text),
+        "lines": len([line for line in text.splitlines() if line.strip()]),
+        "hangul_ratio": round(hangul / len(letters), 3) if letters else 0.0,
+        "has_digit": any(ch.isdigit() for ch in text),
+    }
+
+
+def compare(score_vectors):
+    results = []
+    for name, scores in score_vectors:
+        result = {"name": name, "scores": scores}
+        for mode in MODES:
+            start = time.perf_counter()
+            text = summarize_multiple(scores, mode=mode)
+            result[mode] = {
+                "text": text,
+                "latency": round(time.perf_counter() - start, 3),
+                **text_metrics(text),
+            }
+        results.append(result)
+        print(f"\n[{name}]")
+        for mode in MODES:
+            print(f"- {mode} ({result[mode]['latency']:.2f}초): {result[mode]['text']}")
+    return results
+
+
+def summarize_results(results):
+    summary = {}
+    for mode in MODES:
+        latencies = np.array([r[mode]["latency"] for r in results])
+        summary[mode] = {
+            "latency_p50": round(float(np.percentile(latencies, 50)), 3),
+            "latency_p95": round(float(np.percentile(latencies, 95)), 3),
+            "mean_chars": round(float(np.mean([r[mode]["chars"] for r in results])), 1),
+            "mean_hangul_ratio": round(
+                float(np.mean([r[mode]["hangul_ratio"] for r in results])), 3
+            ),
+            "digit_rate": round(
+                float(np.mean([r[mode]["has_digit"] for r in results])), 3
+            ),
+        }
+    return summary
+
+
+def print_summary(summary, count):
+    print(f"\n=== 한줄 평가 방식 비교 ({count}명) ===")
+    print(
+        f"{'방식':<12}{'p50(초)':>10}{'p95(초)':>10}{'평균 글자':>10}"
+        f"{'한글 비율':>10}{'숫자 포함':>10}"
+    )
+    for mode, stats in summary.items():
+        print(
+            f"{mode:<12}{stats['latency_p50']:>10.2f}{stats['latency_p95']:>10.2f}"
+            f"{stats['mean_chars']:>10.1f}{stats['mean_hangul_ratio']:>10.3f}"
+            f"{stats['digit_rate']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="한줄 평가 생성 방식 비교")
+    parser.add_argument("--sample", type=int, default=10, help="result.db 사용자 수")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="result.db 대신 무작위 점수 개수"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="LLM 캐시를 사용하지 않음 (지연 시간 비교 시 권장)",
+    )
+    args = parser.parse_args()
+
+    if args.no_cache:
+        llm.cache.LLM_CACHE_MODE = "off"
+
+    if args.synthetic:
+        score_vectors = synthetic_score_vectors(args.synthetic, args.seed)
+    else:
+        score_vectors = load_score_vectors(args.sample, args.seed)
+
+    results = compare(score_vectors)
+    summary = summarize_results(results)
+    print_summary(summary, len(results))
+    print_regeneration_stats()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(
+        REPORT_DIR, f"assessment_modes_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"summary": summary, "results": results}, f, ensure_ascii=False, indent=2
+        )
+    print(f"\n비교 결과 저장: {path}")
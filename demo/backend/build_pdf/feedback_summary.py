@@ -1,93 +1,173 @@
+import ast
+import json
+import math
 import os
 import re
 import sqlite3
-import time
+import threading
+from collections import Counter
 
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
-from langchain_upstage import (ChatUpstage, UpstageDocumentParseLoader,
-                               UpstageEmbeddings)
+from build_pdf.map_reduce_summary import condense_feedback
+from llm import PlannedCall, invoke, ledger_stage, retry_on_rate_limit
 
+# 보고서 텍스트(한줄 평가, 주관식 요약) 생성 방식
+# - multi: 한줄 평가(생성 + 번역)와 질문별 요약을 각각 호출
+# - single: JSON 스키마로 제한한 한 번의 호출로 모든 텍스트 생성
+REPORT_CONTENT_MODE = os.getenv("REPORT_CONTENT_MODE", "multi")
 
-def summarize_multiple(data_list):
-    """
-    객관식 문항 요약 함수
-    """
+# 한줄 평가 생성 방식
+# - translate: 영어로 생성한 뒤 solar-1-mini-translate-enko로 번역 (호출 2회)
+# - direct: 한국어 프롬프트로 바로 생성 (호출 1회)
+ASSESSMENT_MODE = os.getenv("ASSESSMENT_MODE", "translate")
 
-    # 리스트를 딕셔너리로 변환
-    data_dict = dict(data_list)
+# 한줄 평가 점수 구간화 방식
+# - exact: 사용자별 점수를 그대로 프롬프트에 넣음 (사용자마다 호출)
+# - bucket: 최고/최저 키워드와 SCORE_BUCKET_STEP 단위로 반올림한 점수가 같은 사용자끼리
+#   한 번 생성한 평가를 재사용 (호출 수가 인원이 아니라 점수 분포의 다양성에 비례)
+SCORE_BUCKET_MODE = os.getenv("SCORE_BUCKET_MODE", "exact")
+SCORE_BUCKET_STEP = float(os.getenv("SCORE_BUCKET_STEP", 0.5))
 
-    llm = ChatUpstage()
-    enko_translation = ChatUpstage(model="solar-1-mini-translate-enko")
-    prompt_template = PromptTemplate.from_template(
-        """
-        The numbers below are assessments of someone's competence.
-        Write a 3-line description based on the scores below. But please exclude the scores from the description.
-        ---
-        TEXT: {text}
-        """
-    )
-    chat_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("human", "{text}"),
-        ]
-    )
-    llm_chain = prompt_template | llm | StrOutputParser()
+# 보고서 텍스트 호출의 429 최대 시도 횟수 (계속 한도 초과면 기본 문장 사용,
+# 요청 한도가 풀리지 않아도 보고서 생성이 끝나도록)
+REPORT_MAX_ATTEMPTS = int(os.getenv("REPORT_MAX_ATTEMPTS", 5))
 
-    # Get connection to feedback.db
-    conn = sqlite3.connect(
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "db/feedback.db")
-    )
-    cur = conn.cursor()
+# 검증 실패 시 (로컬 복구도 안 되면) 다시 생성하는 최대 횟수, 이후에는 대체 문장 사용
+SUMMARY_MAX_REGENERATIONS = int(os.getenv("SUMMARY_MAX_REGENERATIONS", 2))
+
+# 요약 호출별 재생성 횟수와 결과 (ok / repaired / fallback) 기록
+_stats_lock = threading.Lock()
+regeneration_stats = Counter()
+
+# 문항 정보는 처음 한 번만 조회 (계속 실행되는 precompute.py는 주기마다 refresh)
+_keyword_lock = threading.Lock()
+_keyword_pairs = None
+
+# 점수 구간별로 생성한 한줄 평가 ((구간, 생성 방식) -> 평가)
+_bucket_lock = threading.Lock()
+_bucket_locks = {}
+bucket_summaries = {}
 
-    # Get keywords from feedback_questions table
-    cur.execute(
-        "SELECT keyword, question_text FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+
+def get_keyword_pairs(refresh=False):
+    """(키워드, 질문) 목록 (refresh=True면 관리자가 수정한 문항을 다시 조회)"""
+    global _keyword_pairs
+    if _keyword_pairs is None or refresh:
+        with _keyword_lock:
+            if _keyword_pairs is None or refresh:
+                # Get connection to feedback.db
+                conn = sqlite3.connect(
+                    os.path.join(
+                        os.path.dirname(os.path.dirname(__file__)), "db/feedback.db"
+                    )
+                )
+                try:
+                    # Get keywords from feedback_questions table
+                    keyword_pairs = conn.execute(
+                        "SELECT keyword, question_text FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+                    ).fetchall()
+                finally:
+                    conn.close()
+                if keyword_pairs != _keyword_pairs:
+                    # 점수 구간별 한줄 평가는 문항 텍스트로 만들었으므로 함께 비움
+                    with _bucket_lock:
+                        bucket_summaries.clear()
+                    _keyword_pairs = keyword_pairs
+    return _keyword_pairs
+
+
+def get_keywords():
+    """객관식 문항의 키워드 목록 (문항 순서, 중복 제거)"""
+    return list(dict.fromkeys(keyword for keyword, _ in get_keyword_pairs()))
+
+
+def build_score_text(data_list):
+    # 점수는 키워드별 평균이므로 (키워드, 점수) 순서대로 프롬프트에 넣음
+    keywords = set(get_keywords())
+    solar_text_lines = [
+        f"{keyword}: {value}"
+        for keyword, value in data_list
+        if keyword in keywords and value is not None
+    ]
+
+    return "\n    " + "\n    ".join(solar_text_lines)
+
+
+def score_bucket(data_list, step=None):
+    """
+    점수를 구간 키로 변환: 가장 높은/낮은 키워드 + step 단위로 반올림한 점수
+    (키워드, 반올림 점수)를 최고 키워드, 나머지(점수 높은 순), 최저 키워드 순서로 반환하며
+    같은 키를 가진 사용자는 같은 한줄 평가를 받음
+    """
+    step = step or SCORE_BUCKET_STEP
+    keywords = get_keywords()
+    scores = [
+        (keyword, float(value))
+        for keyword, value in data_list
+        if keyword in keywords and value is not None
+    ]
+    if not scores:
+        return ()
+    # 순위는 원래 점수로 정하고, 중간 키워드는 반올림 점수만 반영
+    ranked = sorted(scores, key=lambda item: (-item[1], keywords.index(item[0])))
+    levels = {
+        keyword: round(math.floor(value / step + 0.5) * step, 2)
+        for keyword, value in scores
+    }
+    middle = sorted(
+        (keyword for keyword, _ in ranked[1:-1]),
+        key=lambda keyword: (-levels[keyword], keywords.index(keyword)),
     )
-    keyword_pairs = cur.fetchall()
-    conn.close()
+    order = [ranked[0][0], *middle] + ([ranked[-1][0]] if len(ranked) > 1 else [])
+    return tuple((keyword, levels[keyword]) for keyword in order)
 
-    # Build the solar_text dynamically
-    solar_text_lines = []
-    for keyword, question_text in keyword_pairs:
-        value = data_dict.get(question_text)
-        if value is not None:
-            solar_text_lines.append(f"{keyword}: {value}")
 
-    solar_text = "\n    " + "\n    ".join(solar_text_lines)
+@ledger_stage("assessment")
+def summarize_multiple(data_list, mode=None, bucket_mode=None):
+    """
+    객관식 문항 요약 함수
+    """
+    mode = mode or ASSESSMENT_MODE
+    if (bucket_mode or SCORE_BUCKET_MODE) == "bucket":
+        return summarize_score_bucket(score_bucket(data_list), mode)
+    return generate_assessment(build_score_text(data_list), mode)
+
+
+def summarize_score_bucket(bucket, mode):
+    """같은 점수 구간은 한 번만 생성 (동시에 들어온 같은 구간 요청은 먼저 온 생성을 기다림)"""
+    key = (bucket, mode)
+    with _bucket_lock:
+        lock = _bucket_locks.setdefault(key, threading.Lock())
+    with lock:
+        summary = bucket_summaries.get(key)
+        with _stats_lock:
+            regeneration_stats[
+                ("score_bucket", "hits" if summary is not None else "misses")
+            ] += 1
+        if summary is None:
+            summary = generate_assessment(build_score_text(bucket), mode)
+            bucket_summaries[key] = summary
+    return summary
 
-    # 지수 백오프를 적용하는 while 루프
-    wait_time = 1
-    while True:
-        try:
-            response = llm_chain.invoke({"text": solar_text})
-        except Exception as e:
-            # 에러 메시지에 429 또는 too_many_requests 가 포함되면 백오프 적용
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-                continue
-            else:
-                raise
-        # 응답에 숫자가 포함되지 않으면 성공으로 간주
-        if not re.search(r"\d", response):
-            break
-    # 번역 체인에도 동일하게 적용 (필요 시)
-    wait_time = 1
-    translate_chain = chat_prompt | enko_translation | StrOutputParser()
-    while True:
-        try:
-            trans_response = translate_chain.invoke({"text": response})
-        except Exception as e:
-            if "429" in str(e) or "too_many_requests" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-                continue
-            else:
-                raise
-        break
 
-    return trans_response
+def generate_assessment(solar_text, mode):
+    """점수 텍스트로 한줄 평가 생성 (direct: 한국어로 바로 생성, translate: 영어 생성 후 번역)"""
+    # 응답에 숫자(점수)가 포함되지 않아야 함
+    response = generate_validated(
+        "multiple_summary_ko" if mode == "direct" else "multiple_summary",
+        {"text": solar_text},
+        r"\d",
+        repair=lambda text: repair_summary_text(text, r"\d"),
+        fallback=lambda text: " ".join(re.sub(r"\d+(\.\d+)?", "", text).split()),
+    )
+    if mode == "direct":
+        return response
+    # 번역 체인에도 429 백오프 적용
+    return retry_on_rate_limit(
+        invoke,
+        "translate_enko",
+        {"text": response},
+        max_attempts=REPORT_MAX_ATTEMPTS,
+    )
 
 
 def summarize_subjective(data_list):
@@ -98,37 +178,280 @@ def summarize_subjective(data_list):
     # 리스트를 딕셔너리로 변환
     data_dict = dict(data_list)
 
-    llm = ChatUpstage()
-    prompt_template = PromptTemplate.from_template(
-        """
-        너는 훌륭한 요약 전문가야.
-        아래는 개인이 받은 능력 평가야. 이 내용을 바탕으로 장점 또는 개선할 점을 포함해 1~2줄 요약해줘.
-        공식문서 말투로 작성해줘. 답변에 ':'을 넣지 마.
-        ---
-        TEXT: {text}
-        """
-    )
-    llm_chain = prompt_template | llm | StrOutputParser()
-
     responses = []
 
     # 'q_'로 시작하는 키들을 찾아 하나씩 LLM에게 전달
     for idx, key in enumerate(sorted(data_dict.keys())):
         if key.startswith("q_"):
-            solar_text = f"characteristic{idx + 1}: {data_dict[key]}"
-            wait_time = 1
-            while True:
-                try:
-                    response = llm_chain.invoke({"text": solar_text})
-                except Exception as e:
-                    if "429" in str(e) or "too_many_requests" in str(e):
-                        time.sleep(wait_time)
-                        wait_time *= 2
-                        continue
-                    else:
-                        raise
-                if not re.search(":", response):
-                    break
+            response = summarize_subjective_answer(idx, data_dict[key])
             responses.append({"question": key, "response": response})
 
     return responses
+
+
+@ledger_stage("subjective_summary")
+def summarize_subjective_answer(idx, answers):
+    """질문 하나의 답변 목록을 1~2줄로 요약"""
+    solar_text = f"characteristic{idx + 1}: {condense_answers(answers)}"
+    # 응답에 ':'이 포함되지 않아야 함
+    return generate_validated(
+        "subjective_summary",
+        {"text": solar_text},
+        ":",
+        repair=repair_colon_text,
+        fallback=lambda text: " ".join(text.replace(":", " ").split()),
+    )
+
+
+def generate_validated(prompt_id, variables, forbidden, repair, fallback):
+    """
+    forbidden 패턴이 없는 응답을 생성
+    1. 응답에 패턴이 있으면 먼저 repair(text)로 로컬 복구
+    2. 복구가 안 되면 최대 SUMMARY_MAX_REGENERATIONS번 다시 생성 (캐시는 읽지 않고 갱신)
+    3. 그래도 실패하면 마지막 응답에 fallback(text)을 적용
+    """
+    response = None
+    for regenerations in range(SUMMARY_MAX_REGENERATIONS + 1):
+        response = retry_on_rate_limit(
+            invoke,
+            prompt_id,
+            variables,
+            cache_mode="refresh" if regenerations else None,
+            max_attempts=REPORT_MAX_ATTEMPTS,
+        )
+        if not re.search(forbidden, response):
+            record_regeneration(prompt_id, regenerations, "ok")
+            return response
+        repaired = repair(response)
+        if repaired and not re.search(forbidden, repaired):
+            record_regeneration(prompt_id, regenerations, "repaired")
+            return repaired
+
+    print(
+        f"[{prompt_id}] {SUMMARY_MAX_REGENERATIONS}회 재생성 후에도 검증 실패, 대체 문장 사용"
+    )
+    record_regeneration(prompt_id, SUMMARY_MAX_REGENERATIONS, "fallback")
+    return fallback(response)
+
+
+def record_regeneration(prompt_id, regenerations, outcome):
+    with _stats_lock:
+        regeneration_stats[(prompt_id, "calls")] += 1
+        regeneration_stats[(prompt_id, "regenerations")] += regenerations
+        regeneration_stats[(prompt_id, outcome)] += 1
+
+
+def print_regeneration_stats():
+    with _stats_lock:
+        stats = dict(regeneration_stats)
+    if ("score_bucket", "misses") in stats:
+        print(
+            f"[score_bucket] 점수 구간 {stats[('score_bucket', 'misses')]}개 생성, "
+            f"재사용 {stats.get(('score_bucket', 'hits'), 0)}회"
+        )
+    for prompt_id in sorted({key[0] for key in stats} - {"score_bucket"}):
+        print(
+            f"[{prompt_id}] 호출 {stats.get((prompt_id, 'calls'), 0)}회, "
+            f"재생성 {stats.get((prompt_id, 'regenerations'), 0)}회 "
+            f"(통과 {stats.get((prompt_id, 'ok'), 0)} / "
+            f"로컬 복구 {stats.get((prompt_id, 'repaired'), 0)} / "
+            f"대체 {stats.get((prompt_id, 'fallback'), 0)})"
+        )
+
+
+def repair_summary_text(text, forbidden):
+    """금지 패턴이 들어간 문장을 빼고 공백을 정리 (남는 문장이 없으면 None)"""
+    if not isinstance(text, str):
+        return None
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))
+    kept = [sentence for sentence in sentences if not re.search(forbidden, sentence)]
+    return " ".join(kept).strip() or None
+
+
+def repair_colon_text(text):
+    """'요약: ...' 같은 문장 앞 라벨을 떼어내고, 그래도 ':'이 남은 문장은 제거"""
+    text = re.sub(r"(^|(?<=[.!?])\s+)[^.!?:\d]{1,15}:\s*", r"\1", text.strip())
+    return repair_summary_text(text, ":")
+
+
+def parse_report_content(response, question_keys):
+    """
+    report_content 응답(JSON)을 검증하고 복구
+    한줄 평가는 숫자가 든 문장, 질문별 요약은 ':'이 든 문장을 제거하며,
+    복구할 수 없는 항목은 None으로 남겨 기존 방식으로 다시 생성
+    """
+    match = re.search(r"\{.*\}", response, re.S)
+    try:
+        content = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        content = {}
+    if not isinstance(content, dict):
+        content = {}
+
+    summaries = {}
+    questions = content.get("questions")
+    for item in questions if isinstance(questions, list) else []:
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get("question", "")).strip("[] ")
+        if not question.startswith("q_"):
+            question = f"q_{question}"
+        if question in question_keys and question not in summaries:
+            summary = item.get("summary")
+            summary = repair_colon_text(summary) if isinstance(summary, str) else None
+            if summary:
+                summaries[question] = summary
+
+    return {
+        "assessment": repair_summary_text(content.get("assessment"), r"\d"),
+        "subjective": [
+            {"question": key, "response": summaries.get(key)} for key in question_keys
+        ],
+    }
+
+
+@ledger_stage("report_content")
+def summarize_report(scores, team_opinion):
+    """한줄 평가와 질문별 요약을 한 번의 구조화된 호출로 생성"""
+    data_dict = dict(team_opinion)
+    question_keys = [key for key in sorted(data_dict) if key.startswith("q_")]
+    answers = "\n".join(
+        f"[{key}] {condense_answers(data_dict[key])}" for key in question_keys
+    )
+
+    response = retry_on_rate_limit(
+        invoke,
+        "report_content",
+        {"scores": build_score_text(scores), "answers": answers},
+        max_attempts=REPORT_MAX_ATTEMPTS,
+    )
+
+    content = parse_report_content(response, question_keys)
+
+    # 검증에 실패한 항목만 기존 방식으로 다시 생성
+    missing = [
+        entry["question"] for entry in content["subjective"] if not entry["response"]
+    ]
+    if content["assessment"] is None or missing:
+        print(
+            f"보고서 구조화 응답 복구 실패 항목 - 한줄 평가: "
+            f"{content['assessment'] is None}, 질문: {missing}"
+        )
+    if content["assessment"] is None:
+        content["assessment"] = summarize_multiple(scores)
+    for entry in content["subjective"]:
+        if not entry["response"]:
+            idx = sorted(data_dict).index(entry["question"])
+            entry["response"] = summarize_subjective_answer(
+                idx, data_dict[entry["question"]]
+            )
+    return content
+
+
+def build_report_content(scores, team_opinion, mode=None):
+    """
+    보고서 텍스트 생성 단계
+    반환: {"assessment": 한줄 평가, "subjective": [{"question", "response"}, ...],
+           "degraded": LLM 대신 기본 문장을 사용한 항목 목록}
+    """
+    mode = mode or REPORT_CONTENT_MODE
+    if mode == "single":
+        try:
+            return {**summarize_report(scores, team_opinion), "degraded": []}
+        except PlannedCall:
+            # 배치 계획 중 (build_pdf/batch_llm.py): 항목별 호출까지 작업으로 기록하지 않음
+            raise
+        except (ValueError, TypeError, KeyError) as e:
+            # 응답 파싱/검증 실패만 항목별 생성으로 전환
+            print(f"[report_content] 구조화 응답 처리 실패, 항목별 생성으로 전환: {e}")
+        except Exception as e:
+            # 요청 한도 초과/API 장애: 같은 API로 항목별 호출을 늘리지 않고 기본 문장 사용
+            print(f"[report_content] 구조화 호출 실패, 기본 문장 사용: {e}")
+            return {
+                "assessment": fallback_assessment(scores),
+                "subjective": fallback_subjective(team_opinion),
+                "degraded": ["assessment", "subjective"],
+            }
+
+    degraded = []
+    return {
+        "assessment": with_fallback(
+            "assessment",
+            degraded,
+            lambda: summarize_multiple(scores),
+            lambda: fallback_assessment(scores),
+        ),
+        "subjective": with_fallback(
+            "subjective",
+            degraded,
+            lambda: summarize_subjective(team_opinion),
+            lambda: fallback_subjective(team_opinion),
+        ),
+        "degraded": degraded,
+    }
+
+
+def with_fallback(section, degraded, generate, fallback):
+    """generate()가 실패하면 (회로 차단 포함) fallback()을 사용하고 degraded에 항목 기록"""
+    try:
+        return generate()
+    except PlannedCall:
+        # 배치 계획 중 (build_pdf/batch_llm.py): 호출은 작업으로 기록되고 결과는 쓰이지 않음
+        return fallback()
+    except Exception as e:
+        print(f"[{section}] 텍스트 생성 실패, 기본 문장 사용: {e}")
+        degraded.append(section)
+        return fallback()
+
+
+def fallback_assessment(scores):
+    """LLM 없이 점수에서 가장 높은/낮은 키워드로 만드는 한줄 평가"""
+    ranked = score_bucket(scores)
+    if not ranked:
+        return "평가 점수가 없어 한줄 평가를 작성하지 못했습니다."
+    strongest, weakest = ranked[0][0], ranked[-1][0]
+    lines = [f"{strongest} 영역에서 가장 높은 평가를 받았습니다."]
+    if weakest != strongest:
+        lines.append(f"{weakest} 영역은 상대적으로 보완이 필요한 것으로 나타났습니다.")
+    lines.append("강점을 유지하면서 부족한 역량을 꾸준히 개발하시길 권장합니다.")
+    return " ".join(lines)
+
+
+def parse_answers(answers):
+    """result.db에 문자열("['답변1', '답변2']")로 저장된 답변 목록을 리스트로 변환"""
+    if isinstance(answers, str):
+        try:
+            answers = ast.literal_eval(answers)
+        except (ValueError, SyntaxError):
+            answers = [answers]
+    if not isinstance(answers, (list, tuple)):
+        answers = [answers]
+    return [" ".join(str(answer).split()) for answer in answers if str(answer).strip()]
+
+
+def condense_answers(answers):
+    """답변이 많아 토큰 예산을 넘으면 부분 요약 목록으로 바꿈 (예산 이하이면 그대로)"""
+    items = parse_answers(answers)
+    condensed = condense_feedback(items)
+    return answers if condensed is items else str(condensed)
+
+
+def fallback_subjective_answer(answers, count=2):
+    """LLM 없이 (말투가 정규화된) 답변 앞쪽 count개의 첫 문장을 그대로 사용"""
+    sentences = [
+        re.split(r"(?<=[.!?])\s+", answer)[0]
+        for answer in parse_answers(answers)[:count]
+    ]
+    return (
+        " ".join(" ".join(sentences).replace(":", " ").split())
+        or "받은 의견이 없습니다."
+    )
+
+
+def fallback_subjective(team_opinion):
+    data_dict = dict(team_opinion)
+    return [
+        {"question": key, "response": fallback_subjective_answer(data_dict[key])}
+        for key in sorted(data_dict)
+        if key.startswith("q_")
+    ]
@@ -2,14 +2,18 @@ import os
 import pickle
 from concurrent.futures import ThreadPoolExecutor
 
+from book_chunk.book_index import get_current_index, list_chunk_files
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 BOOK_CHUNK_DIR = os.path.join(BASE_DIR, "book_chunk")
 BOOK_CHUNK_CACHE = {}
+# 로드한 인덱스 정보 (버전, passage/query 임베딩 모델)
+BOOK_INDEX_INFO = get_current_index()
 
 
-def load_chunk_file(chunk_file):
+def load_chunk_file(chunk_file, chunk_dir=BOOK_CHUNK_DIR):
     try:
-        with open(os.path.join(BOOK_CHUNK_DIR, chunk_file), "rb") as f:
+        with open(os.path.join(chunk_dir, chunk_file), "rb") as f:
             return chunk_file, pickle.load(f)
     except Exception as e:
         return chunk_file, None
@@ -18,19 +22,19 @@ def load_chunk_file(chunk_file):
 def load_all_book_chunks():
     """
     BOOK_CHUNK_CACHE를 디스크에서 한 번 읽어 메모리에 저장합니다.
+    current_index.json이 가리키는 인덱스 버전을 읽으며, 없으면 기존 청크를 사용합니다.
     """
-    global BOOK_CHUNK_CACHE
-    with os.scandir(BOOK_CHUNK_DIR) as it:
-        chunk_files = [
-            entry.name
-            for entry in it
-            if entry.is_file()
-            and entry.name.startswith("books_chunk_")
-            and entry.name.endswith(".pkl")
-        ]
+    index_info = get_current_index()
+    chunk_dir = index_info["path"]
+    chunk_files = list_chunk_files(chunk_dir)
     with ThreadPoolExecutor() as executor:
-        results = executor.map(load_chunk_file, chunk_files)
-    for filename, data in results:
-        if data is not None:
-            BOOK_CHUNK_CACHE[filename] = data
+        results = executor.map(
+            load_chunk_file, chunk_files, [chunk_dir] * len(chunk_files)
+        )
+    chunks = {filename: data for filename, data in results if data is not None}
+    # 인덱스 버전이 바뀌면 이전 버전의 청크가 새 임베딩과 섞이지 않도록 비움
+    if index_info["path"] != BOOK_INDEX_INFO.get("path"):
+        BOOK_CHUNK_CACHE.clear()
+    BOOK_INDEX_INFO.update(index_info)
+    BOOK_CHUNK_CACHE.update(chunks)
     return BOOK_CHUNK_CACHE
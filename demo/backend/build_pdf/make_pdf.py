@@ -14,7 +14,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 import requests.exceptions
 from book_recommendation import find_lowest_keyword, get_book_recommendation
-from feedback_summary import summarize_multiple, summarize_subjective
+from feedback_summary import build_report_content, print_regeneration_stats
+from llm import completion_cache, ledger_context, load_batch_results
 from load_book_chunk import load_all_book_chunks
 from mail_service.send_email import send_report_emails
 from reportlab.lib import colors
@@ -353,7 +354,7 @@ def draw_difference_chart(c, data, width, height):
 # ==================================  # 한줄 평가
 def draw_assessment_box(c, data, width, height):
 
-    mul_result = summarize_multiple(data["scores"])
+    mul_result = data["report_content"]["assessment"]
 
     styles = getSampleStyleSheet()
 
@@ -379,11 +380,23 @@ def draw_assessment_box(c, data, width, height):
     paragraph.wrapOn(c, box_width - 20, box_height - 20)
     paragraph.drawOn(c, width + 10, height + 70)
 
+    if "assessment" in data["report_content"]["degraded"]:
+        draw_degraded_note(c, width + 10, height + 8)
+
+
+# LLM 대신 기본 문장으로 작성된 항목 표시
+def draw_degraded_note(c, x, y):
+    c.setFillColor(HexColor("#888888"))
+    c.setFont("NanumGothic", 9)
+    c.drawString(
+        x, y, "※ 자동 요약을 사용할 수 없어 점수와 원문 답변으로 작성된 내용입니다."
+    )
+
 
 # ==================================  # 팀 의견 (주관식 요약)
 def draw_team_opinion(c, data, width, height):
 
-    sub_result = summarize_subjective(data["team_opinion"])
+    sub_result = data["report_content"]["subjective"]
 
     # ID와 키워드를 매핑한 딕셔너리 생성
     id_to_keyword = {item["id"]: item["keyword"] for item in data["feedback_keywords"]}
@@ -464,6 +477,10 @@ def draw_team_opinion(c, data, width, height):
     c.line(x, y, x + text_width, y)
     y -= 10  # 구분선 아래 10pt 간격
 
+    if "subjective" in data["report_content"]["degraded"]:
+        draw_degraded_note(c, x, y - 9)
+        y -= 20
+
     for item in merged_results:
         keyword = item.get("keyword", "")
         response = item.get("response", "")
@@ -826,9 +843,27 @@ def generate_pdf(data, filename):
 
 
 # -------------------------------
+# LLM 장애로 기본 문장을 사용한 사용자별 항목 {username: [항목, ...]}
+degraded_reports = {}
+
+
 # 개별 사용자의 데이터를 받아 도서 추천 API 호출 및 PDF 생성
 def process_user(user_data):
     username = user_data["username"]
+    # 이 사용자의 LLM 호출은 원장에 사용자 이름과 함께 기록
+    with ledger_context(user=username):
+        return build_user_report(user_data)
+
+
+def build_user_report(user_data):
+    username = user_data["username"]
+    # 한줄 평가와 주관식 요약 텍스트를 먼저 생성 (REPORT_CONTENT_MODE에 따라 호출 방식 결정)
+    # LLM 호출이 실패하면 점수와 원문 답변으로 만든 기본 문장을 사용
+    user_data["report_content"] = build_report_content(
+        user_data["scores"], user_data["team_opinion"]
+    )
+    if user_data["report_content"]["degraded"]:
+        degraded_reports[username] = user_data["report_content"]["degraded"]
     lowest_keyword = user_data.get("lowest_keyword")
     if not lowest_keyword:
         user_data["book_recommendation"] = None
@@ -842,6 +877,8 @@ def process_user(user_data):
 
 
 if __name__ == "__main__":
+    # LLM_BATCH_DIR이 있으면 미리 실행한 배치 결과(batch_llm.py)를 캐시에 적재
+    load_batch_results()
     # 청크 파일을 미리 메모리에 로드
     load_all_book_chunks()
     users_data = fetch_data()
@@ -855,3 +892,9 @@ if __name__ == "__main__":
             except Exception as e:
                 print(f"Error processing user: {e}")
     send_report_emails()
+    completion_cache.print_stats()
+    print_regeneration_stats()
+    if degraded_reports:
+        print(f"기본 문장으로 작성된 보고서 {len(degraded_reports)}개:")
+        for username, sections in sorted(degraded_reports.items()):
+            print(f"- {username}: {', '.join(sections)}")
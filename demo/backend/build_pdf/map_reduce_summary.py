@@ -0,0 +1,96 @@
+"""
+평가자가 많은 사람의 피드백을 나눠서 요약하는 모듈 (map-reduce).
+
+피드백 목록의 추정 토큰 수가 FEEDBACK_TOKEN_BUDGET을 넘으면 FEEDBACK_CHUNK_TOKENS
+단위로 나눠 병렬로 부분 요약(map)하고, 부분 요약 목록을 호출부에 돌려줍니다.
+최종 요약(reduce)은 호출부의 기존 프롬프트(도서 추천 분석, 주관식 요약)가 그대로 담당하므로
+예산 이하의 입력은 지금과 같은 프롬프트와 캐시 키로 처리됩니다.
+"""
+
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from book_chunk.passage_normalizer import estimate_tokens
+from llm import LLM_MAX_CONCURRENCY, invoke, ledger_stage, retry_on_rate_limit
+
+FEEDBACK_TOKEN_BUDGET = int(os.getenv("FEEDBACK_TOKEN_BUDGET", 2000))
+FEEDBACK_CHUNK_TOKENS = int(os.getenv("FEEDBACK_CHUNK_TOKENS", 1000))
+# 부분 요약을 다시 요약하는 최대 단계 수
+MAX_MAP_ROUNDS = 3
+
+
+def total_tokens(items):
+    return sum(estimate_tokens(item) for item in items)
+
+
+def split_sentences(text, chunk_tokens):
+    """chunk_tokens보다 긴 답변 하나는 문장 단위로 나눔"""
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        if pieces and estimate_tokens(pieces[-1] + " " + sentence) <= chunk_tokens:
+            pieces[-1] += " " + sentence
+        else:
+            pieces.append(sentence)
+    return pieces
+
+
+def chunk_by_tokens(items, chunk_tokens=FEEDBACK_CHUNK_TOKENS):
+    """순서를 유지하면서 추정 토큰 수가 chunk_tokens 이하가 되도록 묶음"""
+    chunks = []
+    used = 0
+    for item in items:
+        for piece in (
+            split_sentences(item, chunk_tokens)
+            if estimate_tokens(item) > chunk_tokens
+            else [item]
+        ):
+            tokens = estimate_tokens(piece)
+            if chunks and used + tokens <= chunk_tokens:
+                chunks[-1].append(piece)
+                used += tokens
+            else:
+                chunks.append([piece])
+                used = tokens
+    return chunks
+
+
+@ledger_stage("feedback_map")
+def summarize_chunk(chunk):
+    text = "\n".join(f"- {item}" for item in chunk)
+    return retry_on_rate_limit(
+        invoke, "feedback_partial_summary", {"text": text}
+    ).strip()
+
+
+def condense_feedback(items, budget=None, chunk_tokens=None):
+    """
+    피드백 목록이 budget 이하이면 그대로, 넘으면 부분 요약 목록을 반환
+    부분 요약을 합쳐도 넘으면 MAX_MAP_ROUNDS까지 한 번 더 나눠 요약
+    """
+    budget = budget or FEEDBACK_TOKEN_BUDGET
+    chunk_tokens = chunk_tokens or FEEDBACK_CHUNK_TOKENS
+    tokens = total_tokens(items)
+    for _ in range(MAX_MAP_ROUNDS):
+        if tokens <= budget:
+            break
+        chunks = chunk_by_tokens(items, chunk_tokens)
+        print(
+            f"피드백 {len(items)}개 (약 {tokens}토큰)를 {len(chunks)}개로 나눠 부분 요약"
+        )
+        with ThreadPoolExecutor(
+            max_workers=min(len(chunks), LLM_MAX_CONCURRENCY)
+        ) as executor:
+            # 호출부의 원장 정보(사용자 등)를 작업 스레드로 전달
+            futures = [
+                executor.submit(contextvars.copy_context().run, summarize_chunk, chunk)
+                for chunk in chunks
+            ]
+            summaries = [future.result() for future in futures]
+        summary_tokens = total_tokens(summaries)
+        # 요약해도 줄지 않으면 더 나누지 않음
+        if summary_tokens >= tokens:
+            break
+        items, tokens = summaries, summary_tokens
+    return items
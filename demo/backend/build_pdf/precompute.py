@@ -0,0 +1,196 @@
+"""
+마감 전 보고서 내용 미리 계산 (백그라운드 작업).
+
+PRECOMPUTE_INTERVAL초마다 사용자별로 받은 피드백의 지문(fingerprint)을 계산하고,
+지난번 계산 이후 피드백이 바뀐 사용자만 톤 정규화, 한줄 평가/주관식 요약, 도서 추천
+입력(약점 분석, 도서 요약)을 다시 계산합니다. 결과는 LLM 캐시에 저장되므로 마감 후
+"PDF 생성 시작"에서 실행하는 pdf.py / make_pdf.py는 대부분 캐시에서 결과를 읽습니다.
+
+- 피드백이 계속 들어오는 중인 사용자는 마지막 피드백 후 PRECOMPUTE_QUIET초가 지나야 계산
+- 가장 낮은 키워드(도서 추천 대상)는 팀 평균에 따라 바뀌므로 지문에 함께 포함
+- 문항 목록도 지문에 포함하여 관리자가 문항을 수정하면 다시 계산
+- result.db가 있으면 (보고서 생성 중이거나 생성 완료) 계산하지 않음
+- 지문과 상태는 db/precompute.db의 precompute_state 테이블에 저장
+
+main.py 실행 시 함께 시작되며, 단독 실행도 가능합니다 (backend 디렉토리를 PYTHONPATH에 두고):
+    PYTHONPATH=.. python precompute.py
+    PYTHONPATH=.. python precompute.py --once
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import schedule
+from book_recommendation import find_lowest_keyword, get_book_recommendation
+from feedback_summary import build_report_content, get_keyword_pairs
+from load_book_chunk import load_all_book_chunks
+
+from db.models.pdf import (
+    RESULT_DB_PATH,
+    build_score_table,
+    format_subjective_answers,
+    get_feedback_connection,
+    get_long_answer_question_ids,
+    get_score_keywords,
+    load_subjective_answers,
+    normalize_user_answers,
+)
+from db.models.precompute import get_done_fingerprints, init_db, save_state
+from llm import ledger_context
+
+PRECOMPUTE_INTERVAL = int(os.getenv("PRECOMPUTE_INTERVAL", 300))
+PRECOMPUTE_QUIET = int(os.getenv("PRECOMPUTE_QUIET", 600))
+# 응답 중인 서버와 요청 한도를 나눠 쓰므로 적은 수의 사용자만 동시에 처리
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", 2))
+
+
+def load_feedback_fingerprints(fb_conn):
+    """사용자별 (받은 피드백 지문, 마지막 피드백이 PRECOMPUTE_QUIET초 이전인지)"""
+    rows = fb_conn.execute(
+        """
+        SELECT to_username, id, question_id, from_username, answer_content,
+               created_at <= datetime('now', ?)
+        FROM feedback_results
+        ORDER BY to_username, id
+    """,
+        (f"-{PRECOMPUTE_QUIET} seconds",),
+    ).fetchall()
+    hashes, settled = {}, {}
+    for username, *row, is_old in rows:
+        hashes.setdefault(username, hashlib.sha256()).update(
+            json.dumps(row, ensure_ascii=False).encode("utf-8")
+        )
+        # 정렬 순서상 마지막 행이 가장 최근 피드백
+        settled[username] = bool(is_old)
+    return {username: h.hexdigest() for username, h in hashes.items()}, settled
+
+
+def user_scores(pivot_df, keywords, username):
+    """fetch_data()가 result.db에서 읽는 것과 같은 [[키워드, 점수], ...]"""
+    rows = pivot_df[pivot_df["to_username"] == username]
+    if rows.empty:
+        return []
+    row = rows.iloc[0]
+    # 점수가 없는 키워드(NaN)는 result.db에 NULL로 저장됨
+    return [
+        [keyword, None if pd.isna(row.get(keyword)) else float(row[keyword])]
+        for keyword in keywords
+    ]
+
+
+def precompute_user(username, answers_by_question, question_ids, scores, lowest):
+    """한 사용자의 톤 정규화 -> 보고서 텍스트 -> 도서 추천 입력 (반환: 성공 여부)"""
+    with ledger_context(user=username):
+        team_opinion = []
+        if answers_by_question is not None:
+            with ledger_context(stage="normalize_tone"):
+                feedback_dict = normalize_user_answers(answers_by_question)
+            team_opinion = [
+                [f"q_{question_id}", value]
+                for question_id, value in zip(
+                    question_ids,
+                    format_subjective_answers(feedback_dict, question_ids),
+                )
+            ]
+        if not scores:
+            return True
+        content = build_report_content(scores, team_opinion)
+        if content["degraded"]:
+            return False
+        if lowest:
+            get_book_recommendation(username, lowest)
+    return True
+
+
+def run_once():
+    """피드백이 바뀐 사용자를 찾아 미리 계산 (반환: 계산한 사용자 수)"""
+    if os.path.exists(RESULT_DB_PATH):
+        return 0
+
+    # 관리자가 문항을 수정했을 수 있으므로 매번 다시 조회 (make_pdf.py와 같은 프롬프트/캐시 키)
+    keyword_pairs = get_keyword_pairs(refresh=True)
+    fb_conn = get_feedback_connection()
+    try:
+        fingerprints, settled = load_feedback_fingerprints(fb_conn)
+        keywords = get_score_keywords(fb_conn)
+        question_ids = get_long_answer_question_ids(fb_conn)
+        if not fingerprints:
+            return 0
+        pivot_df = build_score_table(fb_conn, keywords)
+        answers_by_user = load_subjective_answers(fb_conn, question_ids)
+    finally:
+        fb_conn.close()
+
+    team_average = user_scores(pivot_df, keywords, "average")
+    done = get_done_fingerprints()
+    jobs = []
+    for username, fingerprint in fingerprints.items():
+        scores = user_scores(pivot_df, keywords, username)
+        lowest = find_lowest_keyword(scores, team_average)
+        fingerprint = hashlib.sha256(
+            f"{fingerprint}:{lowest}:{keyword_pairs}".encode()
+        ).hexdigest()
+        if settled[username] and done.get(username) != fingerprint:
+            jobs.append((username, fingerprint, scores, lowest))
+    if not jobs:
+        return 0
+
+    print(f"[precompute] 피드백이 바뀐 사용자 {len(jobs)}명 미리 계산")
+    start = time.perf_counter()
+
+    def run_job(job):
+        username, fingerprint, scores, lowest = job
+        try:
+            ok = precompute_user(
+                username, answers_by_user.get(username), question_ids, scores, lowest
+            )
+        except Exception as e:
+            print(f"[precompute] {username} 계산 실패: {e}")
+            ok = False
+        save_state(username, fingerprint, "done" if ok else "failed")
+        return ok
+
+    with ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS) as executor:
+        results = list(executor.map(run_job, jobs))
+    print(
+        f"[precompute] 완료 {sum(results)} / 실패 {len(results) - sum(results)} "
+        f"({time.perf_counter() - start:.1f}초)"
+    )
+    return len(jobs)
+
+
+def run_worker():
+    """PRECOMPUTE_INTERVAL초마다 run_once() 실행"""
+    init_db()
+    load_all_book_chunks()
+    print(f"[precompute] 시작 (주기 {PRECOMPUTE_INTERVAL}초)")
+
+    def safe_run():
+        try:
+            run_once()
+        except Exception as e:
+            print(f"[precompute] 오류: {e}")
+
+    safe_run()
+    schedule.every(PRECOMPUTE_INTERVAL).seconds.do(safe_run)
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="보고서 내용 미리 계산")
+    parser.add_argument("--once", action="store_true", help="한 번만 실행하고 종료")
+    args = parser.parse_args()
+
+    if args.once:
+        init_db()
+        load_all_book_chunks()
+        run_once()
+    else:
+        run_worker()
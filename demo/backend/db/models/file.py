@@ -1,5 +1,7 @@
+import json
 import os
 import sqlite3
+import uuid
 
 from mail_service.reminder import check_and_send_reminders
 
@@ -14,35 +16,324 @@ def init_db():
     conn = get_connection()
     cur = conn.cursor()
 
-    # 파일 업로드 테이블 생성
+    # 파일 업로드 테이블 생성 (파일 내용 해시별로 한 행, 같은 내용은 ref_count만 증가)
     cur.execute(
         """
     CREATE TABLE IF NOT EXISTS uploaded_files (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         filename TEXT NOT NULL,
-        file_path TEXT NOT NULL
+        file_path TEXT NOT NULL,
+        content_hash TEXT,
+        size INTEGER,
+        mime_type TEXT,
+        parse_status TEXT NOT NULL DEFAULT 'pending',
+        ref_count INTEGER NOT NULL DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
     )
     """
     )
+    # 이전 버전 DB에는 해시/메타데이터 컬럼이 없음
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(uploaded_files)")]
+    for column, definition in [
+        ("content_hash", "TEXT"),
+        ("size", "INTEGER"),
+        ("mime_type", "TEXT"),
+        ("parse_status", "TEXT NOT NULL DEFAULT 'pending'"),
+        ("ref_count", "INTEGER NOT NULL DEFAULT 1"),
+        ("created_at", "DATETIME"),
+    ]:
+        if column not in columns:
+            cur.execute(f"ALTER TABLE uploaded_files ADD COLUMN {column} {definition}")
+    if "ref_count" not in columns:
+        # 같은 내용으로 여러 번 저장된 행을 하나로 합치고 업로드 횟수를 ref_count로
+        cur.execute(
+            """
+            UPDATE uploaded_files SET ref_count = (
+                SELECT COUNT(*) FROM uploaded_files AS u
+                WHERE u.content_hash = uploaded_files.content_hash
+            ) WHERE content_hash IS NOT NULL
+        """
+        )
+        cur.execute(
+            """
+            DELETE FROM uploaded_files WHERE content_hash IS NOT NULL AND id NOT IN (
+                SELECT MAX(id) FROM uploaded_files
+                WHERE content_hash IS NOT NULL GROUP BY content_hash
+            )
+        """
+        )
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_uploaded_files_content_hash
+        ON uploaded_files (content_hash)
+    """
+    )
 
-    conn.commit()
-    conn.close()
-
+    # 문서 분석 결과 테이블 (파일 내용 해시별)
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS parsed_documents (
+        content_hash TEXT PRIMARY KEY,
+        html TEXT NOT NULL,
+        evaluation_data TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
 
-def save_file_metadata(filename, file_path):
-    conn = get_connection()
-    cur = conn.cursor()
+    # 문서 분석 작업 테이블 (업로드 후 백그라운드에서 분석)
     cur.execute(
         """
-        INSERT INTO uploaded_files (filename, file_path)
-        VALUES (?, ?)
-    """,
-        (filename, file_path),
+    CREATE TABLE IF NOT EXISTS parse_jobs (
+        job_id TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        status TEXT NOT NULL,
+        message TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
     )
+
     conn.commit()
     conn.close()
 
 
+def begin_immediate():
+    """쓰기 잠금을 바로 잡는 트랜잭션 연결 (참조 수 확인과 변경 사이에 다른 요청이 끼지 않음)"""
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("BEGIN IMMEDIATE")
+    return conn
+
+
+def store_file(temp_path, file_path, filename, content_hash, size=None, mime_type=None):
+    """임시 파일을 저장 경로로 옮기고 기록
+    (그 사이 같은 내용이 저장되었으면 임시 파일을 지우고 ref_count만 증가)
+    반환: (저장 경로, 새로 저장했는지 여부)"""
+    conn = begin_immediate()
+    try:
+        row = conn.execute(
+            "SELECT file_path FROM uploaded_files WHERE content_hash = ?",
+            (content_hash,),
+        ).fetchone()
+        if row is not None and os.path.exists(row[0]):
+            os.remove(temp_path)
+            conn.execute(
+                """
+                UPDATE uploaded_files SET ref_count = ref_count + 1
+                WHERE content_hash = ?
+            """,
+                (content_hash,),
+            )
+            conn.execute("COMMIT")
+            return row[0], False
+
+        os.replace(temp_path, file_path)
+        if row is None:
+            conn.execute(
+                """
+                INSERT INTO uploaded_files
+                (filename, file_path, content_hash, size, mime_type)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (filename, file_path, content_hash, size, mime_type),
+            )
+        else:
+            # 기록은 있지만 파일이 지워진 경우 다시 저장한 파일로 교체
+            conn.execute(
+                """
+                UPDATE uploaded_files
+                SET file_path = ?, size = ?, mime_type = ?, ref_count = ref_count + 1
+                WHERE content_hash = ?
+            """,
+                (file_path, size, mime_type, content_hash),
+            )
+        conn.execute("COMMIT")
+        return file_path, True
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        conn.close()
+
+
+def get_stored_file(content_hash):
+    """{filename, file_path, content_hash, size, mime_type, parse_status, ref_count, ...}
+    (해당 내용의 파일이 없으면 None)"""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(
+            "SELECT * FROM uploaded_files WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def release_file(content_hash):
+    """업로드 참조 하나 해제, 마지막 참조였으면 행과 저장된 파일 삭제
+    (반환: 남은 ref_count, 해당 파일이 없으면 None)"""
+    conn = begin_immediate()
+    try:
+        row = conn.execute(
+            "SELECT ref_count, file_path FROM uploaded_files WHERE content_hash = ?",
+            (content_hash,),
+        ).fetchone()
+        if row is None:
+            conn.execute("ROLLBACK")
+            return None
+        ref_count, file_path = row
+        if ref_count <= 1:
+            conn.execute(
+                "DELETE FROM uploaded_files WHERE content_hash = ?", (content_hash,)
+            )
+        else:
+            conn.execute(
+                """
+                UPDATE uploaded_files SET ref_count = ref_count - 1
+                WHERE content_hash = ?
+            """,
+                (content_hash,),
+            )
+        conn.execute("COMMIT")
+        if ref_count > 1:
+            return ref_count - 1
+
+        # 참조 0으로 커밋된 뒤에 파일 삭제, 그 사이 같은 내용이 다시 업로드되었으면 유지
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT 1 FROM uploaded_files WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+        if row is None and os.path.exists(file_path):
+            os.remove(file_path)
+        conn.execute("COMMIT")
+        return 0
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def get_parsed_document(content_hash):
+    """{content_hash, html, evaluation_data} (분석한 적이 없으면 None)"""
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            """
+            SELECT html, evaluation_data FROM parsed_documents
+            WHERE content_hash = ?
+        """,
+            (content_hash,),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {
+        "content_hash": content_hash,
+        "html": row[0],
+        "evaluation_data": json.loads(row[1]),
+    }
+
+
+def save_parsed_document(content_hash, html, evaluation_data):
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO parsed_documents
+            (content_hash, html, evaluation_data)
+            VALUES (?, ?, ?)
+        """,
+            (content_hash, html, json.dumps(evaluation_data, ensure_ascii=False)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def create_parse_job(content_hash, file_path, status="queued"):
+    """분석 작업 추가 (반환: job_id)"""
+    job_id = uuid.uuid4().hex
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO parse_jobs (job_id, content_hash, file_path, status)
+            VALUES (?, ?, ?, ?)
+        """,
+            (job_id, content_hash, file_path, status),
+        )
+        conn.execute(
+            "UPDATE uploaded_files SET parse_status = ? WHERE content_hash = ?",
+            (status, content_hash),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return job_id
+
+
+def update_parse_job(job_id, status, message=None):
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            UPDATE parse_jobs SET status = ?, message = ?, updated_at = datetime('now')
+            WHERE job_id = ?
+        """,
+            (status, message, job_id),
+        )
+        # 파일의 분석 상태도 마지막 작업 상태로
+        conn.execute(
+            """
+            UPDATE uploaded_files SET parse_status = ? WHERE content_hash = (
+                SELECT content_hash FROM parse_jobs WHERE job_id = ?
+            )
+        """,
+            (status, job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_parse_job(job_id):
+    """{job_id, content_hash, file_path, status, message, created_at, updated_at} (없으면 None)"""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(
+            "SELECT * FROM parse_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def get_unfinished_parse_jobs(content_hash=None):
+    """대기 중이거나 분석 중인 작업 목록 (content_hash를 주면 해당 파일의 작업만)"""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        query = "SELECT * FROM parse_jobs WHERE status IN ('queued', 'parsing')"
+        params = ()
+        if content_hash is not None:
+            query += " AND content_hash = ?"
+            params = (content_hash,)
+        rows = conn.execute(query + " ORDER BY created_at", params).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
 # 리마인더 실행
 result = check_and_send_reminders()
 print(result)
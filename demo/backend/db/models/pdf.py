@@ -1,19 +1,38 @@
+import json
 import os
+import re
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 from dotenv import load_dotenv
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
-from langchain_upstage import ChatUpstage, UpstageEmbeddings
 from tqdm import tqdm  # tqdm 추가
 
+from llm import (
+    LLM_MAX_CONCURRENCY,
+    completion_cache,
+    invoke,
+    ledger_context,
+    load_batch_results,
+    retry_on_rate_limit,
+)
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 FEEDBACK_DB_PATH = os.path.join(os.path.dirname(__file__), "../feedback.db")
 RESULT_DB_PATH = os.path.join(os.path.dirname(__file__), "../result.db")
 
+# 톤 정규화 방식
+# - batch: 한 사람이 받은 답변을 TONE_BATCH_SIZE개씩 묶어 한 번에 요청 (JSON 배열 응답)
+# - single: 답변마다 개별 요청
+TONE_NORMALIZE_MODE = os.getenv("TONE_NORMALIZE_MODE", "batch")
+TONE_BATCH_SIZE = int(os.getenv("TONE_BATCH_SIZE", 30))
+# 톤 정규화 호출의 429 최대 시도 횟수 (여러 사용자를 동시에 처리하므로 한 번의 429로
+# 전체 집계가 중단되지 않도록 백오프 후 재시도)
+TONE_MAX_ATTEMPTS = int(os.getenv("TONE_MAX_ATTEMPTS", 5))
+# 주관식 집계 시 동시에 처리할 사용자 수
+AGGREGATION_WORKERS = int(os.getenv("AGGREGATION_WORKERS", LLM_MAX_CONCURRENCY))
+
 
 def get_feedback_connection():
     return sqlite3.connect(FEEDBACK_DB_PATH)
@@ -23,20 +42,21 @@ def get_result_connection():
     return sqlite3.connect(RESULT_DB_PATH)
 
 
+def get_score_keywords(fb_conn):
+    """객관식(single_choice) 문항의 unique한 keyword 목록"""
+    cur = fb_conn.execute(
+        "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
 def init_result_db():
     # feedback.db에서 unique한 keyword 목록 가져오기
     fb_conn = get_feedback_connection()
-    cur = fb_conn.cursor()
-    cur.execute(
-        "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
-    )
-    keywords = [row[0] for row in cur.fetchall()]
+    keywords = get_score_keywords(fb_conn)
 
     # unique 질문 ID 가져오기 (주관식)
-    cur.execute(
-        "SELECT DISTINCT id FROM feedback_questions WHERE question_type = 'long_answer'"
-    )
-    question_ids = [row[0] for row in cur.fetchall()]
+    question_ids = get_long_answer_question_ids(fb_conn)
     fb_conn.close()
 
     # result.db 연결
@@ -74,52 +94,129 @@ def init_result_db():
     conn.close()
 
 
-def normalize_tone(text_list):
-    """각 텍스트 리스트에 대해 톤 정규화 수행"""
-    llm = ChatUpstage(api_key=UPSTAGE_API_KEY)
-
-    prompt_template = PromptTemplate.from_template(
-        """
-        아래 주어진 문장을 인물 지칭을 모두 제외하고, 존대하는 평서문으로 내용은 그대로 유지한채로 말투만 바꿔주세요.
-        단, 매우 부정적인 내용은 필터링해주세요.
-        {text}
-        변경 후 텍스트 :
-        """
+def normalize_single_tone(text):
+    """답변 하나를 톤 정규화 (같은 답변은 캐시에서 재사용)"""
+    text = retry_on_rate_limit(
+        invoke, "tone_normalize", {"text": text}, max_attempts=TONE_MAX_ATTEMPTS
+    )
+    return text.split(":", 1)[-1].strip() if ":" in text else text
+
+
+def parse_tone_batch(response, count):
+    """배치 응답의 JSON 배열을 번호 순서의 리스트로 변환 (파싱할 수 없는 항목은 None)"""
+    results = [None] * count
+    match = re.search(r"\[.*\]", response, re.S)
+    if not match:
+        return results
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return results
+    if not isinstance(items, list):
+        return results
+
+    for position, item in enumerate(items):
+        if isinstance(item, dict):
+            index = item.get("id")
+            index = int(index) - 1 if str(index).isdigit() else None
+            text = item.get("text")
+        elif len(items) == count:
+            # 번호 없이 문자열 배열로만 답한 경우 순서대로 대응
+            index, text = position, item
+        else:
+            continue
+        if index is not None and 0 <= index < count:
+            if isinstance(text, str) and text.strip():
+                results[index] = text.strip()
+    return results
+
+
+def normalize_tone_batch(text_list):
+    """여러 답변을 한 번의 요청으로 톤 정규화하고, 파싱 실패 항목만 개별 요청"""
+    answers = "\n".join(
+        f"[{i}] {' '.join(text.split())}" for i, text in enumerate(text_list, 1)
+    )
+    response = retry_on_rate_limit(
+        invoke,
+        "tone_normalize_batch",
+        {"count": len(text_list), "answers": answers},
+        max_attempts=TONE_MAX_ATTEMPTS,
     )
+    parsed = parse_tone_batch(response, len(text_list))
 
-    llm_chain = prompt_template | llm | StrOutputParser()
+    failed = sum(text is None for text in parsed)
+    if failed:
+        print(
+            f"톤 정규화 배치 응답 {failed}/{len(text_list)}개 파싱 실패, 개별 요청으로 대체"
+        )
+    return [
+        text if text is not None else normalize_single_tone(original)
+        for text, original in zip(parsed, text_list)
+    ]
 
-    # 동기 LLM 호출
-    def process_text(text):
-        return llm_chain.invoke({"text": text})
 
-    normalized_texts = [process_text(text) for text in text_list]
+def normalize_tone(text_list, mode=None):
+    """각 텍스트 리스트에 대해 톤 정규화 수행"""
+    mode = mode or TONE_NORMALIZE_MODE
+    if mode == "batch" and len(text_list) > 1:
+        normalized_texts = []
+        for start in range(0, len(text_list), TONE_BATCH_SIZE):
+            batch = text_list[start : start + TONE_BATCH_SIZE]
+            if len(batch) > 1:
+                normalized_texts.extend(normalize_tone_batch(batch))
+            else:
+                normalized_texts.append(normalize_single_tone(batch[0]))
+    else:
+        normalized_texts = [normalize_single_tone(text) for text in text_list]
 
-    normalized_texts = [
-        text.split(":", 1)[-1].strip() if ":" in text else text
-        for text in normalized_texts
-    ]
     normalized_texts = [text.replace('"', "") for text in normalized_texts]
     normalized_texts = [text.replace("'", "") for text in normalized_texts]
     return [text.strip() for text in normalized_texts]
 
 
-def process_feedback_data():
-    # feedback.db 연결
-    fb_conn = get_feedback_connection()
-
-    # 키워드 목록 가져오기 - single_choice 타입만 필터링
-    cur = fb_conn.cursor()
-    cur.execute(
-        "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != '' AND question_type = 'single_choice'"
+def get_long_answer_question_ids(fb_conn):
+    cur = fb_conn.execute(
+        "SELECT DISTINCT id FROM feedback_questions WHERE question_type = 'long_answer'"
     )
-    keywords = [row[0] for row in cur.fetchall()]
+    return [row[0] for row in cur.fetchall()]
 
-    cur.execute(
-        "SELECT DISTINCT id FROM feedback_questions WHERE question_type = 'long_answer'"
+
+def load_subjective_answers(fb_conn, question_ids):
+    """사용자별 {질문 id: 답변 리스트} (사용자/답변은 조회 순서, 질문은 question_ids 순서)"""
+    subj_query = """
+    SELECT fr.to_username, fq.id AS question_id, fr.answer_content
+    FROM feedback_results fr
+    JOIN feedback_questions fq ON fr.question_id = fq.id
+    WHERE fr.answer_content NOT IN ('매우우수', '우수', '보통', '미흡', '매우미흡') AND fq.question_type == 'long_answer'
+    """
+
+    subj_df = pd.read_sql_query(subj_query, fb_conn)
+    return {
+        username: {
+            question_id: feedbacks[feedbacks["question_id"] == question_id][
+                "answer_content"
+            ].tolist()
+            for question_id in question_ids
+        }
+        for username, feedbacks in subj_df.groupby("to_username", sort=False)
+    }
+
+
+def normalize_user_answers(answers_by_question):
+    """한 사람의 모든 답변을 한 번에 톤 정규화한 뒤 질문별로 다시 나눔"""
+    normalized = iter(
+        normalize_tone(
+            [answer for answers in answers_by_question.values() for answer in answers]
+        )
     )
-    question_ids = [row[0] for row in cur.fetchall()]
+    return {
+        f"q_{question_id}": [next(normalized) for _ in answers]
+        for question_id, answers in answers_by_question.items()
+    }
 
+
+def build_score_table(fb_conn, keywords):
+    """사용자별 키워드 평균, 총합, 등급과 'average' 행을 담은 객관식 점수표"""
     # 객관식(single_choice) 데이터 처리
     query = """
     SELECT fr.to_username, fq.keyword, fr.answer_content
@@ -184,81 +281,86 @@ def process_feedback_data():
         return pivot_df[column].map(assign_grade)
 
     pivot_df.loc[pivot_df["to_username"] != "average", "등급"] = map_grade(pivot_df)
+    return pivot_df
 
-    # 결과 DB에 저장
-    result_conn = get_result_connection()
 
-    # multiple 테이블 데이터 저장
-    for _, row in tqdm(
-        pivot_df.iterrows(),
-        total=pivot_df.shape[0],
-        desc="Processing multiple choice data",
-    ):  # tqdm 추가
-        cur = result_conn.cursor()
-        placeholders = ", ".join(
-            ["?" for _ in range(len(keywords) + 3)]
-        )  # '총합'과 '등급' 추가
-        columns = ["to_username"] + keywords + ["총합", "등급"]
-
-        values = (
-            [row["to_username"]]
-            + [row.get(keyword, 0) for keyword in keywords]
-            + [row["총합"], row.get("등급", "")]
-        )
+def format_subjective_answers(feedback_dict, question_ids):
+    """subjective 테이블에 저장하는 질문별 답변 문자열 (question_ids 순서)"""
+    return [
+        str(feedback_dict.get(f"q_{question_id}", [])) for question_id in question_ids
+    ]
 
-        insert_sql = f"""
-            INSERT INTO multiple (
-                {', '.join(columns)}
-            ) VALUES ({placeholders})
-        """
-        cur.execute(insert_sql, values)
 
-    # 주관식 데이터 처리
-    subj_query = """
-    SELECT fr.to_username, fq.id AS question_id, fr.answer_content
-    FROM feedback_results fr
-    JOIN feedback_questions fq ON fr.question_id = fq.id
-    WHERE fr.answer_content NOT IN ('매우우수', '우수', '보통', '미흡', '매우미흡') AND fq.question_type == 'long_answer'
-    """
+def process_feedback_data():
+    # feedback.db 연결
+    fb_conn = get_feedback_connection()
 
-    subj_df = pd.read_sql_query(subj_query, fb_conn)
+    # 키워드 목록 가져오기 - single_choice 타입만 필터링
+    keywords = get_score_keywords(fb_conn)
+    question_ids = get_long_answer_question_ids(fb_conn)
+    pivot_df = build_score_table(fb_conn, keywords)
 
-    # subjective 테이블 데이터 저장
-    for username in tqdm(
-        subj_df["to_username"].unique(), desc="Processing subjective data"
-    ):
-        feedbacks = subj_df[subj_df["to_username"] == username]
-
-        # 각 질문 ID에 대해 답변 리스트 생성 및 톤 정규화
-        feedback_dict = {
-            f"q_{question_id}": normalize_tone(
-                feedbacks[feedbacks["question_id"] == question_id][
-                    "answer_content"
-                ].tolist()
-            )
-            for question_id in question_ids
-        }
+    # 주관식 데이터 처리
+    answers_by_user = load_subjective_answers(fb_conn, question_ids)
+    fb_conn.close()
 
-        cur = result_conn.cursor()
-        # 데이터 삽입
-        insert_values = [username] + [
-            str(feedback_dict.get(f"q_{question_id}", []))
-            for question_id in question_ids
-        ]
-        cur.execute(
-            f"""
-            INSERT INTO subjective (to_username, {', '.join([f'q_{question_id}' for question_id in question_ids])})
-            VALUES (?, {', '.join(['?' for _ in range(len(question_ids))])})
-        """,
-            insert_values,
+    def build_subjective_row(username):
+        with ledger_context(stage="normalize_tone", user=username):
+            feedback_dict = normalize_user_answers(answers_by_user[username])
+        return [username] + format_subjective_answers(feedback_dict, question_ids)
+
+    # 사용자별 톤 정규화를 동시에 수행 (실제 API 동시 호출 수는 llm 공용 세마포어로 제한)
+    usernames = list(answers_by_user)
+    with ThreadPoolExecutor(max_workers=AGGREGATION_WORKERS) as executor:
+        subjective_rows = list(
+            tqdm(
+                executor.map(build_subjective_row, usernames),
+                total=len(usernames),
+                desc="Processing subjective data",
+            )
         )
 
-    result_conn.commit()
-    result_conn.close()
-    fb_conn.close()
+    # 모든 사용자 처리가 끝난 뒤 결과 DB에 한 트랜잭션으로 저장
+    result_conn = get_result_connection()
+    try:
+        with result_conn:
+            cur = result_conn.cursor()
+
+            # multiple 테이블 데이터 저장
+            placeholders = ", ".join(
+                ["?" for _ in range(len(keywords) + 3)]
+            )  # '총합'과 '등급' 추가
+            columns = ["to_username"] + keywords + ["총합", "등급"]
+            multiple_rows = [
+                [row["to_username"]]
+                + [row.get(keyword, 0) for keyword in keywords]
+                + [row["총합"], row.get("등급", "")]
+                for _, row in pivot_df.iterrows()
+            ]
+            cur.executemany(
+                f"""
+                INSERT INTO multiple (
+                    {', '.join(columns)}
+                ) VALUES ({placeholders})
+            """,
+                multiple_rows,
+            )
+
+            # subjective 테이블 데이터 저장
+            cur.executemany(
+                f"""
+                INSERT INTO subjective (to_username, {', '.join([f'q_{question_id}' for question_id in question_ids])})
+                VALUES (?, {', '.join(['?' for _ in range(len(question_ids))])})
+            """,
+                subjective_rows,
+            )
+    finally:
+        result_conn.close()
 
 
 if __name__ == "__main__":
     if not os.path.exists(RESULT_DB_PATH):  # result.db가 이미 존재하는 경우
+        load_batch_results()
         init_result_db()
         process_feedback_data()
+        completion_cache.print_stats()
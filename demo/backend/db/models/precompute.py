@@ -0,0 +1,59 @@
+import os
+import sqlite3
+
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "precompute.db")
+
+
+def get_connection():
+    return sqlite3.connect(DB_PATH)
+
+
+def init_db():
+    """
+    DB 테이블 구조:
+    precompute_state: (username, fingerprint, status, updated_at)
+    - fingerprint: 마지막으로 미리 계산한 시점의 받은 피드백 지문
+    - status: done(계산 완료) / failed(LLM 실패 등으로 다음 주기에 다시 계산)
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+    CREATE TABLE IF NOT EXISTS precompute_state (
+        username TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        status TEXT NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_done_fingerprints():
+    """{username: fingerprint} (계산을 마친 사용자만)"""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT username, fingerprint FROM precompute_state WHERE status = 'done'"
+        ).fetchall()
+        return dict(rows)
+    finally:
+        conn.close()
+
+
+def save_state(username, fingerprint, status):
+    conn = get_connection()
+    try:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO precompute_state
+            (username, fingerprint, status, updated_at)
+            VALUES (?, ?, ?, datetime('now'))
+        """,
+            (username, fingerprint, status),
+        )
+        conn.commit()
+    finally:
+        conn.close()
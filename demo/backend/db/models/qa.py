@@ -71,6 +71,7 @@ def init_db():
     conn.commit()
     conn.close()
 
+    init_question_suggestions_table()
     init_users_db()
 
 
@@ -86,3 +87,59 @@ def seed_data():
     conn.close()
 
     seed_users_data()
+
+
+def init_question_suggestions_table():
+    """
+    question_suggestions: (keyword, prompt_version, suggestions, created_at)
+    키워드별 AI 추천 질문, 프롬프트가 바뀌면 prompt_version이 달라져 다시 생성
+    """
+    conn = get_connection()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS question_suggestions (
+            keyword TEXT NOT NULL,
+            prompt_version TEXT NOT NULL,
+            suggestions TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (keyword, prompt_version)
+        )
+    """
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_question_suggestions(keywords, prompt_version):
+    """{keyword: 추천 질문} (저장된 키워드만)"""
+    if not keywords:
+        return {}
+    conn = get_connection()
+    try:
+        placeholders = ",".join("?" for _ in keywords)
+        rows = conn.execute(
+            f"""
+            SELECT keyword, suggestions FROM question_suggestions
+            WHERE prompt_version = ? AND keyword IN ({placeholders})
+        """,
+            [prompt_version, *keywords],
+        ).fetchall()
+        return dict(rows)
+    finally:
+        conn.close()
+
+
+def save_question_suggestions(suggestions, prompt_version):
+    conn = get_connection()
+    try:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO question_suggestions
+            (keyword, prompt_version, suggestions, created_at)
+            VALUES (?, ?, ?, datetime('now'))
+        """,
+            [(keyword, prompt_version, text) for keyword, text in suggestions.items()],
+        )
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,16 @@
+"""
+문서 분석 패키지.
+업로드한 평가표 문서를 질문 목록으로 변환하고, 결과를 파일 내용 해시별로 저장합니다.
+"""
+
+from .evaluation_form import parse_evaluation_form
+from .jobs import resume_parse_jobs, submit_parse_job
+from .parser import file_sha256, parse_document
+
+__all__ = [
+    "file_sha256",
+    "parse_document",
+    "parse_evaluation_form",
+    "resume_parse_jobs",
+    "submit_parse_job",
+]
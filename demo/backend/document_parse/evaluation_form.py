@@ -0,0 +1,150 @@
+import re
+
+from bs4 import BeautifulSoup
+
+# lxml이 설치되어 있으면 더 빠른 lxml 파서 사용
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 평가표 맨 앞의 헤더 행 수
+HEADER_ROWS = 3
+# 평가표를 읽을 때 무시하는 요소 (페이지 머리글/바닥글, 표 제목)
+IGNORED_TAGS = {"header", "footer", "caption"}
+IGNORED_CATEGORIES = {"header", "footer", "caption", "footnote"}
+# 평가표가 끝난 것으로 보는 제목 요소
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# 쪽 번호만 있는 문단 (예: "3", "- 3 -", "3 / 10", "Page 3", "3쪽")
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^[\s\-–—(]*(page\s*)?\d+\s*(/\s*\d+|쪽|페이지)?[\s\-–—)]*$", re.IGNORECASE
+)
+DEFAULT_OPTIONS = ["매우우수", "우수", "보통", "미흡", "매우미흡"]
+
+
+class EvaluationFormParser:
+    """페이지별 HTML을 받은 순서대로 읽어 평가표 질문을 추출
+
+    여러 페이지에 걸친 표는 이어서 읽고 (다음 페이지에서 반복되는 헤더 행은 제외),
+    머리글/바닥글/표 제목/쪽 번호는 무시합니다.
+    표가 시작된 뒤 제목이 나오거나, 평가 항목과 열 구성이 다른 표가 나오거나,
+    표가 없는 페이지가 나오면 평가표가 끝난 것으로 봅니다.
+    """
+
+    def __init__(self):
+        self.title = None
+        self.questions = []
+        self.started = False
+        self.ended = False
+        self.header_texts = set()
+        self.rows_seen = 0
+        self.row_widths = set()
+        self.current_category = None
+
+    def feed(self, html_content):
+        """한 페이지 HTML 처리 (반환: 평가표가 다음 페이지로 이어질 수 있는지)"""
+        if self.ended:
+            return False
+        soup = BeautifulSoup(html_content, HTML_PARSER)
+        root = soup.body or soup
+        # 표가 없는 페이지를 지나 표가 이어지지는 않음
+        if self.started and root.find("table") is None:
+            self.ended = True
+            return False
+        self.read_elements(root)
+        return not self.ended
+
+    def read_elements(self, parent):
+        for element in parent.find_all(True, recursive=False):
+            if self.ended:
+                return
+            if self.is_ignored(element):
+                continue
+            if element.name == "table":
+                self.read_table(element)
+            elif element.find("table") is not None:  # 표를 감싼 요소
+                self.read_elements(element)
+            elif element.name in HEADING_TAGS:
+                if self.started:
+                    self.ended = True
+                elif element.name == "h1" and self.title is None:
+                    self.title = element.text.strip()
+
+    def is_ignored(self, element):
+        if element.name in IGNORED_TAGS:
+            return True
+        if element.get("data-category") in IGNORED_CATEGORIES:
+            return True
+        return PAGE_NUMBER_PATTERN.match(element.text.strip()) is not None
+
+    def is_evaluation_table(self, table):
+        """이어지는 표가 평가표의 일부인지 (반복되는 헤더나 평가 항목과 같은 열 구성의 행이 있는지)"""
+        if not self.row_widths:  # 아직 헤더만 읽은 경우
+            return True
+        for row in table.find_all("tr"):
+            if row.text.strip() in self.header_texts:
+                return True
+            if len(row.find_all("td")) in self.row_widths:
+                return True
+        return False
+
+    def read_table(self, table):
+        if self.started and not self.is_evaluation_table(table):
+            self.ended = True
+            return
+        self.started = True
+        for row in table.find_all("tr"):
+            row_text = row.text.strip()
+            if self.rows_seen < HEADER_ROWS:  # 헤더 행 제외
+                self.rows_seen += 1
+                self.header_texts.add(row_text)
+                continue
+            if row_text in self.header_texts:  # 다음 페이지에서 반복되는 헤더
+                continue
+            self.rows_seen += 1
+            self.read_row(row.find_all("td"))
+
+    def read_row(self, cells):
+        if not cells:
+            return
+
+        # 카테고리(업적/능력/태도) 확인
+        first_cell = cells[0]
+        if "rowspan" in first_cell.attrs and len(cells) >= 3:
+            self.current_category = first_cell.text.strip()
+            evaluation_item = cells[1].text.strip()
+            criteria = cells[2].text.strip()
+        elif len(cells) >= 2:
+            evaluation_item = cells[0].text.strip()
+            criteria = cells[1].text.strip()
+        else:
+            return
+
+        if evaluation_item and criteria and self.current_category:
+            self.row_widths.add(len(cells))
+            if "rowspan" in first_cell.attrs:  # 같은 카테고리의 다음 행은 한 칸 적음
+                self.row_widths.add(len(cells) - 1)
+            self.questions.append(
+                {
+                    "keyword": self.current_category,
+                    "evaluation_item": evaluation_item,
+                    "criteria": criteria,
+                    "question_type": "single_choice",
+                    "options": list(DEFAULT_OPTIONS),
+                }
+            )
+
+    def result(self):
+        return {
+            "title": self.title or "인사고과 평가표",
+            "questions": self.questions,
+        }
+
+
+def parse_evaluation_form(html_content):
+    """Document Parse 결과 HTML의 평가표를 {title, questions} 형태로 변환"""
+    parser = EvaluationFormParser()
+    parser.feed(html_content)
+    return parser.result()
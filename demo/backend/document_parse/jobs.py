@@ -0,0 +1,66 @@
+"""
+업로드한 문서의 백그라운드 분석 작업.
+
+업로드 요청은 파일 저장 후 분석 작업을 큐에 넣고 job_id만 바로 반환하며,
+분석은 PARSE_WORKERS개의 워커 스레드가 순서대로 처리합니다.
+작업 상태(queued -> parsing -> done / failed)는 file_uploads.db의 parse_jobs 테이블에
+저장되므로 화면은 /api/upload_jobs/<job_id>로 진행 상황을 조회합니다.
+
+- 같은 파일의 작업이 이미 대기/분석 중이면 새 작업을 만들지 않고 그 job_id를 반환
+- 이미 분석한 파일은 바로 done 상태의 작업을 반환
+- 서버가 다시 시작되면 끝나지 않은 작업을 다시 큐에 넣음 (resume_parse_jobs)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db.models.file import (
+    create_parse_job,
+    get_parsed_document,
+    get_unfinished_parse_jobs,
+    update_parse_job,
+)
+
+from .parser import parse_document
+
+# Document Parse API 요청 한도를 고려해 동시에 분석할 문서 수
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 2))
+
+_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS)
+# 같은 파일의 작업이 동시에 두 번 만들어지지 않도록 작업 생성은 한 번에 하나씩
+_submit_lock = threading.Lock()
+
+
+def run_parse_job(job_id, content_hash, file_path):
+    update_parse_job(job_id, "parsing")
+    try:
+        parse_document(content_hash, file_path)
+    except Exception as e:
+        print(f"[document_parse] {job_id} 분석 실패: {e}")
+        update_parse_job(job_id, "failed", f"문서 분석 중 오류가 발생했습니다: {e}")
+    else:
+        update_parse_job(job_id, "done")
+
+
+def submit_parse_job(content_hash, file_path):
+    """분석 작업을 큐에 넣고 job_id 반환 (진행 중인 같은 파일의 작업이 있으면 그 job_id)"""
+    with _submit_lock:
+        if get_parsed_document(content_hash) is not None:
+            return create_parse_job(content_hash, file_path, status="done")
+        unfinished = get_unfinished_parse_jobs(content_hash)
+        if unfinished:
+            return unfinished[0]["job_id"]
+        job_id = create_parse_job(content_hash, file_path)
+    _executor.submit(run_parse_job, job_id, content_hash, file_path)
+    return job_id
+
+
+def resume_parse_jobs():
+    """서버 재시작 전에 끝나지 않은 작업을 다시 큐에 넣음 (반환: 작업 수)"""
+    jobs = get_unfinished_parse_jobs()
+    for job in jobs:
+        _executor.submit(
+            run_parse_job, job["job_id"], job["content_hash"], job["file_path"]
+        )
+    return len(jobs)
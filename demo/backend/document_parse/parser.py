@@ -0,0 +1,74 @@
+"""
+업로드한 평가표 문서 분석 작업.
+
+Upstage Document Parse 결과 HTML과 parse_evaluation_form() 결과를 파일 내용의
+sha256 해시를 키로 file_uploads.db의 parsed_documents 테이블에 저장합니다.
+같은 파일을 다시 올리거나 화면이 다시 실행되어도 저장된 결과를 바로 반환하고,
+같은 파일의 분석 요청이 동시에 들어오면 한 번만 분석합니다.
+
+문서는 페이지 단위로 Document Parse를 요청하면서 받은 페이지부터 평가표를 읽고,
+평가표가 끝나면 (또는 PARSE_MAX_PAGES 페이지까지 읽으면) 나머지 페이지는 요청하지 않습니다.
+"""
+
+import hashlib
+import os
+
+from langchain_upstage import UpstageDocumentParseLoader
+
+from db.models.file import get_parsed_document, save_parsed_document
+from llm import single_flight
+
+from .evaluation_form import EvaluationFormParser
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# 평가표를 찾기 위해 읽을 최대 페이지 수
+PARSE_MAX_PAGES = int(os.getenv("PARSE_MAX_PAGES", 20))
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_document_pages(file_path):
+    """Document Parse API로 한 페이지씩 HTML 변환 (다음 페이지는 필요할 때 요청)"""
+    loader = UpstageDocumentParseLoader(file_path, split="page")
+    for page in loader.lazy_load():
+        yield page.page_content
+
+
+def read_evaluation_form(file_path):
+    """페이지를 받는 대로 평가표를 읽고 평가표가 끝나면 중단 (반환: 읽은 HTML, 평가표)"""
+    form = EvaluationFormParser()
+    html_pages = []
+    pages = load_document_pages(file_path)
+    try:
+        for html in pages:
+            html_pages.append(html)
+            if not form.feed(html) or len(html_pages) >= PARSE_MAX_PAGES:
+                break
+    finally:
+        # 남은 페이지 요청 중단
+        pages.close()
+    return "".join(html_pages), form.result()
+
+
+def parse_document(content_hash, file_path):
+    """저장된 분석 결과가 있으면 반환하고, 없으면 분석해서 저장 (반환: 분석 결과 dict)"""
+    document = get_parsed_document(content_hash)
+    if document is not None:
+        return document
+
+    def parse():
+        # 기다리는 동안 다른 요청이 저장했을 수 있으므로 다시 확인
+        stored = get_parsed_document(content_hash)
+        if stored is not None:
+            return stored
+        html, evaluation_data = read_evaluation_form(file_path)
+        save_parsed_document(content_hash, html, evaluation_data)
+        return get_parsed_document(content_hash)
+
+    return single_flight.do(f"parse:{content_hash}", parse, name="document_parse")
@@ -0,0 +1,47 @@
+"""
+LLM 클라이언트 패키지.
+보고서 생성, 도서 추천, 이메일 생성에서 함께 쓰는 Upstage 클라이언트와
+프롬프트 목록, 캐시/재시도/호출 기록 같은 공통 기능을 제공합니다.
+"""
+
+from .batch import PlannedCall, batch_planner, load_batch_results
+from .cache import completion_cache
+from .circuit import CircuitOpenError, circuit_breaker
+from .client import (
+    LLM_MAX_CONCURRENCY,
+    UPSTAGE_API_BASE,
+    complete,
+    embed,
+    get_chat_model,
+    get_solar_client,
+    is_rate_limit_error,
+    retry_on_rate_limit,
+)
+from .hedging import hedger
+from .ledger import ledger_context, ledger_stage
+from .prompts import PROMPTS, get_chain, invoke
+from .single_flight import single_flight
+
+__all__ = [
+    "PlannedCall",
+    "batch_planner",
+    "load_batch_results",
+    "completion_cache",
+    "CircuitOpenError",
+    "circuit_breaker",
+    "LLM_MAX_CONCURRENCY",
+    "UPSTAGE_API_BASE",
+    "complete",
+    "embed",
+    "get_chat_model",
+    "get_solar_client",
+    "hedger",
+    "ledger_context",
+    "ledger_stage",
+    "is_rate_limit_error",
+    "retry_on_rate_limit",
+    "PROMPTS",
+    "get_chain",
+    "invoke",
+    "single_flight",
+]
@@ -0,0 +1,96 @@
+"""
+오프라인 배치 실행용 작업 기록 / 결과 적재.
+
+- 계획 단계: batch_planner.recording() 안에서 보고서 생성 코드를 그대로 실행하면,
+  캐시에 없는 invoke()/complete() 호출은 API를 부르지 않고 작업 항목으로 기록된 뒤
+  PlannedCall 예외로 중단됩니다. 작업 id는 캐시 키이므로 같은 입력은 항상 같은 id를 가집니다.
+- 렌더링 단계: load_batch_results()가 배치 결과 파일(JSONL 샤드)을 캐시에 적재하여
+  make_pdf.py 등이 API 대신 배치 결과를 읽게 합니다.
+
+작업 파일 생성/실행은 build_pdf/batch_llm.py 참고.
+"""
+
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+# 배치 작업/결과 디렉토리 (설정되어 있으면 렌더링 시작 시 결과를 캐시에 적재)
+LLM_BATCH_DIR = os.getenv("LLM_BATCH_DIR")
+
+
+class PlannedCall(Exception):
+    """계획 단계에서 캐시에 없는 호출 (작업 항목으로 기록됨)"""
+
+
+class BatchPlanner:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = False
+        self.items = {}
+
+    @contextmanager
+    def recording(self):
+        """이 블록 안의 캐시 미스를 기록하고, 기록된 {id: 작업 항목}을 돌려줌"""
+        with self.lock:
+            self.active = True
+            self.items = {}
+        try:
+            yield self.items
+        finally:
+            with self.lock:
+                self.active = False
+
+    def record(self, cache_key, model, prompt_id, prompt_hash, params, call):
+        with self.lock:
+            self.items.setdefault(
+                cache_key,
+                {
+                    "id": cache_key,
+                    "model": model,
+                    "prompt_id": prompt_id,
+                    "prompt_hash": prompt_hash,
+                    "params": params or {},
+                    "call": call,
+                },
+            )
+        raise PlannedCall(prompt_id)
+
+
+batch_planner = BatchPlanner()
+
+
+def read_jsonl(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def result_paths(batch_dir):
+    return sorted(glob.glob(os.path.join(batch_dir, "results", "shard-*.jsonl")))
+
+
+def load_batch_results(batch_dir=None):
+    """배치 결과 샤드를 모두 읽어 캐시에 저장 (반환: 적재한 결과 수)"""
+    # cache.py가 batch_planner를 사용하므로 순환 import를 피해 여기서 import
+    from .cache import completion_cache
+
+    batch_dir = batch_dir or LLM_BATCH_DIR
+    if not batch_dir:
+        return 0
+    count = 0
+    for path in result_paths(batch_dir):
+        for result in read_jsonl(path):
+            completion_cache.put(
+                result["id"],
+                result["model"],
+                result["prompt_id"],
+                result["prompt_hash"],
+                result["params"],
+                result["response"],
+            )
+            count += 1
+    print(f"배치 결과 {count}개를 캐시에 적재 ({batch_dir})")
+    return count
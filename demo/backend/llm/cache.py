@@ -0,0 +1,223 @@
+"""
+LLM 응답 SQLite 캐시.
+
+(모델, 프롬프트 id, 렌더링된 프롬프트 해시, 파라미터)를 키로 응답을 저장하여,
+보고서를 다시 생성하거나 같은 입력이 반복될 때 API를 호출하지 않습니다.
+
+캐시 모드 (LLM_CACHE_MODE 환경 변수 또는 호출별 cache_mode 인자)
+- use: 유효한(TTL 이내) 캐시가 있으면 사용, 없으면 호출 후 저장
+- refresh: 캐시를 읽지 않고 호출한 뒤 결과로 캐시 갱신 (재생성 루프에서 사용)
+- off: 캐시 사용 안 함
+
+캐시에 없는 요청은 single_flight로 감싸 같은 키의 동시 호출을 한 번으로 합칩니다.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from .batch import batch_planner
+from .circuit import circuit_breaker
+from .hedging import hedger
+from .ledger import LLM_LEDGER_MODE, LLM_RUN_ID, ledger_context, record
+from .single_flight import single_flight
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "completion_cache.db"),
+)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "use")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 60 * 60))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))
+# 이 횟수만큼 저장할 때마다 만료/초과 항목 정리
+EVICT_EVERY = 100
+
+
+def make_cache_key(model, prompt_id, rendered, params=None):
+    prompt_hash = hashlib.sha256(rendered.encode("utf-8")).hexdigest()
+    raw = json.dumps(
+        [model, prompt_id, prompt_hash, params or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), prompt_hash
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        db_path=LLM_CACHE_PATH,
+        ttl=LLM_CACHE_TTL,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self._conn = None
+        self._writes_since_evict = 0
+
+    @property
+    def conn(self):
+        # make_pdf.py와 db/models/pdf.py가 순서대로 같은 파일을 쓰므로 처음 사용할 때 연결
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.db_path, timeout=30, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_id TEXT NOT NULL,
+                    prompt_hash TEXT NOT NULL,
+                    params TEXT,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_completions_last_used "
+                "ON completions (last_used_at)"
+            )
+            self._conn.commit()
+            self._evict()
+        return self._conn
+
+    def get(self, cache_key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM completions WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self.conn.execute(
+                "UPDATE completions SET last_used_at = ?, hits = hits + 1 "
+                "WHERE cache_key = ?",
+                (now, cache_key),
+            )
+            self.conn.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, cache_key, model, prompt_id, prompt_hash, params, response):
+        with self.lock:
+            now = time.time()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (cache_key, model, prompt_id, "
+                "prompt_hash, params, response, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    cache_key,
+                    model,
+                    prompt_id,
+                    prompt_hash,
+                    json.dumps(params or {}, ensure_ascii=False, sort_keys=True),
+                    response,
+                    now,
+                    now,
+                ),
+            )
+            self.conn.commit()
+            self.stats["writes"] += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= EVICT_EVERY:
+                self._evict()
+
+    def _evict(self):
+        """TTL이 지난 항목과 최대 개수를 넘는 오래 안 쓴 항목 삭제 (lock 보유 상태에서 호출)"""
+        self._writes_since_evict = 0
+        expired = self._conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (time.time() - self.ttl,)
+        ).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM completions WHERE cache_key IN ("
+            "SELECT cache_key FROM completions ORDER BY last_used_at DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self._conn.commit()
+        self.stats["evictions"] += expired + overflow
+
+    def cached_call(
+        self, func, model, prompt_id, rendered, params=None, mode=None, call=None
+    ):
+        """
+        캐시를 확인하고 없으면 func()를 호출하여 결과(문자열)를 저장
+        call: 배치 계획 단계에서 기록할 호출 정보 (llm/batch.py)
+        """
+        mode = mode or LLM_CACHE_MODE
+        if mode == "off":
+            self.stats["bypassed"] += 1
+            with ledger_context(cache="off"):
+                return func()
+
+        cache_key, prompt_hash = make_cache_key(model, prompt_id, rendered, params)
+        # 배치 계획 중에는 재생성(refresh) 요청도 캐시된 결과를 사용
+        if mode != "refresh" or batch_planner.active:
+            cached = self.get(cache_key)
+            if cached is not None:
+                record("chat", model, prompt_id, cache="hit")
+                return cached
+        else:
+            self.stats["refreshes"] += 1
+
+        if batch_planner.active and call is not None:
+            batch_planner.record(cache_key, model, prompt_id, prompt_hash, params, call)
+
+        fetched = []
+
+        def fetch():
+            fetched.append(True)
+            with ledger_context(cache="refresh" if mode == "refresh" else "miss"):
+                response = func()
+            self.put(cache_key, model, prompt_id, prompt_hash, params, response)
+            return response
+
+        # 같은 키로 진행 중인 호출이 있으면 새로 호출하지 않고 그 결과를 받음
+        response = single_flight.do(cache_key, fetch)
+        if not fetched:
+            record("chat", model, prompt_id, cache="coalesced")
+        return response
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = (
+            round(stats.get("hits", 0) / lookups, 4) if lookups else None
+        )
+        return stats
+
+    def print_stats(self):
+        stats = self.get_stats()
+        hit_rate = stats["hit_rate"]
+        print(
+            f"LLM 캐시 - 적중 {stats.get('hits', 0)} / 미스 {stats.get('misses', 0)}"
+            f" (적중률 {hit_rate * 100 if hit_rate is not None else 0:.1f}%), "
+            f"갱신 {stats.get('refreshes', 0)}, 우회 {stats.get('bypassed', 0)}, "
+            f"저장 {stats.get('writes', 0)}, 정리 {stats.get('evictions', 0)}"
+        )
+        single_flight.print_stats()
+        hedger.print_stats()
+        circuit_breaker.print_stats()
+        if LLM_LEDGER_MODE != "off":
+            print(
+                f"LLM 호출 원장 - 실행 id {LLM_RUN_ID} "
+                f"(단계별 통계: python -m llm.ledger_report --run {LLM_RUN_ID})"
+            )
+
+
+completion_cache = CompletionCache()
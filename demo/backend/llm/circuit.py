@@ -0,0 +1,88 @@
+"""
+엔드포인트별 회로 차단기 (circuit breaker).
+
+같은 엔드포인트(chat:<모델>, embed:<모델>)에서 LLM_CIRCUIT_FAILURES번 연속으로
+실패하면 LLM_CIRCUIT_COOLDOWN초 동안 API를 호출하지 않고 CircuitOpenError를 바로
+발생시킵니다. 대기 시간이 지나면 한 번만 시험 호출하여, 성공하면 다시 닫고 실패하면
+다시 엽니다. Upstage 장애 중에도 재시도 루프가 끝나고 호출부가 기본 문장으로
+넘어갈 수 있게 합니다. 요청 한도 초과(429)는 장애가 아니므로 실패로 세지 않습니다.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", 5))
+LLM_CIRCUIT_COOLDOWN = float(os.getenv("LLM_CIRCUIT_COOLDOWN", 30))
+
+
+def is_rate_limit_error(error):
+    return "429" in str(error) or "too_many_requests" in str(error)
+
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 API를 호출하지 않고 실패"""
+
+
+class CircuitBreaker:
+    def __init__(self, failures=LLM_CIRCUIT_FAILURES, cooldown=LLM_CIRCUIT_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        # 엔드포인트 -> {"failures": 연속 실패 수, "opened_at": 열린 시각, "probing": 시험 호출 중}
+        self.states = {}
+
+    def call(self, endpoint, func):
+        with self.lock:
+            state = self.states.setdefault(
+                endpoint, {"failures": 0, "opened_at": None, "probing": False}
+            )
+            if state["opened_at"] is not None:
+                if time.time() - state["opened_at"] < self.cooldown or state["probing"]:
+                    self.stats[(endpoint, "rejected")] += 1
+                    raise CircuitOpenError(f"{endpoint} 회로 열림 (연속 실패)")
+                state["probing"] = True
+
+        try:
+            result = func()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                # 429는 retry_on_rate_limit()가 기다렸다 재시도하므로 연속 실패에 포함하지 않음
+                with self.lock:
+                    state["probing"] = False
+                raise
+            with self.lock:
+                state["failures"] += 1
+                state["probing"] = False
+                if state["failures"] >= self.max_failures:
+                    if state["opened_at"] is None:
+                        self.stats[(endpoint, "opened")] += 1
+                        print(
+                            f"[{endpoint}] {state['failures']}회 연속 실패, "
+                            f"{self.cooldown:.0f}초 동안 호출 중단"
+                        )
+                    state["opened_at"] = time.time()
+            raise
+
+        with self.lock:
+            if state["opened_at"] is not None:
+                print(f"[{endpoint}] 시험 호출 성공, 호출 재개")
+            state.update(failures=0, opened_at=None, probing=False)
+        return result
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def print_stats(self):
+        stats = self.get_stats()
+        for endpoint in sorted({key[0] for key in stats}):
+            print(
+                f"회로 차단 [{endpoint}] - 열림 {stats.get((endpoint, 'opened'), 0)}회, "
+                f"차단된 호출 {stats.get((endpoint, 'rejected'), 0)}"
+            )
+
+
+circuit_breaker = CircuitBreaker()
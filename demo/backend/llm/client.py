@@ -0,0 +1,181 @@
+"""
+프로세스 전체에서 공유하는 Upstage 클라이언트.
+
+OpenAI 호환 solar 클라이언트와 ChatUpstage 모델은 처음 사용할 때 한 번만 만들고,
+모두 같은 httpx 연결 풀을 사용하므로 사용자마다 TLS 연결을 새로 맺지 않습니다.
+생성은 잠금으로 보호되어 여러 스레드에서 동시에 호출해도 안전합니다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpx
+from dotenv import load_dotenv
+from langchain_upstage import ChatUpstage
+from openai import OpenAI
+
+from .cache import completion_cache
+from .circuit import circuit_breaker, is_rate_limit_error
+from .hedging import hedger
+from .ledger import ledger_context, track
+from .single_flight import single_flight
+
+load_dotenv(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
+)
+
+UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
+UPSTAGE_API_BASE = os.getenv("UPSTAGE_API_BASE") or "https://api.upstage.ai/v1/solar"
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+# 프로세스 전체에서 동시에 진행되는 API 호출 수 상한 (Upstage 요청 한도 보호)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+# 429 재시도 대기 시간 상한 (초, 지수 백오프가 끝없이 길어지지 않도록)
+LLM_RETRY_MAX_WAIT = float(os.getenv("LLM_RETRY_MAX_WAIT", 30))
+
+DEFAULT_CHAT_MODEL = "solar-mini"
+
+_lock = threading.Lock()
+_http_client = None
+_solar_client = None
+_chat_models = {}
+_api_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+def get_http_client():
+    """모든 클라이언트가 공유하는 httpx 연결 풀"""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                )
+    return _http_client
+
+
+def get_solar_client():
+    """chat.completions / embeddings 호출용 OpenAI 호환 클라이언트"""
+    global _solar_client
+    if _solar_client is None:
+        http_client = get_http_client()
+        with _lock:
+            if _solar_client is None:
+                _solar_client = OpenAI(
+                    api_key=UPSTAGE_API_KEY,
+                    base_url=UPSTAGE_API_BASE,
+                    http_client=http_client,
+                )
+    return _solar_client
+
+
+def get_chat_model(model=DEFAULT_CHAT_MODEL):
+    """모델 이름별 ChatUpstage 인스턴스"""
+    chat_model = _chat_models.get(model)
+    if chat_model is None:
+        http_client = get_http_client()
+        with _lock:
+            chat_model = _chat_models.get(model)
+            if chat_model is None:
+                chat_model = ChatUpstage(
+                    model=model,
+                    api_key=UPSTAGE_API_KEY,
+                    base_url=UPSTAGE_API_BASE,
+                    http_client=http_client,
+                )
+                _chat_models[model] = chat_model
+    return chat_model
+
+
+def limited_call(api_func, *args, **kwargs):
+    """공용 세마포어 안에서 API를 호출"""
+    with _api_semaphore:
+        return api_func(*args, **kwargs)
+
+
+def retry_on_rate_limit(api_func, *args, max_attempts=None, **kwargs):
+    """RateLimit (429) 에러에 대해 지수 백오프로 재시도
+    (대기 시간은 LLM_RETRY_MAX_WAIT초까지, max_attempts=None이면 무제한)"""
+    attempt = 0
+    wait_time = 1
+    while True:
+        attempt += 1
+        try:
+            # 원장에 재시도 횟수를 남기기 위해 현재 시도 번호를 전달
+            with ledger_context(attempt=attempt):
+                return api_func(*args, **kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            # 요청 한도 초과 중에는 중복 요청(헤징)으로 부하를 키우지 않음
+            hedger.pause()
+            if max_attempts is not None and attempt >= max_attempts:
+                raise
+            time.sleep(wait_time)
+            wait_time = min(wait_time * 2, LLM_RETRY_MAX_WAIT)
+
+
+def call_chat(model, api_func, prompt_id="raw"):
+    """
+    chat 엔드포인트 호출: 회로 차단기 -> 헤징 순서로 감싸서 호출
+    실제 API 호출(헤징된 중복 요청 포함)은 각각 원장에 기록되며 응답 객체를 그대로 반환
+    """
+    return circuit_breaker.call(
+        f"chat:{model}",
+        lambda: hedger.call(model, lambda: track("chat", model, prompt_id, api_func)),
+    )
+
+
+def complete(prompt, model="solar-pro", prompt_id="raw", cache_mode=None, **kwargs):
+    """단일 user 메시지로 chat.completions를 호출하고 응답 텍스트를 반환 (캐시 적용)"""
+
+    def call():
+        return limited_call(
+            get_solar_client().chat.completions.create,
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=False,
+            **kwargs,
+        )
+
+    return completion_cache.cached_call(
+        lambda: call_chat(model, call, prompt_id).choices[0].message.content,
+        model,
+        prompt_id,
+        prompt,
+        # timeout은 응답 내용에 영향이 없으므로 캐시 키에서 제외
+        {key: value for key, value in kwargs.items() if key != "timeout"},
+        mode=cache_mode,
+        call={"kind": "complete", "prompt": prompt, "kwargs": kwargs},
+    )
+
+
+def embed(texts, model, **kwargs):
+    """텍스트(또는 텍스트 리스트)를 임베딩하여 입력 순서대로 벡터 리스트를 반환"""
+
+    def call():
+        response = track(
+            "embed",
+            model,
+            "embed",
+            lambda: limited_call(
+                get_solar_client().embeddings.create,
+                input=texts,
+                model=model,
+                **kwargs,
+            ),
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    # 임베딩은 캐시하지 않지만 같은 입력의 동시 요청은 한 번만 호출
+    raw = json.dumps([model, texts], ensure_ascii=False)
+    key = "embed:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return single_flight.do(
+        key, lambda: circuit_breaker.call(f"embed:{model}", call), name="embed"
+    )
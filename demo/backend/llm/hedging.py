@@ -0,0 +1,170 @@
+"""
+LLM 요청 헤징 (hedged request).
+
+모델별 응답 시간을 계속 기록해 두고, 호출이 그 모델의 p95를 넘기면 같은 요청을
+한 번 더 보내 먼저 끝난 응답을 사용합니다 (LLM_HEDGE_MODE=on일 때만).
+중복 요청은 전체 호출 수의 LLM_HEDGE_BUDGET 비율까지만 허용하고, 429가 발생하면
+LLM_HEDGE_PAUSE초 동안 중단하여 요청 한도 초과 상황에서 부하를 키우지 않습니다.
+늦게 끝난 요청은 취소할 수 없으므로 결과만 버립니다.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LLM_HEDGE_MODE = os.getenv("LLM_HEDGE_MODE", "off")
+# 호출 대비 중복 요청 비율 상한
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", 0.05))
+# 429 발생 후 헤징을 멈추는 시간(초)
+LLM_HEDGE_PAUSE = float(os.getenv("LLM_HEDGE_PAUSE", 30))
+# p95를 믿고 쓰기 위한 모델별 최소 표본 수와 최소 대기 시간(초)
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 1.0))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", 32))
+# 모델별로 최근 몇 개의 응답 시간을 볼지, 예산을 얼마나 모아 둘 수 있는지
+LATENCY_WINDOW = 200
+BUDGET_BURST = 5
+
+
+class LatencyTracker:
+    """모델별 최근 응답 시간으로 p95 계산"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, model, seconds):
+        with self.lock:
+            self.samples[model].append(seconds)
+
+    def percentile(self, model, q, min_samples=1):
+        with self.lock:
+            ordered = sorted(self.samples.get(model, ()))
+        if not ordered or len(ordered) < min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Hedger:
+    def __init__(
+        self,
+        budget=LLM_HEDGE_BUDGET,
+        pause_seconds=LLM_HEDGE_PAUSE,
+        min_samples=LLM_HEDGE_MIN_SAMPLES,
+        min_delay=LLM_HEDGE_MIN_DELAY,
+        workers=LLM_HEDGE_WORKERS,
+    ):
+        self.budget = budget
+        self.pause_seconds = pause_seconds
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.workers = workers
+        self.latency = LatencyTracker()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.tokens = 0.0
+        self.paused_until = 0.0
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self.lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="llm-hedge"
+                    )
+        return self._executor
+
+    def hedge_delay(self, model):
+        """이 시간 안에 끝나지 않으면 중복 요청 (표본이 부족하면 None)"""
+        p95 = self.latency.percentile(model, 0.95, self.min_samples)
+        return None if p95 is None else max(p95, self.min_delay)
+
+    def pause(self):
+        """429 발생 시 호출, 일정 시간 동안 중복 요청 중단"""
+        with self.lock:
+            self.paused_until = time.time() + self.pause_seconds
+            self.stats["rate_limited"] += 1
+
+    def try_acquire(self):
+        with self.lock:
+            if time.time() < self.paused_until:
+                self.stats["denied_paused"] += 1
+                return False
+            if self.tokens < 1:
+                self.stats["denied_budget"] += 1
+                return False
+            self.tokens -= 1
+            return True
+
+    def timed(self, model, func):
+        start = time.perf_counter()
+        result = func()
+        self.latency.record(model, time.perf_counter() - start)
+        return result
+
+    def submit(self, model, func):
+        # 호출 스레드의 contextvars(LLM 원장의 단계/사용자)를 작업 스레드로 전달
+        context = contextvars.copy_context()
+        return self.executor.submit(context.run, self.timed, model, func)
+
+    def call(self, model, func, mode=None):
+        """func()를 호출하고, p95를 넘기면 한 번 더 호출하여 먼저 성공한 결과를 반환"""
+        with self.lock:
+            self.stats["calls"] += 1
+            # 호출마다 예산이 조금씩 쌓이고 중복 요청 한 번에 1씩 사용
+            self.tokens = min(BUDGET_BURST, self.tokens + self.budget)
+
+        delay = self.hedge_delay(model)
+        if (mode or LLM_HEDGE_MODE) != "on" or delay is None:
+            return self.timed(model, func)
+
+        primary = self.submit(model, func)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.try_acquire():
+            return primary.result()
+
+        with self.lock:
+            self.stats["hedged"] += 1
+        hedge = self.submit(model, func)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self.lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+        # 둘 다 실패하면 원래 요청의 예외를 전달
+        return primary.result()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        with self.latency.lock:
+            models = list(self.latency.samples)
+        stats["p95"] = {
+            model: self.latency.percentile(model, 0.95) for model in sorted(models)
+        }
+        return stats
+
+    def print_stats(self):
+        stats = self.get_stats()
+        p95 = ", ".join(
+            f"{model} {value:.2f}초" for model, value in stats["p95"].items()
+        )
+        print(
+            f"요청 헤징 - 호출 {stats.get('calls', 0)} / 중복 요청 {stats.get('hedged', 0)}"
+            f" (먼저 끝남 {stats.get('hedge_wins', 0)}), "
+            f"예산 부족 {stats.get('denied_budget', 0)}, "
+            f"429 중단 {stats.get('denied_paused', 0)} (429 {stats.get('rate_limited', 0)}회)"
+            + (f", p95: {p95}" if p95 else "")
+        )
+
+
+hedger = Hedger()
@@ -0,0 +1,119 @@
+"""
+LLM / 임베딩 호출 원장 (append-only JSONL).
+
+모든 API 호출과 캐시 적중을 단계(stage), 사용자, 모델, 지연 시간, 입력/출력 토큰,
+재시도 횟수, 캐시 상태와 함께 LLM_LEDGER_PATH에 한 줄씩 추가합니다.
+단계와 사용자는 ledger_context() / ledger_stage()로 지정하며 contextvars로 전달되므로,
+스레드 풀에서 실행할 때는 contextvars.copy_context()로 감싸야 합니다.
+실행별 단계 통계는 llm/ledger_report.py 참고.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+LLM_LEDGER_PATH = os.getenv(
+    "LLM_LEDGER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_ledger.jsonl"),
+)
+LLM_LEDGER_MODE = os.getenv("LLM_LEDGER_MODE", "on")
+# 한 번의 실행(프로세스)을 구분하는 id
+LLM_RUN_ID = os.getenv("LLM_RUN_ID") or (
+    f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+)
+
+_context = contextvars.ContextVar("llm_ledger_context", default={})
+_lock = threading.Lock()
+
+
+@contextmanager
+def ledger_context(**fields):
+    """블록 안의 호출에 stage, user, cache, attempt 등을 기록 (지정한 값만 덮어씀)"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def ledger_stage(stage):
+    """함수 안의 호출을 stage로 기록하는 데코레이터"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ledger_context(stage=stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def usage_of(response):
+    """OpenAI 응답(usage) 또는 LangChain 메시지(usage_metadata)에서 (입력, 출력) 토큰 수"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return (
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
+    metadata = getattr(response, "usage_metadata", None) or {}
+    return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+
+
+def record(kind, model, prompt_id, **fields):
+    if LLM_LEDGER_MODE == "off":
+        return
+    context = _context.get()
+    entry = {
+        "ts": round(time.time(), 3),
+        "run_id": LLM_RUN_ID,
+        "stage": context.get("stage"),
+        "user": context.get("user"),
+        "kind": kind,
+        "model": model,
+        "prompt_id": prompt_id,
+        "cache": context.get("cache", "none"),
+        "retries": context.get("attempt", 1) - 1,
+        "latency": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "status": "ok",
+        **fields,
+    }
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock, open(LLM_LEDGER_PATH, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def track(kind, model, prompt_id, api_func):
+    """API 호출 한 번을 실행하고 지연 시간/토큰/오류를 기록한 뒤 응답을 그대로 반환"""
+    start = time.perf_counter()
+    try:
+        response = api_func()
+    except Exception as e:
+        record(
+            kind,
+            model,
+            prompt_id,
+            latency=round(time.perf_counter() - start, 4),
+            status="error",
+            error=type(e).__name__,
+        )
+        raise
+    prompt_tokens, completion_tokens = usage_of(response)
+    record(
+        kind,
+        model,
+        prompt_id,
+        latency=round(time.perf_counter() - start, 4),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
+    return response
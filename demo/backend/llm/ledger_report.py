@@ -0,0 +1,110 @@
+"""
+LLM 호출 원장(llm/ledger.py) 실행별 단계 통계.
+
+단계별 호출 수, 캐시 적중, 오류, 재시도, API 지연 p50/p95/합계, 토큰 합계를
+API 지연 합계가 큰 단계부터 출력합니다.
+
+사용 예 (backend 디렉토리에서):
+    python -m llm.ledger_report                # 가장 최근 실행
+    python -m llm.ledger_report --run <run_id>
+    python -m llm.ledger_report --all
+"""
+
+import argparse
+import json
+import os
+from collections import defaultdict
+
+from llm.ledger import LLM_LEDGER_PATH
+
+
+def read_ledger(path=LLM_LEDGER_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(entries):
+    """단계별 호출 수, 캐시 적중, 오류, 재시도, API 지연 p50/p95/합계, 토큰 합계"""
+    stages = defaultdict(list)
+    for entry in entries:
+        stages[entry.get("stage") or "-"].append(entry)
+
+    summary = {}
+    for stage, rows in stages.items():
+        api_rows = [row for row in rows if row["cache"] not in ("hit", "coalesced")]
+        latencies = [row["latency"] for row in api_rows]
+        summary[stage] = {
+            "calls": len(rows),
+            "api_calls": len(api_rows),
+            "cache_hits": sum(1 for row in rows if row["cache"] == "hit"),
+            "coalesced": sum(1 for row in rows if row["cache"] == "coalesced"),
+            "errors": sum(1 for row in rows if row["status"] != "ok"),
+            "retries": sum(1 for row in api_rows if row["retries"]),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "total_latency": sum(latencies),
+            "prompt_tokens": sum(row["prompt_tokens"] for row in rows),
+            "completion_tokens": sum(row["completion_tokens"] for row in rows),
+        }
+    return summary
+
+
+def print_summary(summary, title):
+    print(f"=== LLM 호출 원장: {title} ===")
+    print(
+        f"{'단계':<24}{'호출':>6}{'API':>6}{'적중':>6}{'합침':>6}{'오류':>6}{'재시도':>6}"
+        f"{'p50(초)':>9}{'p95(초)':>9}{'합계(초)':>10}{'입력 토큰':>11}{'출력 토큰':>11}"
+    )
+    totals = defaultdict(float)
+    for stage, stats in sorted(
+        summary.items(), key=lambda item: -item[1]["total_latency"]
+    ):
+        print(
+            f"{stage:<24}{stats['calls']:>6}{stats['api_calls']:>6}"
+            f"{stats['cache_hits']:>6}{stats['coalesced']:>6}{stats['errors']:>6}"
+            f"{stats['retries']:>6}{stats['p50']:>9.2f}{stats['p95']:>9.2f}"
+            f"{stats['total_latency']:>10.1f}{stats['prompt_tokens']:>11}"
+            f"{stats['completion_tokens']:>11}"
+        )
+        for key in (
+            "calls",
+            "api_calls",
+            "total_latency",
+            "prompt_tokens",
+            "completion_tokens",
+        ):
+            totals[key] += stats[key]
+    print(
+        f"합계: 호출 {int(totals['calls'])}회 (API {int(totals['api_calls'])}회), "
+        f"API 지연 합계 {totals['total_latency']:.1f}초, "
+        f"토큰 {int(totals['prompt_tokens'])} + {int(totals['completion_tokens'])}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM 호출 원장 단계별 통계")
+    parser.add_argument("--path", default=LLM_LEDGER_PATH)
+    parser.add_argument("--run", help="실행 id (기본: 가장 최근 실행)")
+    parser.add_argument("--all", action="store_true", help="모든 실행 합산")
+    args = parser.parse_args()
+
+    entries = read_ledger(args.path)
+    if not entries:
+        print(f"기록이 없습니다: {args.path}")
+    elif args.all:
+        print_summary(summarize(entries), "전체")
+    else:
+        run_id = args.run or entries[-1]["run_id"]
+        print_summary(
+            summarize([entry for entry in entries if entry["run_id"] == run_id]),
+            run_id,
+        )
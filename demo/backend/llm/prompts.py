@@ -0,0 +1,267 @@
+"""
+프롬프트 레지스트리.
+
+프롬프트마다 id, 템플릿, 모델을 한 곳에 등록해 두고, 체인
+(prompt | ChatUpstage)은 id별로 처음 사용할 때 한 번만 만듭니다.
+"""
+
+import threading
+
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+from .cache import completion_cache
+from .client import DEFAULT_CHAT_MODEL, call_chat, get_chat_model, limited_call
+
+PROMPTS = {
+    # 객관식 점수 -> 영어 3줄 설명 (build_pdf/feedback_summary.py)
+    "multiple_summary": {
+        "template": """
+        The numbers below are assessments of someone's competence.
+        Write a 3-line description based on the scores below. But please exclude the scores from the description.
+        ---
+        TEXT: {text}
+        """,
+    },
+    # 객관식 점수 -> 한국어 3줄 설명, 번역 없이 바로 생성 (build_pdf/feedback_summary.py)
+    "multiple_summary_ko": {
+        "template": """
+        아래 숫자들은 한 사람의 역량 평가 점수야.
+        점수를 바탕으로 이 사람의 역량을 설명하는 3줄 평가를 한국어로 작성해줘. 단, 설명에 점수나 숫자는 넣지 마.
+        ---
+        TEXT: {text}
+        """,
+    },
+    # 영어 -> 한국어 번역 (build_pdf/feedback_summary.py)
+    "translate_enko": {
+        "messages": [("human", "{text}")],
+        "model": "solar-1-mini-translate-enko",
+    },
+    # 주관식 답변 1~2줄 요약 (build_pdf/feedback_summary.py)
+    "subjective_summary": {
+        "template": """
+        너는 훌륭한 요약 전문가야.
+        아래는 개인이 받은 능력 평가야. 이 내용을 바탕으로 장점 또는 개선할 점을 포함해 1~2줄 요약해줘.
+        공식문서 말투로 작성해줘. 답변에 ':'을 넣지 마.
+        ---
+        TEXT: {text}
+        """,
+    },
+    # 많은 피드백을 나눠서 부분 요약 (build_pdf/map_reduce_summary.py)
+    "feedback_partial_summary": {
+        "template": """
+        아래는 한 사람이 동료들에게 받은 피드백의 일부야.
+        장점, 개선할 점, 구체적인 사례를 빠뜨리지 말고 핵심만 간결하게 정리해줘.
+        인물 이름은 쓰지 말고, 정리한 내용만 출력해.
+        ---
+        {text}
+        """,
+    },
+    # 주관식 답변 말투 정규화 (db/models/pdf.py)
+    "tone_normalize": {
+        "template": """
+        아래 주어진 문장을 인물 지칭을 모두 제외하고, 존대하는 평서문으로 내용은 그대로 유지한채로 말투만 바꿔주세요.
+        단, 매우 부정적인 내용은 필터링해주세요.
+        {text}
+        변경 후 텍스트 :
+        """,
+    },
+    # 한 사람이 받은 주관식 답변 전체를 한 번에 말투 정규화 (db/models/pdf.py)
+    "tone_normalize_batch": {
+        "template": """
+        아래 번호가 매겨진 {count}개의 문장을 각각 인물 지칭을 모두 제외하고, 존대하는 평서문으로 내용은 그대로 유지한채로 말투만 바꿔주세요.
+        단, 매우 부정적인 내용은 필터링해주세요.
+        결과는 다른 설명 없이 JSON 배열로만 출력하고, 각 항목은 {{"id": 번호, "text": "변경 후 텍스트"}} 형식으로 번호 순서대로 작성해주세요.
+        {answers}
+        """,
+    },
+    # 한 사람의 보고서 텍스트 전체를 한 번에 생성 (build_pdf/feedback_summary.py)
+    "report_content": {
+        "template": """
+        너는 인사 평가 보고서를 작성하는 전문가야.
+        아래는 한 사람이 받은 역량 점수와 질문별 주관식 평가야. 다음 내용을 JSON으로 작성해줘.
+        - assessment: 점수를 바탕으로 역량을 설명하는 한국어 3줄 평가. 점수나 숫자는 쓰지 마.
+        - questions: 주관식 평가의 [질문 id]마다 장점 또는 개선할 점을 포함한 1~2줄 요약.
+          question에는 질문 id를, summary에는 공식문서 말투의 요약을 쓰고 ':'을 넣지 마.
+        ---
+        점수:
+        {scores}
+        ---
+        주관식 평가:
+        {answers}
+        """,
+        "model": "solar-pro",
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "report_content",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "assessment": {"type": "string"},
+                        "questions": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "question": {"type": "string"},
+                                    "summary": {"type": "string"},
+                                },
+                                "required": ["question", "summary"],
+                            },
+                        },
+                    },
+                    "required": ["assessment", "questions"],
+                },
+            },
+        },
+    },
+    # 키워드 하나의 추천 질문 (routes/question_suggestions.py)
+    "question_suggestions": {
+        "template": """
+        당신은 직장에서 쓰일 동료 피드백 질문 생성 전문가입니다.
+        '{keyword}' 키워드와 관련된 동료 평가용 질문 3개 (객관식 2개, 주관식 1개)를 생성해주세요.
+
+        규칙:
+        1. 각 질문은 구체적이고 명확해야 합니다
+        2. 질문과 함께 질문 유형(객관식, 주관식)도 표시해주세요
+        3. 객관식인 경우 선택지도 함께 제시해주세요
+
+        키워드가 리더쉽인 경우
+        형식:
+        [질문1]
+        - 유형: (질문 유형)
+        - 질문: (질문 내용)
+        - (객관식일 경우) 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
+
+        객관식 예시 응답:
+        [질문1]
+        - 유형: 객관식
+        - 질문: 팀원의 역량 개발을 위해 성과와 능력을 주기적으로 점검하고 개선 방향을 제시한다. 단순 지적이 아니라 구체적이고 건설적인 피드백을 제공한다.
+        - 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
+
+        주관식 예시 응답:
+        [질문1]
+        - 유형: 주관식
+        - 질문: 팀원의 리더십 스타일은 어떠한지 구체적인 설명과 함께 작성해주세요.
+        """,
+        "model": "solar-pro",
+    },
+    # 여러 키워드의 추천 질문을 한 번에 생성 (routes/question_suggestions.py)
+    "question_suggestions_batch": {
+        "template": """
+        당신은 직장에서 쓰일 동료 피드백 질문 생성 전문가입니다.
+        아래 키워드마다 관련된 동료 평가용 질문 3개 (객관식 2개, 주관식 1개)를 생성해주세요.
+        키워드: {keywords}
+
+        규칙:
+        1. 각 질문은 구체적이고 명확해야 합니다
+        2. 질문과 함께 질문 유형(객관식, 주관식)도 표시해주세요
+        3. 객관식인 경우 선택지도 함께 제시해주세요
+        4. keyword에는 키워드를 그대로, questions에는 그 키워드의 질문 3개를 아래 형식의 텍스트로 작성해주세요
+
+        형식:
+        [질문1]
+        - 유형: (질문 유형)
+        - 질문: (질문 내용)
+        - (객관식일 경우) 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
+
+        예시 (키워드가 리더쉽인 경우):
+        [질문1]
+        - 유형: 객관식
+        - 질문: 팀원의 역량 개발을 위해 성과와 능력을 주기적으로 점검하고 개선 방향을 제시한다. 단순 지적이 아니라 구체적이고 건설적인 피드백을 제공한다.
+        - 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
+        [질문2]
+        - 유형: 객관식
+        - 질문: 팀의 목표와 방향을 명확하게 공유하고, 팀원들이 같은 목표를 향해 일할 수 있도록 이끈다.
+        - 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
+        [질문3]
+        - 유형: 주관식
+        - 질문: 팀원의 리더십 스타일은 어떠한지 구체적인 설명과 함께 작성해주세요.
+        """,
+        "model": "solar-pro",
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "question_suggestions",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "suggestions": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "keyword": {"type": "string"},
+                                    "questions": {"type": "string"},
+                                },
+                                "required": ["keyword", "questions"],
+                            },
+                        },
+                    },
+                    "required": ["suggestions"],
+                },
+            },
+        },
+    },
+}
+
+_lock = threading.Lock()
+_prompts = {}
+_chains = {}
+
+
+def build_prompt(prompt_id):
+    spec = PROMPTS[prompt_id]
+    if "messages" in spec:
+        return ChatPromptTemplate.from_messages(spec["messages"])
+    return PromptTemplate.from_template(spec["template"])
+
+
+def get_prompt(prompt_id):
+    prompt = _prompts.get(prompt_id)
+    if prompt is None:
+        with _lock:
+            prompt = _prompts.setdefault(prompt_id, build_prompt(prompt_id))
+    return prompt
+
+
+def get_chain(prompt_id):
+    """prompt_id에 해당하는 미리 컴파일된 체인을 반환"""
+    chain = _chains.get(prompt_id)
+    if chain is None:
+        prompt = get_prompt(prompt_id)
+        spec = PROMPTS[prompt_id]
+        chat_model = get_chat_model(spec.get("model", DEFAULT_CHAT_MODEL))
+        if "response_format" in spec:
+            chat_model = chat_model.bind(response_format=spec["response_format"])
+        with _lock:
+            # 원장에 토큰 수를 기록하도록 문자열이 아닌 메시지(usage_metadata 포함)를 반환
+            chain = _chains.setdefault(prompt_id, prompt | chat_model)
+    return chain
+
+
+def invoke(prompt_id, variables, cache_mode=None):
+    """등록된 프롬프트로 체인을 호출 (렌더링된 프롬프트 기준으로 캐시 적용)"""
+    spec = PROMPTS[prompt_id]
+    model = spec.get("model", DEFAULT_CHAT_MODEL)
+    rendered = get_prompt(prompt_id).invoke(variables).to_string()
+    params = (
+        {"response_format": spec["response_format"]}
+        if "response_format" in spec
+        else None
+    )
+    return completion_cache.cached_call(
+        lambda: call_chat(
+            model,
+            lambda: limited_call(get_chain(prompt_id).invoke, variables),
+            prompt_id,
+        ).content,
+        model,
+        prompt_id,
+        rendered,
+        params,
+        mode=cache_mode,
+        call={"kind": "invoke", "variables": variables},
+    )
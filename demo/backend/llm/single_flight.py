@@ -0,0 +1,56 @@
+"""
+동시에 들어온 같은 LLM 요청 합치기 (single-flight).
+
+make_pdf.py의 워커들이 캐시가 채워지기 전에 같은 요약/임베딩을 동시에 요청하면,
+같은 키의 첫 호출만 API를 부르고 나머지는 그 결과(또는 예외)를 기다려 함께 받습니다.
+"""
+
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.stats = Counter()
+
+    def do(self, key, func, name="completion"):
+        """key가 같은 호출이 진행 중이면 그 결과를 기다리고, 아니면 func()를 직접 호출"""
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = Future()
+            self.stats[(name, "calls" if leader else "coalesced")] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def print_stats(self):
+        stats = self.get_stats()
+        for name in sorted({key[0] for key in stats}):
+            print(
+                f"동시 요청 합치기 [{name}] - 호출 {stats.get((name, 'calls'), 0)} / "
+                f"합쳐짐 {stats.get((name, 'coalesced'), 0)}"
+            )
+
+
+single_flight = SingleFlight()
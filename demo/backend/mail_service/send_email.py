@@ -7,11 +7,11 @@ from concurrent import futures
 
 from dotenv import load_dotenv
 from mailjet_rest import Client
-from openai import OpenAI
+
+from llm import complete, ledger_stage
 
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
 
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 USER_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "db/user.db")
 PDF_DIR = os.path.join(
     os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "pdf"
@@ -20,11 +20,6 @@ PDF_DIR = os.path.join(
 # 이메일 발신자 설정
 SENDER_NAME = "인사팀"
 
-# Solar API 설정
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar"
-)
-
 
 # Mailjet 클라이언트 초기화
 def get_mailjet_client():
@@ -87,6 +82,7 @@ def get_admin_emails():
         conn.close()
 
 
+@ledger_stage("email_template")
 def generate_email_content():
     """Chat API를 사용하여 이메일의 제목과 내용을 생성합니다.
 
@@ -135,13 +131,7 @@ def generate_email_content():
 """
 
     try:
-        response = solar_client.chat.completions.create(
-            model="solar-pro",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-        )
-
-        content = response.choices[0].message.content
+        content = complete(prompt, prompt_id="email_template")
     except Exception as e:
         print(f"이메일 템플릿 생성 중 오류 발생: {str(e)}")
         raise
@@ -1,4 +1,7 @@
+import atexit
 import os
+import subprocess
+import sys
 
 from flask import Flask
 
@@ -6,9 +9,11 @@ from flask import Flask
 BASE_DIR = os.path.dirname(__file__)
 PARENT_DIR = os.path.dirname(BASE_DIR)
 
+from document_parse import resume_parse_jobs
 # Blueprint 임포트
 from routes import (admin_questions_bp, auth_bp, feedback_bp, groups_bp,
-                    mailjet_key_bp, upload_files_bp)
+                    mailjet_key_bp, question_suggestions_bp, upload_files_bp)
+from routes.question_suggestions import prefetch_suggestions
 
 app = Flask(__name__)
 
@@ -16,6 +21,11 @@ app = Flask(__name__)
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 DB_FOLDER = os.path.join(BASE_DIR, "db")
 PDF_FOLDER = os.path.join(PARENT_DIR, "pdf")
+# 업로드 파일 최대 크기 (화면의 50MB 제한과 동일)
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+# 마감 전 보고서 내용 미리 계산 (build_pdf/precompute.py) 사용 여부
+# 주기적으로 유료 API를 호출하므로 기본값은 off (README 참고)
+PRECOMPUTE_MODE = os.getenv("PRECOMPUTE_MODE", "off")
 
 # 디버그: 경로 출력
 print(f"\nDirectory paths:")
@@ -27,6 +37,7 @@ app.config.update(
     UPLOAD_FOLDER=UPLOAD_FOLDER,
     DB_FOLDER=DB_FOLDER,
     PDF_FOLDER=PDF_FOLDER,
+    MAX_CONTENT_LENGTH=MAX_UPLOAD_SIZE,
 )
 
 # 필요한 디렉토리 생성
@@ -45,6 +56,16 @@ def init_database():
     seed_data()
     init_file_db()
 
+def start_precompute_worker():
+    """피드백이 바뀐 사용자의 보고서 내용을 미리 계산하는 백그라운드 프로세스 시작"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = BASE_DIR
+    worker = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, "build_pdf", "precompute.py")],
+        env=env,
+    )
+    atexit.register(worker.terminate)
+
 @app.route("/")
 def index():
     return "Flask backend - from/to username version"
@@ -56,9 +77,18 @@ app.register_blueprint(groups_bp)
 app.register_blueprint(mailjet_key_bp)
 app.register_blueprint(upload_files_bp)
 app.register_blueprint(admin_questions_bp)
+app.register_blueprint(question_suggestions_bp)
 
 if __name__ == "__main__":
     # 데이터베이스 초기화
     init_database()
+    # 디버그 리로더가 다시 띄우는 서버 프로세스가 아닌 최초 프로세스에서 한 번만 시작
+    if PRECOMPUTE_MODE == "on" and not os.environ.get("WERKZEUG_RUN_MAIN"):
+        start_precompute_worker()
+    # 기존 질문 키워드의 AI 추천 질문을 미리 생성 (요청을 받는 서버 프로세스에서)
+    if os.environ.get("WERKZEUG_RUN_MAIN"):
+        prefetch_suggestions()
+        # 서버 재시작 전에 끝나지 않은 문서 분석 작업 이어서 처리
+        resume_parse_jobs()
     # 서버 실행
     app.run(port=5000, debug=True)
\ No newline at end of file
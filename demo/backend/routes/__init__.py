@@ -8,6 +8,7 @@ from .auth import auth_bp
 from .feedback import feedback_bp
 from .groups import groups_bp
 from .mailjet_key import mailjet_key_bp
+from .question_suggestions import question_suggestions_bp
 from .upload_files import upload_files_bp
 
 __all__ = [
@@ -17,4 +18,5 @@ __all__ = [
     "upload_files_bp",
     "admin_questions_bp",
     "mailjet_key_bp",
+    "question_suggestions_bp",
 ]
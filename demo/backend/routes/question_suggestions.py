@@ -0,0 +1,185 @@
+"""
+AI 추천 질문 라우트.
+키워드별 추천 질문을 여러 키워드씩 한 번에 생성하고, (키워드, 프롬프트 버전)별로
+feedback.db의 question_suggestions 테이블에 저장해 두고 재사용합니다.
+기존 질문의 키워드는 서버 시작 시, 편집 화면의 키워드는 목록이 바뀔 때 백그라운드로 미리 생성합니다.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+from db.models.qa import (
+    get_connection,
+    get_question_suggestions,
+    init_question_suggestions_table,
+    save_question_suggestions,
+)
+from flask import Blueprint, jsonify, request
+from llm import PROMPTS, invoke, ledger_stage, retry_on_rate_limit
+
+question_suggestions_bp = Blueprint("question_suggestions", __name__)
+
+# 한 번의 요청으로 생성할 최대 키워드 수
+SUGGESTION_BATCH_SIZE = int(os.getenv("SUGGESTION_BATCH_SIZE", 5))
+# 프롬프트를 수정하면 버전이 바뀌어 저장된 추천 질문을 다시 생성
+SUGGESTION_PROMPT_VERSION = hashlib.sha256(
+    (
+        PROMPTS["question_suggestions"]["template"]
+        + PROMPTS["question_suggestions_batch"]["template"]
+    ).encode("utf-8")
+).hexdigest()[:12]
+
+# 생성 중인 키워드 -> 결과 Future (백그라운드 미리 생성과 화면 요청이 같은 키워드를
+# 중복 생성하지 않도록 하되, 다른 키워드의 요청은 기다리지 않음)
+_pending_lock = threading.Lock()
+_pending = {}
+
+
+def parse_batch_suggestions(response, keywords):
+    """배치 응답에서 요청한 키워드의 추천 질문만 {keyword: 텍스트}로 추출"""
+    try:
+        items = json.loads(response).get("suggestions", [])
+    except (ValueError, AttributeError):
+        return {}
+    suggestions = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        keyword = str(item.get("keyword", "")).strip()
+        text = item.get("questions")
+        if keyword in keywords and isinstance(text, str) and text.strip():
+            suggestions[keyword] = text.strip()
+    return suggestions
+
+
+@ledger_stage("question_suggestions")
+def generate_suggestions(keywords):
+    """키워드를 SUGGESTION_BATCH_SIZE개씩 묶어 생성 (배치 응답에 빠진 키워드는 개별 생성)"""
+    suggestions = {}
+    for start in range(0, len(keywords), SUGGESTION_BATCH_SIZE):
+        batch = keywords[start : start + SUGGESTION_BATCH_SIZE]
+        if len(batch) > 1:
+            response = retry_on_rate_limit(
+                invoke,
+                "question_suggestions_batch",
+                {"keywords": ", ".join(batch)},
+                max_attempts=3,
+            )
+            suggestions.update(parse_batch_suggestions(response, batch))
+        for keyword in batch:
+            if keyword not in suggestions:
+                suggestions[keyword] = retry_on_rate_limit(
+                    invoke,
+                    "question_suggestions",
+                    {"keyword": keyword},
+                    max_attempts=3,
+                ).strip()
+    return suggestions
+
+
+def get_suggestions(keywords):
+    """저장된 추천 질문을 사용하고, 없는 키워드만 생성해서 저장"""
+    keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+    init_question_suggestions_table()
+    suggestions = get_question_suggestions(keywords, SUGGESTION_PROMPT_VERSION)
+    missing = [keyword for keyword in keywords if keyword not in suggestions]
+    if not missing:
+        return {keyword: suggestions[keyword] for keyword in keywords}
+
+    # 다른 요청이 생성 중인 키워드는 그 결과를 기다리고, 나머지만 직접 생성
+    owned, waiting = {}, {}
+    with _pending_lock:
+        for keyword in missing:
+            if keyword in _pending:
+                waiting[keyword] = _pending[keyword]
+            else:
+                owned[keyword] = _pending[keyword] = Future()
+
+    try:
+        if owned:
+            # 직전에 다른 요청이 생성을 마쳤을 수 있으므로 다시 확인
+            generated = get_question_suggestions(list(owned), SUGGESTION_PROMPT_VERSION)
+            remaining = [keyword for keyword in owned if keyword not in generated]
+            if remaining:
+                new_suggestions = generate_suggestions(remaining)
+                save_question_suggestions(new_suggestions, SUGGESTION_PROMPT_VERSION)
+                generated.update(new_suggestions)
+            for keyword, future in owned.items():
+                future.set_result(generated[keyword])
+            suggestions.update(generated)
+    except BaseException as e:
+        for future in owned.values():
+            if not future.done():
+                future.set_exception(e)
+        raise
+    finally:
+        with _pending_lock:
+            for keyword in owned:
+                _pending.pop(keyword, None)
+
+    for keyword, future in waiting.items():
+        suggestions[keyword] = future.result()
+    return {keyword: suggestions[keyword] for keyword in keywords}
+
+
+def get_question_keywords():
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT keyword FROM feedback_questions WHERE keyword != ''"
+        ).fetchall()
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def prefetch_suggestions(keywords=None):
+    """추천 질문을 백그라운드 스레드에서 미리 생성 (keywords가 없으면 기존 질문의 키워드)"""
+
+    def run():
+        try:
+            targets = get_question_keywords() if keywords is None else keywords
+            if targets:
+                get_suggestions(targets)
+        except Exception as e:
+            print(f"[question_suggestions] 미리 생성 실패: {e}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+# 여러 키워드의 추천 질문 조회 (없으면 생성)
+@question_suggestions_bp.route("/api/questions/suggestions", methods=["POST"])
+def question_suggestions():
+    keywords = (request.json or {}).get("keywords") or []
+    if not isinstance(keywords, list) or not keywords:
+        return jsonify({"success": False, "message": "키워드 목록이 필요합니다."}), 400
+    try:
+        suggestions = get_suggestions([str(keyword) for keyword in keywords])
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"질문 생성 중 오류가 발생했습니다: {str(e)}",
+                }
+            ),
+            500,
+        )
+    return jsonify({"success": True, "suggestions": suggestions})
+
+
+# 키워드 목록의 추천 질문을 백그라운드에서 미리 생성
+@question_suggestions_bp.route("/api/questions/suggestions/prefetch", methods=["POST"])
+def prefetch_question_suggestions():
+    keywords = (request.json or {}).get("keywords")
+    if keywords is not None and not isinstance(keywords, list):
+        return jsonify({"success": False, "message": "키워드 목록이 필요합니다."}), 400
+    prefetch_suggestions(
+        None if keywords is None else [str(keyword) for keyword in keywords]
+    )
+    return jsonify({"success": True}), 202
@@ -1,7 +1,18 @@
+import hashlib
+import mimetypes
 import os
 import re
+import tempfile
 
-from db.models.file import save_file_metadata
+from db.models.file import (
+    get_parse_job,
+    get_parsed_document,
+    get_stored_file,
+    release_file,
+    store_file,
+)
+from document_parse import submit_parse_job
+from document_parse.parser import HASH_CHUNK_SIZE
 from flask import Blueprint, jsonify, request
 from werkzeug.utils import secure_filename
 
@@ -32,6 +43,31 @@ def custom_secure_filename(filename):
     return filename[:255]
 
 
+def stored_file_path(content_hash, filename):
+    """파일 내용 해시로 정해지는 저장 경로 (이름이 같은 다른 파일과 겹치지 않음)"""
+    extension = filename.rsplit(".", 1)[1].lower()
+    return os.path.join(UPLOAD_FOLDER, content_hash[:2], f"{content_hash}.{extension}")
+
+
+def write_temp_file(stream, folder):
+    """업로드 내용을 조금씩 임시 파일에 쓰면서 해시 계산 (반환: 임시 파일 경로, sha256, 크기)
+    저장 경로로 옮기거나 같은 내용이 이미 있어 지우는 것은 store_file()에서"""
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=folder, suffix=".part", delete=False) as f:
+        try:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        except Exception:
+            f.close()
+            os.remove(f.name)
+            raise
+    return f.name, digest.hexdigest(), size
+
+
 @upload_files_bp.route("/api/upload_file", methods=["POST"])
 def upload_file():
     if "file" not in request.files:
@@ -42,20 +78,35 @@ def upload_file():
         return jsonify({"success": False, "message": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
-        # 수정된 secure_filename 적용
+        # 수정된 secure_filename 적용 (원래 이름은 기록용, 저장은 내용 해시 경로)
         filename = custom_secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
 
         try:
-            if not os.path.exists(UPLOAD_FOLDER):
-                os.makedirs(UPLOAD_FOLDER)
-            file.save(file_path)
-            save_file_metadata(filename, file_path)
+            temp_path, content_hash, size = write_temp_file(file.stream, UPLOAD_FOLDER)
+            # 같은 내용의 파일이 이미 있으면 임시 파일을 지우고 참조 수만 증가
+            file_path = stored_file_path(content_hash, filename)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            file_path, created = store_file(
+                temp_path,
+                file_path,
+                filename,
+                content_hash,
+                size=size,
+                mime_type=file.mimetype or mimetypes.guess_type(filename)[0],
+            )
+            duplicate = not created
+            job_id = submit_parse_job(content_hash, file_path)
             return (
                 jsonify(
-                    {"success": True, "message": "파일이 성공적으로 업로드되었습니다."}
+                    {
+                        "success": True,
+                        "message": "파일이 성공적으로 업로드되었습니다.",
+                        "content_hash": content_hash,
+                        "duplicate": duplicate,
+                        "job_id": job_id,
+                    }
                 ),
-                200,
+                202,
             )
         except Exception as e:
             return (
@@ -72,3 +123,55 @@ def upload_file():
             jsonify({"success": False, "message": "허용되지 않는 파일 형식입니다."}),
             400,
         )
+
+
+# 저장된 문서 분석 결과 조회 (같은 내용의 파일은 다시 업로드/분석하지 않음)
+@upload_files_bp.route("/api/documents/<content_hash>", methods=["GET"])
+def get_document(content_hash):
+    document = get_parsed_document(content_hash)
+    if document is None:
+        return jsonify({"success": False, "message": "분석 결과가 없습니다."}), 404
+    return jsonify({"success": True, **document})
+
+
+# 업로드된 문서 분석 작업 추가 (분석 결과가 있으면 done 상태의 작업)
+@upload_files_bp.route("/api/documents/<content_hash>/parse", methods=["POST"])
+def parse_uploaded_document(content_hash):
+    stored = get_stored_file(content_hash)
+    if stored is None or not os.path.exists(stored["file_path"]):
+        return (
+            jsonify({"success": False, "message": "업로드된 파일을 찾을 수 없습니다."}),
+            404,
+        )
+    job_id = submit_parse_job(content_hash, stored["file_path"])
+    return jsonify({"success": True, "job_id": job_id}), 202
+
+
+# 분석 작업 상태 조회 (done이면 분석 결과 포함)
+@upload_files_bp.route("/api/upload_jobs/<job_id>", methods=["GET"])
+def get_upload_job(job_id):
+    job = get_parse_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    response = {
+        "success": True,
+        "job_id": job_id,
+        "content_hash": job["content_hash"],
+        "status": job["status"],
+        "message": job["message"],
+    }
+    if job["status"] == "done":
+        response.update(get_parsed_document(job["content_hash"]) or {})
+    return jsonify(response)
+
+
+# 업로드 참조 해제 (마지막 참조면 저장된 파일 삭제, 분석 결과는 다시 올릴 때를 위해 유지)
+@upload_files_bp.route("/api/documents/<content_hash>", methods=["DELETE"])
+def delete_document(content_hash):
+    ref_count = release_file(content_hash)
+    if ref_count is None:
+        return (
+            jsonify({"success": False, "message": "업로드된 파일을 찾을 수 없습니다."}),
+            404,
+        )
+    return jsonify({"success": True, "ref_count": ref_count})
@@ -1,4 +1,5 @@
 import json
+import os
 
 import pytest
 from main import app
@@ -11,6 +12,24 @@ def client():
         yield client
 
 
+@pytest.fixture(autouse=True)
+def llm_state(tmp_path, monkeypatch):
+    # LLM 캐시/호출 기록/배치 결과를 테스트마다 임시 디렉토리에 두어 소스 트리에 남기지 않음
+    from llm import batch, completion_cache, ledger
+
+    state_dir = tmp_path / "llm_state"
+    state_dir.mkdir()
+    monkeypatch.setattr(ledger, "LLM_LEDGER_PATH", str(state_dir / "llm_ledger.jsonl"))
+    monkeypatch.setattr(batch, "LLM_BATCH_DIR", str(state_dir / "batch"))
+    monkeypatch.setattr(
+        completion_cache, "db_path", str(state_dir / "completion_cache.db")
+    )
+    monkeypatch.setattr(completion_cache, "_conn", None)
+    yield
+    if completion_cache._conn is not None:
+        completion_cache._conn.close()
+
+
 def test_index(client):
     response = client.get("/")
     assert response.status_code == 200
@@ -254,3 +273,673 @@ def test_group_operations(client):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data["success"] == True
+
+
+def test_upstage_stub():
+    from upstage_stub import create_app
+
+    stub = create_app(seed=0).test_client()
+    first = stub.post(
+        "/v1/solar/embeddings",
+        json={"input": ["책", "도서"], "model": "embedding-query"},
+    ).get_json()
+    second = stub.post(
+        "/v1/solar/embeddings", json={"input": "책", "model": "embedding-query"}
+    ).get_json()
+    assert len(first["data"]) == 2
+    assert first["data"][0]["embedding"] == second["data"][0]["embedding"]
+
+    response = stub.post(
+        "/v1/solar/chat/completions",
+        json={"model": "solar-pro", "messages": [{"role": "user", "content": "요약"}]},
+    )
+    assert response.status_code == 200
+    assert response.get_json()["choices"][0]["message"]["content"]
+
+    # 여러 키워드 추천 질문 프롬프트는 예시의 [질문N]이 아닌 키워드마다 응답
+    from llm.prompts import PROMPTS
+
+    batch = PROMPTS["question_suggestions_batch"]
+    response = stub.post(
+        "/v1/solar/chat/completions",
+        json={
+            "model": batch["model"],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": batch["template"].format(keywords="리더십, 협업"),
+                }
+            ],
+            "response_format": batch["response_format"],
+        },
+    )
+    content = json.loads(response.get_json()["choices"][0]["message"]["content"])
+    assert [item["keyword"] for item in content["suggestions"]] == ["리더십", "협업"]
+
+    limited = create_app(rate_limit_ratio=1.0).test_client()
+    response = limited.post("/v1/solar/embeddings", json={"input": "책"})
+    assert response.status_code == 429
+    assert response.get_json()["error"]["code"] == "too_many_requests"
+
+
+def test_normalize_passage():
+    from book_chunk.passage_normalizer import estimate_tokens, normalize_passage
+
+    raw = "▶ [책소개]  R&amp;D 전략을   다룬 책입니다. 두 번째 문장입니다. 잘린 문..."
+    assert normalize_passage(raw) == "R&D 전략을 다룬 책입니다. 두 번째 문장입니다."
+    # 잘리지 않은 글은 마침표 없이 끝나도 마지막 문장 유지
+    complete = "성장을 돕는 책입니다. 리더십을 다룬다"
+    assert normalize_passage(complete) == complete
+    assert normalize_passage("소개합니다…") == "소개합니다"
+
+    truncated = normalize_passage("첫 문장입니다. 둘째 문장입니다.", token_budget=8)
+    assert truncated == "첫 문장입니다."
+    assert estimate_tokens(normalize_passage("가" * 400, token_budget=50)) <= 50
+
+
+def test_completion_cache(tmp_path):
+    from llm.cache import CompletionCache
+
+    cache = CompletionCache(db_path=str(tmp_path / "cache.db"), max_entries=2)
+    calls = []
+
+    def call():
+        calls.append(1)
+        return f"응답{len(calls)}"
+
+    assert cache.cached_call(call, "solar-mini", "p", "프롬프트") == "응답1"
+    assert cache.cached_call(call, "solar-mini", "p", "프롬프트") == "응답1"
+    assert cache.cached_call(call, "solar-pro", "p", "프롬프트") == "응답2"
+    assert cache.cached_call(call, "solar-mini", "p", "프롬프트", mode="off") == "응답3"
+    assert (
+        cache.cached_call(call, "solar-mini", "p", "프롬프트", mode="refresh")
+        == "응답4"
+    )
+    assert cache.cached_call(call, "solar-mini", "p", "프롬프트") == "응답4"
+    assert cache.get_stats()["hits"] == 2
+
+    for prompt in ["a", "b", "c"]:
+        cache.cached_call(call, "solar-mini", "p", prompt)
+    with cache.lock:
+        cache._evict()
+        count = cache.conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+    assert count == 2
+
+
+def test_single_flight():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from llm.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def call():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "결과"
+
+    def request(_):
+        return flight.do("key", call)
+
+    # 첫 호출이 진행 중일 때 들어온 같은 키의 요청은 그 결과를 함께 받음
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(request, 0)
+        started.wait()
+        results = list(executor.map(request, range(3)))
+    assert [leader.result(), *results] == ["결과"] * 4
+    assert len(calls) == 1
+    assert flight.get_stats() == {
+        ("completion", "calls"): 1,
+        ("completion", "coalesced"): 3,
+    }
+
+    # 예외도 기다리던 호출에 전달되고, 끝난 키는 다시 호출됨
+    def fail():
+        raise ValueError("실패")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", call) == "결과"
+    assert len(calls) == 2
+
+
+def test_hedger():
+    import time
+
+    from llm.hedging import Hedger
+
+    hedger = Hedger(budget=1, pause_seconds=60, min_samples=3, min_delay=0.05)
+    for _ in range(3):
+        hedger.latency.record("solar-mini", 0.01)
+    calls = []
+
+    def call():
+        calls.append(1)
+        # 첫 요청만 p95보다 오래 걸림
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "느린 응답"
+        return "빠른 응답"
+
+    assert hedger.call("solar-mini", call, mode="on") == "빠른 응답"
+    assert hedger.get_stats()["hedge_wins"] == 1
+
+    # 429 이후에는 예산이 있어도 중복 요청하지 않음
+    calls.clear()
+    hedger.pause()
+    assert hedger.call("solar-mini", call, mode="on") == "느린 응답"
+    assert len(calls) == 1
+    assert hedger.get_stats()["denied_paused"] == 1
+
+
+def test_circuit_breaker_fallback(monkeypatch):
+    from build_pdf import feedback_summary
+    from llm.circuit import CircuitBreaker, CircuitOpenError
+
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+
+    def fail():
+        raise RuntimeError("503 Service Unavailable")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call("chat:solar-mini", fail)
+    # 연속 실패 후에는 호출하지 않고 바로 실패, 다른 엔드포인트는 영향 없음
+    with pytest.raises(CircuitOpenError):
+        breaker.call("chat:solar-mini", lambda: "응답")
+    assert breaker.call("embed:embedding-query", lambda: "응답") == "응답"
+
+    calls = []
+
+    def invoke(prompt_id, variables, cache_mode=None):
+        calls.append(prompt_id)
+        raise CircuitOpenError("chat:solar-mini 회로 열림")
+
+    monkeypatch.setattr(feedback_summary, "invoke", invoke)
+    monkeypatch.setattr(feedback_summary, "get_keywords", lambda: ["업적", "협업"])
+    content = feedback_summary.build_report_content(
+        [["업적", 4.2], ["협업", 3.1]],
+        [["q_2", "['꼼꼼합니다. 빠릅니다.', '비율: 좋음']"]],
+        mode="single",
+    )
+    assert content["degraded"] == ["assessment", "subjective"]
+    assert content["assessment"].startswith("업적 영역에서 가장 높은 평가")
+    assert "협업 영역은" in content["assessment"]
+    assert content["subjective"] == [
+        {"question": "q_2", "response": "꼼꼼합니다. 비율 좋음"}
+    ]
+    # 구조화 호출이 API 오류로 실패하면 항목별 호출로 늘리지 않음
+    assert calls == ["report_content"]
+
+
+def test_report_rate_limit_fallback(monkeypatch):
+    import llm.client
+    from build_pdf import feedback_summary
+
+    calls = []
+
+    def invoke(prompt_id, variables, cache_mode=None):
+        calls.append(prompt_id)
+        raise RuntimeError("Error code: 429 - too_many_requests")
+
+    monkeypatch.setattr(feedback_summary, "invoke", invoke)
+    monkeypatch.setattr(feedback_summary, "get_keywords", lambda: ["업적", "협업"])
+    monkeypatch.setattr(llm.client.time, "sleep", lambda seconds: None)
+    # 요청 한도 초과가 계속되어도 정해진 횟수만 재시도하고 기본 문장 사용
+    content = feedback_summary.build_report_content(
+        [["업적", 4.2], ["협업", 3.1]], [["q_2", "['꼼꼼합니다.']"]], mode="multi"
+    )
+    assert content["degraded"] == ["assessment", "subjective"]
+    assert len(calls) == 2 * feedback_summary.REPORT_MAX_ATTEMPTS
+
+
+def test_circuit_breaker_rate_limit():
+    from llm.circuit import CircuitBreaker
+
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+
+    def throttled():
+        raise RuntimeError("Error code: 429 - too_many_requests")
+
+    # 요청 한도 초과는 장애가 아니므로 여러 번 받아도 회로가 열리지 않음
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            breaker.call("chat:solar-mini", throttled)
+    assert breaker.call("chat:solar-mini", lambda: "응답") == "응답"
+    assert not breaker.get_stats()
+
+
+def test_condense_feedback(monkeypatch):
+    from build_pdf import map_reduce_summary
+
+    calls = []
+
+    def invoke(prompt_id, variables, cache_mode=None):
+        calls.append(variables["text"])
+        return "부분 요약"
+
+    monkeypatch.setattr(map_reduce_summary, "invoke", invoke)
+    answers = ["꼼꼼하게 일정을 관리합니다." * 5 for _ in range(10)]
+
+    # 예산 이하이면 호출하지 않고 그대로 반환
+    assert map_reduce_summary.condense_feedback(answers, budget=10000) is answers
+    assert calls == []
+
+    # 예산을 넘으면 순서대로 나눠 부분 요약
+    chunks = map_reduce_summary.chunk_by_tokens(answers, chunk_tokens=200)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    condensed = map_reduce_summary.condense_feedback(
+        answers, budget=500, chunk_tokens=200
+    )
+    assert condensed == ["부분 요약"] * 4
+    assert len(calls) == 4
+
+
+def test_batch_planner(tmp_path, monkeypatch):
+    import llm.cache
+    from llm import batch
+
+    cache = llm.cache.CompletionCache(db_path=str(tmp_path / "cache.db"))
+    monkeypatch.setattr(llm.cache, "completion_cache", cache)
+    call = {"kind": "invoke", "variables": {"text": "답변"}}
+
+    # 계획 중에는 캐시에 없는 호출을 실행하지 않고 작업으로 기록
+    with batch.batch_planner.recording() as items:
+        with pytest.raises(batch.PlannedCall):
+            cache.cached_call(
+                lambda: "API 응답", "solar-mini", "p", "프롬프트", call=call
+            )
+    (item,) = items.values()
+    assert item["call"] == call
+
+    # 배치 결과를 적재하면 렌더링 시 API 대신 결과를 사용
+    (tmp_path / "results").mkdir()
+    result = {key: item[key] for key in ("id", "model", "prompt_id", "prompt_hash")}
+    result.update(params=item["params"], response="배치 응답")
+    (tmp_path / "results" / "shard-000.jsonl").write_text(
+        json.dumps(result, ensure_ascii=False) + "\n", encoding="utf-8"
+    )
+    assert batch.load_batch_results(str(tmp_path)) == 1
+    assert cache.cached_call(lambda: "API 응답", "solar-mini", "p", "프롬프트") == (
+        "배치 응답"
+    )
+
+
+def test_llm_ledger(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from llm import ledger, ledger_report
+
+    path = tmp_path / "ledger.jsonl"
+    monkeypatch.setattr(ledger, "LLM_LEDGER_PATH", str(path))
+    response = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+    )
+
+    # 단계/사용자/재시도 정보는 호출부의 컨텍스트에서 가져옴
+    with ledger.ledger_context(stage="report_content", user="user1", attempt=2):
+        assert ledger.track("chat", "solar-mini", "p", lambda: response) is response
+        ledger.record("chat", "solar-mini", "p", cache="hit")
+    with pytest.raises(ValueError):
+        ledger.track("chat", "solar-mini", "p", lambda: int("x"))
+
+    entries = ledger_report.read_ledger(str(path))
+    assert [entry["stage"] for entry in entries] == ["report_content"] * 2 + [None]
+    assert entries[0]["user"] == "user1" and entries[0]["retries"] == 1
+    assert entries[2]["status"] == "error"
+
+    summary = ledger_report.summarize(entries)
+    stats = summary["report_content"]
+    assert (stats["calls"], stats["api_calls"], stats["cache_hits"]) == (2, 1, 1)
+    assert (stats["prompt_tokens"], stats["completion_tokens"]) == (120, 30)
+    assert summary["-"]["errors"] == 1
+
+
+def test_question_suggestions(client, monkeypatch):
+    from db.models.qa import get_connection
+    from routes import question_suggestions
+
+    calls = []
+
+    def invoke(prompt_id, variables, cache_mode=None):
+        calls.append(prompt_id)
+        if prompt_id == "question_suggestions_batch":
+            # 배치 응답에서 빠진 키워드는 개별 생성
+            return json.dumps(
+                {"suggestions": [{"keyword": "협업", "questions": "[질문1] 협업"}]}
+            )
+        return f"[질문1] {variables['keyword']}"
+
+    monkeypatch.setattr(question_suggestions, "invoke", invoke)
+    monkeypatch.setattr(question_suggestions, "SUGGESTION_PROMPT_VERSION", "test")
+    try:
+        for _ in range(2):
+            response = client.post(
+                "/api/questions/suggestions", json={"keywords": ["협업", "리더십"]}
+            )
+            assert response.status_code == 200
+            assert json.loads(response.data)["suggestions"] == {
+                "협업": "[질문1] 협업",
+                "리더십": "[질문1] 리더십",
+            }
+        # 두 번째 요청은 저장된 결과를 사용
+        assert calls == ["question_suggestions_batch", "question_suggestions"]
+
+        # 다른 키워드를 생성하는 중에도 기다리지 않고 바로 생성
+        import threading
+
+        release = threading.Event()
+
+        def slow_invoke(prompt_id, variables, cache_mode=None):
+            if variables["keyword"] == "느린 키워드":
+                release.wait(5)
+            return f"[질문1] {variables['keyword']}"
+
+        monkeypatch.setattr(question_suggestions, "invoke", slow_invoke)
+        slow = threading.Thread(
+            target=question_suggestions.get_suggestions, args=(["느린 키워드"],)
+        )
+        slow.start()
+        assert question_suggestions.get_suggestions(["빠른 키워드"]) == {
+            "빠른 키워드": "[질문1] 빠른 키워드"
+        }
+        assert slow.is_alive()
+        release.set()
+        slow.join()
+    finally:
+        conn = get_connection()
+        conn.execute("DELETE FROM question_suggestions WHERE prompt_version = 'test'")
+        conn.commit()
+        conn.close()
+
+
+def test_parse_document(client, tmp_path, monkeypatch):
+    from db.models import file
+    from document_parse import file_sha256, parser
+
+    monkeypatch.setattr(file, "DB_PATH", str(tmp_path / "file_uploads.db"))
+    file.init_db()
+    html = (
+        "<h1>평가표</h1><table>" + "<tr><th>헤더</th></tr>" * 3 + "<tr>"
+        '<td rowspan="1">업적</td><td>업무 처리</td><td>주도적으로 처리하는가?</td>'
+        "</tr></table>"
+    )
+    loads = []
+
+    def load_document_pages(file_path):
+        loads.append(file_path)
+        yield html
+
+    monkeypatch.setattr(parser, "load_document_pages", load_document_pages)
+    path = tmp_path / "form.pdf"
+    path.write_bytes(b"evaluation form")
+    content_hash = file_sha256(str(path))
+
+    assert client.get(f"/api/documents/{content_hash}").status_code == 404
+    # 같은 내용은 한 번만 분석하고 이후에는 저장된 결과를 반환
+    for _ in range(2):
+        document = parser.parse_document(content_hash, str(path))
+        assert document["evaluation_data"]["questions"][0]["keyword"] == "업적"
+    assert len(loads) == 1
+    response = client.get(f"/api/documents/{content_hash}")
+    assert json.loads(response.data)["html"] == html
+
+
+def evaluation_form_row(*cells, rowspan=None):
+    """평가표 행 HTML (선택지 5칸 포함, rowspan이 있으면 첫 칸이 카테고리)"""
+    tds = [f"<td>{cell}</td>" for cell in cells]
+    if rowspan is not None:
+        tds[0] = f'<td rowspan="{rowspan}">{cells[0]}</td>'
+    return "<tr>" + "".join(tds) + "<td></td>" * 5 + "</tr>"
+
+
+def read_evaluation_form_pages(monkeypatch, pages):
+    from document_parse import parser
+
+    requested = []
+
+    def load_document_pages(file_path):
+        for page in pages:
+            requested.append(page)
+            yield page
+
+    monkeypatch.setattr(parser, "load_document_pages", load_document_pages)
+    html, evaluation_data = parser.read_evaluation_form("form.pdf")
+    items = [(q["keyword"], q["evaluation_item"]) for q in evaluation_data["questions"]]
+    return requested, html, evaluation_data, items
+
+
+def test_evaluation_form_pages(monkeypatch):
+    header = "<tr><td>구분</td><td>평가 요소</td><td>매우우수</td></tr>"
+    pages = [
+        "<header>1</header><h1>2025 평가표</h1><table>"
+        + header * 3
+        + evaluation_form_row("업적", "업무 처리", "주도적인가?", rowspan=3)
+        + evaluation_form_row("계획", "도전적인가?")
+        + "</table>",
+        # 다음 페이지로 이어지는 표 (반복되는 헤더 행 제외)
+        "<header>2</header><table>"
+        + header
+        + evaluation_form_row("보고", "제때 보고하는가?")
+        + evaluation_form_row("태도", "성실성", "성실한가?", rowspan=1)
+        + "</table><p>※ 평가 기준 안내</p>",
+        # 평가 항목과 열 구성이 다른 표가 나오면 평가표가 끝남
+        "<table><tr><td>서명</td><td>평가자</td></tr></table>",
+        "<table>" + evaluation_form_row("기타", "비고") + "</table>",
+    ]
+    requested, html, evaluation_data, items = read_evaluation_form_pages(
+        monkeypatch, pages
+    )
+    assert evaluation_data["title"] == "2025 평가표"
+    assert items == [
+        ("업적", "업무 처리"),
+        ("업적", "계획"),
+        ("업적", "보고"),
+        ("태도", "성실성"),
+    ]
+    # 평가표가 끝난 뒤의 페이지는 요청하지 않음
+    assert len(requested) == 3 and "비고" not in html
+
+
+def test_evaluation_form_footer(monkeypatch):
+    pages = [
+        "<h1>2025 평가표</h1><table>"
+        + "<tr><td>구분</td></tr>" * 3
+        + evaluation_form_row("업적", "업무 처리", "주도적인가?", rowspan=2)
+        + "</table>"
+        # 페이지 사이의 바닥글/쪽 번호/표 제목은 무시
+        + '<p data-category="footer">주식회사 예시</p><p>- 1 -</p>',
+        "<caption>인사고과 평가표 (계속)</caption><table>"
+        + evaluation_form_row("계획", "도전적인가?")
+        + "</table><footer>대외비</footer><p>2 / 3</p>",
+        "<table>"
+        + evaluation_form_row("능력", "전문성", "전문적인가?", rowspan=1)
+        + "</table><h2>평가 기준 안내</h2>",
+        "<table>" + evaluation_form_row("기타", "비고") + "</table>",
+    ]
+    requested, html, evaluation_data, items = read_evaluation_form_pages(
+        monkeypatch, pages
+    )
+    assert items == [("업적", "업무 처리"), ("업적", "계획"), ("능력", "전문성")]
+    # 제목이 나오면 평가표가 끝남
+    assert len(requested) == 3 and "비고" not in html
+
+
+def test_upload_parse_job(client, tmp_path, monkeypatch):
+    import io
+    import time
+
+    from db.models import file
+    from document_parse import parser
+    from routes import upload_files
+
+    monkeypatch.setattr(file, "DB_PATH", str(tmp_path / "file_uploads.db"))
+    monkeypatch.setattr(upload_files, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    monkeypatch.setattr(
+        parser,
+        "load_document_pages",
+        lambda file_path: (page for page in ["<h1>평가표</h1>"]),
+    )
+    file.init_db()
+
+    responses = [
+        client.post(
+            "/api/upload_file",
+            data={"file": (io.BytesIO(b"evaluation form"), "form.pdf")},
+            content_type="multipart/form-data",
+        )
+        for _ in range(2)
+    ]
+    first, second = [json.loads(response.data) for response in responses]
+    assert responses[0].status_code == 202
+    # 같은 내용은 다시 저장하지 않음
+    assert first["content_hash"] == second["content_hash"]
+    assert not first["duplicate"] and second["duplicate"]
+    stored = file.get_stored_file(first["content_hash"])
+    assert stored["ref_count"] == 2 and stored["size"] == len(b"evaluation form")
+    assert len(list((tmp_path / "uploads").rglob("*.pdf"))) == 1
+    assert not list((tmp_path / "uploads").rglob("*.part"))
+
+    for _ in range(50):
+        job = json.loads(client.get(f"/api/upload_jobs/{first['job_id']}").data)
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "done"
+    assert job["evaluation_data"]["title"] == "평가표"
+    assert client.get("/api/upload_jobs/unknown").status_code == 404
+    assert file.get_stored_file(first["content_hash"])["parse_status"] == "done"
+
+    # 마지막 참조를 해제하면 저장된 파일 삭제
+    for ref_count in (1, 0):
+        response = client.delete(f"/api/documents/{first['content_hash']}")
+        assert json.loads(response.data)["ref_count"] == ref_count
+    assert not os.path.exists(stored["file_path"])
+
+
+def test_parse_tone_batch():
+    from db.models.pdf import parse_tone_batch
+
+    response = (
+        '결과입니다.\n[{"id": 2, "text": "두 번째"}, {"id": 1, "text": "첫 번째"}]'
+    )
+    assert parse_tone_batch(response, 2) == ["첫 번째", "두 번째"]
+    # 빠진 항목과 형식이 틀린 항목은 None으로 남겨 개별 요청으로 대체
+    assert parse_tone_batch('[{"id": 1, "text": "a"}, {"id": "x"}]', 3) == [
+        "a",
+        None,
+        None,
+    ]
+    assert parse_tone_batch('["a", "b"]', 2) == ["a", "b"]
+    assert parse_tone_batch("JSON이 아닙니다", 2) == [None, None]
+
+
+def test_tone_batch_rate_limit(monkeypatch):
+    import llm.client
+    from db.models import pdf
+
+    calls = []
+
+    def invoke(prompt_id, variables, cache_mode=None):
+        calls.append(prompt_id)
+        # 동시에 처리하는 다른 사용자 때문에 한 번 요청 한도 초과
+        if len(calls) == 1:
+            raise RuntimeError("Error code: 429 - too_many_requests")
+        return '[{"id": 1, "text": "좋습니다."}]'
+
+    monkeypatch.setattr(pdf, "invoke", invoke)
+    monkeypatch.setattr(llm.client.time, "sleep", lambda seconds: None)
+    assert pdf.normalize_tone_batch(["좋아요"]) == ["좋습니다."]
+    assert calls == ["tone_normalize_batch"] * 2
+
+
+def test_parse_report_content():
+    from build_pdf.feedback_summary import parse_report_content
+
+    response = json.dumps(
+        {
+            "assessment": "성실하게 업무를 수행합니다. 점수는 4점입니다.",
+            "questions": [
+                {"question": "q_1", "summary": "요약: 협업이 뛰어납니다. 꼼꼼합니다."},
+                {"question": "2", "summary": "일정 관리가 우수합니다."},
+            ],
+        },
+        ensure_ascii=False,
+    )
+    content = parse_report_content(response, ["q_1", "q_2", "q_3"])
+    assert content["assessment"] == "성실하게 업무를 수행합니다."
+    assert [entry["response"] for entry in content["subjective"]] == [
+        "협업이 뛰어납니다. 꼼꼼합니다.",
+        "일정 관리가 우수합니다.",
+        None,
+    ]
+    assert parse_report_content("JSON 아님", ["q_1"])["assessment"] is None
+
+
+def test_generate_validated(monkeypatch):
+    from build_pdf import feedback_summary
+
+    def fake_invoke(responses):
+        calls = []
+
+        def invoke(prompt_id, variables, cache_mode=None):
+            calls.append(cache_mode)
+            return responses[min(len(calls), len(responses)) - 1]
+
+        return invoke, calls
+
+    def generate():
+        return feedback_summary.generate_validated(
+            "subjective_summary",
+            {"text": "x"},
+            ":",
+            repair=feedback_summary.repair_colon_text,
+            fallback=lambda text: text.replace(":", " "),
+        )
+
+    # 로컬 복구로 해결되면 재생성하지 않음
+    invoke, calls = fake_invoke(["요약: 협업이 뛰어납니다."])
+    monkeypatch.setattr(feedback_summary, "invoke", invoke)
+    assert generate() == "협업이 뛰어납니다."
+    assert calls == [None]
+
+    # 복구가 안 되면 최대 횟수만큼만 재생성한 뒤 대체 문장 사용
+    monkeypatch.setattr(feedback_summary, "SUMMARY_MAX_REGENERATIONS", 2)
+    invoke, calls = fake_invoke(["비율은 3:1 입니다"])
+    monkeypatch.setattr(feedback_summary, "invoke", invoke)
+    assert generate() == "비율은 3 1 입니다"
+    assert calls == [None, "refresh", "refresh"]
+    assert feedback_summary.regeneration_stats[("subjective_summary", "fallback")] >= 1
+
+
+def test_score_bucket(monkeypatch):
+    from build_pdf import feedback_summary
+
+    monkeypatch.setattr(
+        feedback_summary, "get_keywords", lambda: ["업적", "태도", "협업"]
+    )
+    # 최고/최저 키워드와 반올림한 점수가 같으면 같은 구간
+    a = feedback_summary.score_bucket([["업적", 4.27], ["태도", 3.9], ["협업", 3.1]])
+    b = feedback_summary.score_bucket([["업적", 4.4], ["태도", 4.1], ["협업", 2.9]])
+    assert a == b == (("업적", 4.5), ("태도", 4.0), ("협업", 3.0))
+    # 최고 키워드가 다르면 다른 구간
+    c = feedback_summary.score_bucket([["업적", 3.9], ["태도", 4.1], ["협업", 3.1]])
+    assert c == (("태도", 4.0), ("업적", 4.0), ("협업", 3.0))
+
+    calls = []
+    monkeypatch.setattr(
+        feedback_summary,
+        "generate_assessment",
+        lambda text, mode: calls.append(text) or "평가",
+    )
+    monkeypatch.setattr(feedback_summary, "bucket_summaries", {})
+    for scores in ([["업적", 4.27], ["태도", 3.9]], [["업적", 4.4], ["태도", 4.1]]):
+        assert (
+            feedback_summary.summarize_multiple(scores, bucket_mode="bucket") == "평가"
+        )
+    assert calls == ["\n    업적: 4.5\n    태도: 4.0"]
@@ -0,0 +1,312 @@
+"""
+Upstage Solar API 오프라인 스텁 서버.
+
+네트워크 없이 파이프라인 전체(도서 임베딩, 보고서 요약, 톤 정규화, 메일 템플릿)를
+부하 테스트할 수 있도록 OpenAI 호환 엔드포인트를 흉내냅니다.
+
+    POST /v1/solar/chat/completions
+    POST /v1/solar/embeddings
+
+사용 예:
+    python upstage_stub.py --port 8000 --chat-latency lognormal:0.0,0.5 --rate-limit-ratio 0.05
+    # .env 또는 환경 변수로 모든 클라이언트를 스텁으로 향하게 함
+    UPSTAGE_API_BASE=http://localhost:8000/v1/solar
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+EMBEDDING_DIM = 4096
+
+# 요약 함수들이 숫자(summarize_multiple)나 ':'(summarize_subjective)가 포함된 응답을
+# 재생성하므로, 스텁 응답에는 두 문자를 넣지 않습니다.
+CANNED_SENTENCES = [
+    "맡은 업무를 책임감 있게 수행하며 동료들과 원활하게 협업합니다.",
+    "새로운 과제에 적극적으로 도전하며 빠르게 적응하는 모습을 보입니다.",
+    "업무 우선순위를 명확히 하여 일정을 안정적으로 관리합니다.",
+    "의사소통 과정에서 상대의 의견을 경청하고 명확하게 전달합니다.",
+    "문제 상황에서 원인을 분석하고 현실적인 해결책을 제시합니다.",
+    "세부 사항에 대한 확인을 보완하면 더 좋은 성과를 기대할 수 있습니다.",
+    "팀의 목표를 이해하고 필요한 역할을 주도적으로 맡습니다.",
+    "피드백을 긍정적으로 수용하고 꾸준히 개선하려고 노력합니다.",
+]
+
+
+def parse_latency(spec):
+    """'constant:0.5', 'uniform:0.1,0.8', 'normal:1,0.3', 'lognormal:0,0.5' 형식의 지연 분포를 파싱"""
+    if not spec:
+        return ("constant", (0.0,))
+    name, _, raw_args = spec.partition(":")
+    args = tuple(float(a) for a in raw_args.split(",") if a.strip())
+    expected = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+    if name not in expected or len(args) != expected[name]:
+        raise ValueError(f"잘못된 지연 분포 설정: {spec}")
+    return (name, args)
+
+
+def sample_latency(rng, latency):
+    name, args = latency
+    if name == "constant":
+        value = args[0]
+    elif name == "uniform":
+        value = rng.uniform(*args)
+    elif name == "normal":
+        value = rng.gauss(*args)
+    else:  # lognormal
+        value = rng.lognormvariate(*args)
+    return max(0.0, value)
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def deterministic_embedding(text, dim=EMBEDDING_DIM):
+    """같은 텍스트에는 항상 같은 단위 벡터를 반환"""
+    seed = int.from_bytes(_digest(text)[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def deterministic_completion(prompt):
+    """프롬프트 해시로 고정된 문장 조합을 골라 응답 생성"""
+    digest = _digest(prompt)
+    count = 2 + digest[0] % 2
+    return " ".join(
+        CANNED_SENTENCES[digest[i + 1] % len(CANNED_SENTENCES)] for i in range(count)
+    )
+
+
+MARKER_PATTERN = re.compile(r"(?m)^\s*\[([^\]\s]+)\]\s")
+# 여러 키워드를 한 번에 요청하는 프롬프트의 '키워드: a, b' 줄
+KEYWORDS_PATTERN = re.compile(r"(?m)^\s*키워드:\s*(.+)$")
+
+
+def fill_schema(schema, prompt, markers):
+    """JSON 스키마 모양대로 결정적인 값을 채움 (배열은 프롬프트의 '[id] ...' 항목 수만큼)"""
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: fill_schema(sub_schema, f"{prompt}\n{name}", markers)
+            for name, sub_schema in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        item_schema = schema.get("items", {})
+        properties = item_schema.get("properties", {})
+        # 항목의 첫 번째 필드(id, question 등)에는 프롬프트의 항목 id를 그대로 넣음
+        id_field = next(iter(item_schema.get("required") or properties), None)
+        items = []
+        for marker in markers:
+            item = fill_schema(item_schema, f"{prompt}\n{marker}", [])
+            if isinstance(item, dict) and id_field:
+                is_integer = properties[id_field].get("type") == "integer"
+                item[id_field] = int(marker) if is_integer else marker
+            items.append(item)
+        return items
+    if kind in ("integer", "number"):
+        return _digest(prompt)[0] % 5 + 1
+    if kind == "boolean":
+        return _digest(prompt)[0] % 2 == 0
+    return deterministic_completion(prompt)
+
+
+def deterministic_json_completion(prompt, schema=None):
+    """JSON 요청 응답: 스키마가 있으면 스키마대로, '[번호] 문장' 목록이면 {"id", "text"} 배열
+
+    '키워드:' 줄이 있으면 예시의 '[질문N]' 대신 그 줄의 키워드마다 항목을 만듭니다.
+    """
+    keywords = KEYWORDS_PATTERN.search(prompt)
+    if keywords:
+        markers = [k.strip() for k in keywords.group(1).split(",") if k.strip()]
+    else:
+        markers = MARKER_PATTERN.findall(prompt)
+    if schema is None:
+        ids = [marker for marker in markers if marker.isdigit()]
+        if not ids:
+            return json.dumps(
+                {"text": deterministic_completion(prompt)}, ensure_ascii=False
+            )
+        schema = {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "text": {"type": "string"}},
+            },
+        }
+        markers = ids
+    return json.dumps(fill_schema(schema, prompt, markers), ensure_ascii=False)
+
+
+def estimate_tokens(text):
+    # 한글은 대략 글자당 1토큰, 그 외는 4글자당 1토큰으로 근사
+    hangul = sum(1 for ch in text if "가" <= ch <= "힣")
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def create_app(
+    chat_latency=None,
+    embedding_latency=None,
+    model_latency=None,
+    rate_limit_ratio=0.0,
+    seed=None,
+):
+    """스텁 Flask 앱 생성
+
+    Args:
+        chat_latency: chat/completions 기본 지연 분포 문자열
+        embedding_latency: embeddings 기본 지연 분포 문자열
+        model_latency: {모델명: 지연 분포 문자열} 모델별 덮어쓰기
+        rate_limit_ratio: 429 응답을 주입할 확률 (0~1)
+        seed: 지연/429 주입용 난수 시드
+    """
+    app = Flask(__name__)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    latencies = {
+        "chat": parse_latency(chat_latency),
+        "embedding": parse_latency(embedding_latency),
+    }
+    per_model = {
+        model: parse_latency(spec) for model, spec in (model_latency or {}).items()
+    }
+    stats = {"chat": 0, "embedding": 0, "rate_limited": 0}
+    app.config["STUB_STATS"] = stats
+
+    def throttle(kind, model):
+        """지연을 주입하고, 429를 돌려줘야 하면 응답 객체를 반환"""
+        with rng_lock:
+            delay = sample_latency(rng, per_model.get(model, latencies[kind]))
+            limited = rng.random() < rate_limit_ratio
+            stats[kind] += 1
+            if limited:
+                stats["rate_limited"] += 1
+        if limited:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "message": "Too many requests (stub)",
+                            "type": "too_many_requests",
+                            "code": "too_many_requests",
+                        }
+                    }
+                ),
+                429,
+            )
+        time.sleep(delay)
+        return None
+
+    @app.route("/v1/solar/chat/completions", methods=["POST"])
+    def chat_completions():
+        body = request.get_json(force=True) or {}
+        model = body.get("model", "solar-pro")
+        limited = throttle("chat", model)
+        if limited:
+            return limited
+
+        prompt = "\n".join(
+            str(message.get("content", "")) for message in body.get("messages", [])
+        )
+        response_format = body.get("response_format") or {}
+        if response_format.get("type", "").startswith("json") or "JSON" in prompt:
+            schema = (response_format.get("json_schema") or {}).get("schema")
+            content = deterministic_json_completion(f"{model}\n{prompt}", schema)
+        else:
+            content = deterministic_completion(f"{model}\n{prompt}")
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(content)
+        return jsonify(
+            {
+                "id": "chatcmpl-stub-" + _digest(prompt).hex()[:24],
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    @app.route("/v1/solar/embeddings", methods=["POST"])
+    def embeddings():
+        body = request.get_json(force=True) or {}
+        model = body.get("model", "embedding-passage")
+        limited = throttle("embedding", model)
+        if limited:
+            return limited
+
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        prompt_tokens = sum(estimate_tokens(text) for text in inputs)
+        return jsonify(
+            {
+                "object": "list",
+                "model": model,
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": idx,
+                        # 모델명을 섞어 모델 교체 시 다른 벡터 공간이 되도록 함
+                        "embedding": deterministic_embedding(f"{model}\n{text}"),
+                    }
+                    for idx, text in enumerate(inputs)
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "total_tokens": prompt_tokens,
+                },
+            }
+        )
+
+    @app.route("/stats", methods=["GET"])
+    def get_stats():
+        return jsonify(stats)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upstage Solar API 오프라인 스텁")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--chat-latency", default="lognormal:0.0,0.5")
+    parser.add_argument("--embedding-latency", default="uniform:0.05,0.2")
+    parser.add_argument(
+        "--model-latency",
+        action="append",
+        default=[],
+        metavar="MODEL=SPEC",
+        help="모델별 지연 분포 (예: solar-1-mini-translate-enko=constant:0.3)",
+    )
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app(
+        chat_latency=args.chat_latency,
+        embedding_latency=args.embedding_latency,
+        model_latency=dict(item.split("=", 1) for item in args.model_latency),
+        rate_limit_ratio=args.rate_limit_ratio,
+        seed=args.seed,
+    )
+    print(f"Upstage 스텁 실행: http://{args.host}:{args.port}/v1/solar")
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -6,57 +6,45 @@ import time
 import requests
 import streamlit as st
 from dotenv import load_dotenv
-from openai import OpenAI
 from streamlit_tags import st_tags
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
 
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 API_BASE_URL = "http://localhost:5000/api"
 
-client = OpenAI(api_key=UPSTAGE_API_KEY, base_url="https://api.upstage.ai/v1/solar")
-
 
 def get_question_suggestions(keyword):
-    prompt = f"""
-    당신은 직장에서 쓰일 동료 피드백 질문 생성 전문가입니다.
-    '{keyword}' 키워드와 관련된 동료 평가용 질문 3개 (객관식 2개, 주관식 1개)를 생성해주세요.
-    
-    규칙:
-    1. 각 질문은 구체적이고 명확해야 합니다
-    2. 질문과 함께 질문 유형(객관식, 주관식)도 표시해주세요
-    3. 객관식인 경우 선택지도 함께 제시해주세요
-    
-    키워드가 리더쉽인 경우
-    형식:
-    [질문1]
-    - 유형: (질문 유형)
-    - 질문: (질문 내용)
-    - (객관식일 경우) 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
-
-    객관식 예시 응답:
-    [질문1]
-    - 유형: 객관식
-    - 질문: 팀원의 역량 개발을 위해 성과와 능력을 주기적으로 점검하고 개선 방향을 제시한다. 단순 지적이 아니라 구체적이고 건설적인 피드백을 제공한다.
-    - 선택지: 매우우수, 우수, 보통, 미흡, 매우미흡
-
-    주관식 예시 응답:
-    [질문1]
-    - 유형: 주관식
-    - 질문: 팀원의 리더십 스타일은 어떠한지 구체적인 설명과 함께 작성해주세요.
-    """
-
+    """키워드의 AI 추천 질문 (백엔드에 저장된 결과가 있으면 바로 반환)"""
     try:
-        response = client.chat.completions.create(
-            model="solar-pro",
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
+        resp = requests.post(
+            f"{API_BASE_URL}/questions/suggestions",
+            json={"keywords": [keyword]},
+            timeout=120,
         )
-        return response.choices[0].message.content
+        data = resp.json()
+        if data.get("success"):
+            # 백엔드는 앞뒤 공백을 제거한 키워드로 저장
+            return data["suggestions"].get(keyword.strip(), "")
+        return data.get("message", "질문 생성 중 오류가 발생했습니다.")
     except Exception as e:
         return f"질문 생성 중 오류가 발생했습니다: {str(e)}"
 
 
+def prefetch_question_suggestions(keywords):
+    """키워드 목록이 바뀌면 추천 질문을 백엔드에서 미리 생성하도록 요청"""
+    if st.session_state.get("prefetched_keywords") == keywords:
+        return
+    try:
+        requests.post(
+            f"{API_BASE_URL}/questions/suggestions/prefetch",
+            json={"keywords": keywords},
+            timeout=5,
+        )
+        st.session_state.prefetched_keywords = keywords
+    except requests.exceptions.RequestException:
+        pass
+
+
 def admin_manage_questions():
     st.write("## 📝 리뷰 관리")
 
@@ -166,6 +154,7 @@ def admin_manage_questions():
                 maxtags=10,
                 key="keywords",
             )
+            prefetch_question_suggestions(keywords)
 
             if st.button("파일로 질문 추가", key="add_question_from_pdf_button"):
                 st.session_state.page = "question_add_from_pdf"
@@ -1,55 +1,58 @@
-import os
+import hashlib
 import time
 
 import pandas as pd
 import requests
 import streamlit as st
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from langchain_upstage import UpstageDocumentParseLoader
 
-load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
-
-UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 API_BASE_URL = "http://localhost:5000/api"
-os.environ["UPSTAGE_API_KEY"] = UPSTAGE_API_KEY
-
-
-def parse_evaluation_form(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
-    evaluation_data = {
-        "title": soup.find("h1").text.strip() if soup.find("h1") else "인사고과 평가표",
-        "questions": [],
-    }
-
-    current_category = None
-    for row in soup.find_all("tr")[3:]:  # 헤더 행 제외
-        cells = row.find_all("td")
-        if not cells:
-            continue
-
-        # 카테고리(업적/능력/태도) 확인
-        first_cell = cells[0]
-        if "rowspan" in first_cell.attrs:
-            current_category = first_cell.text.strip()
-            evaluation_item = cells[1].text.strip()
-            criteria = cells[2].text.strip()
-        else:
-            evaluation_item = cells[0].text.strip()
-            criteria = cells[1].text.strip()
 
-        if evaluation_item and criteria and current_category:
-            evaluation_data["questions"].append(
-                {
-                    "keyword": current_category,
-                    "evaluation_item": evaluation_item,
-                    "criteria": criteria,
-                    "question_type": "single_choice",
-                    "options": ["매우우수", "우수", "보통", "미흡", "매우미흡"],
-                }
-            )
 
-    return evaluation_data
+# 문서 분석 작업 상태 조회 간격 / 최대 대기 시간 (초)
+JOB_POLL_INTERVAL = 1
+JOB_TIMEOUT = 600
+JOB_STATUS_LABELS = {"queued": "분석 대기 중...", "parsing": "문서 분석 중..."}
+
+
+def wait_for_parse_job(job_id):
+    """분석 작업이 끝날 때까지 상태를 조회하며 진행 상황 표시 (반환: 작업 결과)"""
+    status_box = st.empty()
+    deadline = time.time() + JOB_TIMEOUT
+    try:
+        while time.time() < deadline:
+            job = requests.get(f"{API_BASE_URL}/upload_jobs/{job_id}").json()
+            if not job.get("success") or job["status"] == "failed":
+                raise RuntimeError(job.get("message") or "문서 분석 실패")
+            if job["status"] == "done":
+                return job
+            status_box.info(JOB_STATUS_LABELS.get(job["status"], job["status"]))
+            time.sleep(JOB_POLL_INTERVAL)
+    finally:
+        status_box.empty()
+    raise RuntimeError("문서 분석 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.")
+
+
+def load_evaluation_data(uploaded_file):
+    """업로드한 파일의 평가표 분석 결과 (같은 내용의 파일은 백엔드에 저장된 결과 사용)"""
+    content_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    parsed = st.session_state.setdefault("parsed_documents", {})
+    if content_hash in parsed:
+        return parsed[content_hash]
+
+    response = requests.get(f"{API_BASE_URL}/documents/{content_hash}")
+    if response.status_code == 200:
+        data = response.json()
+    else:
+        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
+        with st.spinner("파일 업로드 중..."):
+            upload = requests.post(f"{API_BASE_URL}/upload_file", files=files)
+        if not (upload.status_code == 202 and upload.json().get("success")):
+            raise RuntimeError(upload.json().get("message", "파일 업로드 실패"))
+        # 분석은 백엔드에서 진행되고 화면은 작업 상태만 조회
+        data = wait_for_parse_job(upload.json()["job_id"])
+
+    parsed[content_hash] = data["evaluation_data"]
+    return data["evaluation_data"]
 
 
 def display_evaluation_form(evaluation_data):
@@ -269,74 +272,58 @@ def question_add_from_pdf_page():
             st.error("파일 크기는 50MB를 초과할 수 없습니다.")
             return
 
-        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-
         try:
-            with st.spinner("파일 업로드 중..."):
-                response = requests.post(f"{API_BASE_URL}/upload_file", files=files)
-
-            if response.status_code == 200 and response.json().get("success"):
-                st.success("파일 업로드 성공!")
-
-                uploaded_folder = "../backend/uploads"
-                saved_file_path = os.path.join(uploaded_folder, uploaded_file.name)
-
-                with st.spinner("문서 분석 중..."):
-                    loader = UpstageDocumentParseLoader(saved_file_path)
-                    pages = loader.load()
-
-                    # HTML 파싱 및 평가표 표시
-                    evaluation_data = parse_evaluation_form(str(pages[0]))
-                    st.session_state.evaluation_data = evaluation_data
-                    display_evaluation_form(evaluation_data)
-
-                    # 저장 버튼
-                    if st.button("질문 저장", key="save_button"):
-                        selected_questions = process_selected_questions()
-                        if selected_questions:
-                            st.success("선택한 질문이 저장되었습니다!")
-                            st.table(pd.DataFrame(selected_questions))
-                        else:
-                            st.warning("저장할 질문이 없습니다.")
-
-                    col1, col2 = st.columns([1, 16])  # 버튼 위치 조정을 위해 추가
-                    with col1:
-                        if st.button("적용", key="apply_button"):
-                            selected_questions = process_selected_questions()
-                            if selected_questions:
-                                success = True
-                                for question in selected_questions:
-                                    payload = {
-                                        "keyword": question["keyword"],
-                                        "question_text": question["question"],
-                                        "question_type": question["question_type"],
-                                        "options": (
-                                            ",".join(question["options"]).strip()
-                                            if question["options"]
-                                            else None
-                                        ),
-                                    }
-                                    r2 = requests.post(
-                                        f"{API_BASE_URL}/questions", json=payload
-                                    )
-                                    if r2.status_code != 200:
-                                        st.error(f"질문 저장 실패: {r2.text}")
-                                        success = False
-                                if success:
-                                    st.success("질문이 성공적으로 적용되었습니다")
-                                    time.sleep(2)
-                                    st.session_state.page = "login"
-                                    st.rerun()
-                            else:
-                                st.warning("적용할 질문이 없습니다.")
-
-                    with col2:
-                        if st.button("취소", key="cancel_button"):
+            evaluation_data = load_evaluation_data(uploaded_file)
+            st.success("파일 업로드 성공!")
+
+            # 평가표 표시 (분석 결과는 파일 내용 기준으로 저장되어 다시 실행해도 바로 표시)
+            st.session_state.evaluation_data = evaluation_data
+            display_evaluation_form(evaluation_data)
+
+            # 저장 버튼
+            if st.button("질문 저장", key="save_button"):
+                selected_questions = process_selected_questions()
+                if selected_questions:
+                    st.success("선택한 질문이 저장되었습니다!")
+                    st.table(pd.DataFrame(selected_questions))
+                else:
+                    st.warning("저장할 질문이 없습니다.")
+
+            col1, col2 = st.columns([1, 16])  # 버튼 위치 조정을 위해 추가
+            with col1:
+                if st.button("적용", key="apply_button"):
+                    selected_questions = process_selected_questions()
+                    if selected_questions:
+                        success = True
+                        for question in selected_questions:
+                            payload = {
+                                "keyword": question["keyword"],
+                                "question_text": question["question"],
+                                "question_type": question["question_type"],
+                                "options": (
+                                    ",".join(question["options"]).strip()
+                                    if question["options"]
+                                    else None
+                                ),
+                            }
+                            r2 = requests.post(
+                                f"{API_BASE_URL}/questions", json=payload
+                            )
+                            if r2.status_code != 200:
+                                st.error(f"질문 저장 실패: {r2.text}")
+                                success = False
+                        if success:
+                            st.success("질문이 성공적으로 적용되었습니다")
+                            time.sleep(2)
                             st.session_state.page = "login"
                             st.rerun()
+                    else:
+                        st.warning("적용할 질문이 없습니다.")
 
-            else:
-                st.error(response.json().get("message", "파일 업로드 실패"))
+            with col2:
+                if st.button("취소", key="cancel_button"):
+                    st.session_state.page = "login"
+                    st.rerun()
 
         except Exception as e:
             st.error(f"문서 처리 중 오류가 발생했습니다: {str(e)}")